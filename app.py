@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import io
+import numpy as np
+import os
 import json
 import time
 import calendar
@@ -9,13 +10,34 @@ import random
 import string
 import hashlib
 import urllib.parse 
-import re
 from email.mime.text import MIMEText
 from datetime import date, datetime, timedelta
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-import gspread
+from jst.clients import GoogleClients
+from jst.ingest import (
+    CACHE_ROOT, build_file_index, select_files_in_range,
+    sync_folder, sync_folder_frames, parse_sale_excel, parse_stock_excel
+)
+from jst.sales_store import SalesStore
+from jst.sheet_snapshot import SheetSnapshot
+from jst.storage import GoogleStorage, LocalStorage
+from jst.write_queue import WriteQueue, grid_records, DONE_RETENTION_SECONDS
+from jst.local_mirror import LocalMirror
+from jst.refresher import BackgroundRefresher
+from jst.catalog import ProductCatalog, pid_from_label
+from jst.po_allocator import AutoPoAllocator, format_auto_po, max_auto_po_number
+from jst.grid import grid_column, grid_cell, grid_html, show_grid, render_grid
+from jst.report_cache import ReportCache, frame_version, normalize_filters
+from jst.frame_types import memory_report
+from jst.sheet_frames import (
+    MASTER_COLUMN_MAP, PO_COLUMN_MAP, master_frame_from_grid, po_frame_from_records, master_row_index, master_limit_ops
+)
+from jst.po_groups import iter_po_groups
+from jst.reports import (
+    MOVEMENT_OPTIONS, daily_sales_frame, daily_sales_grid, po_base_frame, po_report_frame, po_grid, stock_report_frame
+)
+from jst.tracing import traced, span, cache_miss, configure as configure_tracing, start_rerun, finish_rerun
+from jst.status import apply_po_status
 
 # ==========================================
 # 1. ตั้งค่า Page & CSS Styles
@@ -83,6 +105,48 @@ TAB_NAME_PO = "PO_DATA"
 FOLDER_ID_STOCK_ACTUAL = "1-hXu2RG2gNKMkW3ZFBFfhjQEhTacVYzk"
 FOLDER_ID_DATA_SALE = "12jyMKgFHoc9-_eRZ-VN9QLsBZ31ZJP4T"
 
+# แหล่งข้อมูล (ดู jst/storage.py): "google" = Google Sheet + Drive, "local" = ไฟล์ในเครื่องที่ LOCAL_STORAGE_ROOT
+# เปลี่ยนได้ใน secrets: [storage] backend = "local" / root = "..."
+STORAGE_BACKEND = "google"
+LOCAL_STORAGE_ROOT = os.path.join(CACHE_ROOT, "local_data")
+LOCAL_FOLDER_NAMES = {FOLDER_ID_STOCK_ACTUAL: "stock", FOLDER_ID_DATA_SALE: "sale"}
+
+# ตั้งค่าการโหลดไฟล์ Excel จาก Drive แบบขนาน (จำนวน worker / timeout ต่อไฟล์ เป็นวินาที)
+INGEST_OPTIONS = {
+    "download_workers": 4,   # Thread Pool สำหรับดาวน์โหลดไฟล์
+    "parse_workers": 2,      # Process Pool สำหรับ pd.read_excel (0 = parse ใน thread หลัก)
+    "download_timeout": 120,
+    "parse_timeout": 180,
+}
+
+# Report Cache: จำนวนรายงานสูงสุด / หน่วยความจำรวม ที่เก็บไว้ (ใช้ร่วมกันทุกผู้ใช้ เก่าสุดถูกลบก่อน)
+REPORT_CACHE_MAX_ENTRIES = 64
+REPORT_CACHE_MAX_MB = 256
+DAILY_SALES_GRID_HEIGHT = 720
+PO_GRID_HEIGHT = 760
+
+# หน้าแก้ไข PO: rerun ภายในกี่วินาทีที่ไม่ต้องเช็คว่า Sheet เปลี่ยนหรือยัง
+PO_FRESH_PROBE_SECONDS = 5
+
+# Sidebar: ความถี่ในการอัปเดตสถานะคิวบันทึกลง Google Sheet
+WRITE_STATUS_REFRESH_SECONDS = 3
+
+# Background Refresher: รอบโหลดข้อมูลใหม่เบื้องหลังของแต่ละแหล่ง (วินาที) ผู้ใช้ได้ข้อมูลชุดเดิมระหว่างโหลด
+REFRESH_INTERVALS = {
+    "sheet": 300,        # Tab MASTER / PO_DATA
+    "stock_files": 60,   # ไฟล์ Stock คงเหลือจริง
+    "sale_index": 300,   # รายชื่อไฟล์ยอดขาย + ไฟล์ของวันล่าสุด
+}
+
+# Dropdown เลือกสินค้า: จำนวนตัวเลือกสูงสุดที่ส่งไปหน้าเว็บ (ค้นหาจาก Search Index ฝั่ง Server)
+SKU_OPTION_LIMIT = 50
+# หน้าแก้ไข PO: จำนวนคู่ (เลข PO, รหัสสินค้า) สูงสุดที่แสดงเมื่อค้นหา (ค้นจาก index ในสำเนา SQLite)
+PO_SEARCH_LIMIT = 100
+
+# Tracing: เวลาแต่ละขั้นตอนของทุก rerun เขียนลงไฟล์ JSONL (ดู jst/tracing.py) None = ไม่เขียนไฟล์
+TRACE_LOG_PATH = os.path.join(CACHE_ROOT, "trace", "spans.jsonl")
+TRACE_LOG_MAX_MB = 20
+
 @st.cache_resource
 def get_credentials():
     scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
@@ -92,6 +156,51 @@ def get_credentials():
         return service_account.Credentials.from_service_account_info(creds_dict, scopes=scope)
     return service_account.Credentials.from_service_account_file("credentials.json", scopes=scope)
 
+@st.cache_resource
+def get_clients():
+    """Google Sheets / Drive client ที่ใช้ร่วมกันทั้งแอป (authorize + เปิด Sheet แค่ครั้งเดียว)"""
+    return GoogleClients(get_credentials(), MASTER_SHEET_ID)
+
+def storage_settings():
+    try: return dict(st.secrets.get("storage", {}))
+    except Exception: return {}
+
+@st.cache_resource
+def get_storage():
+    """Backend ของ Tab ใน Sheet + ไฟล์ใน Folder ที่ใช้ทั้งแอป (ดู jst/storage.py)"""
+    conf = storage_settings()
+    if conf.get("backend", STORAGE_BACKEND) == "local":
+        return LocalStorage(conf.get("root", LOCAL_STORAGE_ROOT), folders=LOCAL_FOLDER_NAMES)
+    return GoogleStorage(get_clients())
+
+@st.cache_resource
+def get_report_cache():
+    """ผลรายงานที่คำนวณแล้ว (key = version ข้อมูล + ตัวกรอง ดู jst/report_cache.py)"""
+    return ReportCache(REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_MAX_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_write_queue():
+    """คิวบันทึกลง Google Sheet เบื้องหลัง (ดู jst/write_queue.py)"""
+    return WriteQueue(get_storage())
+
+@st.cache_resource
+def get_local_mirror():
+    """สำเนา MASTER / PO_DATA ในเครื่อง ใช้อ่านแทนตอน Google Sheet ไม่ตอบสนอง (ดู jst/local_mirror.py)"""
+    return LocalMirror(
+        os.path.join(CACHE_ROOT, "mirror", "sheets.sqlite"),
+        column_maps={TAB_NAME_STOCK: MASTER_COLUMN_MAP, TAB_NAME_PO: PO_COLUMN_MAP}
+    )
+
+@st.cache_resource
+def get_refresher():
+    """โหลดข้อมูลใหม่เบื้องหลังก่อนหมดอายุ + โหลดครั้งเดียวเมื่อหลาย session ขอพร้อมกัน (ดู jst/refresher.py)"""
+    return BackgroundRefresher()
+
+@st.cache_resource
+def setup_tracing():
+    """เปิด Log ของ Tracing ครั้งเดียวต่อ process (ดู jst/tracing.py)"""
+    return configure_tracing(TRACE_LOG_PATH, TRACE_LOG_MAX_MB * 1024 * 1024)
+
 # ==========================================
 # 3. ระบบ AUTHENTICATION
 # ==========================================
@@ -128,15 +237,10 @@ def send_otp_email(receiver_email, otp_code):
 
 def log_login_activity(email):
     try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        try: ws = sh.worksheet("LOGIN_LOG")
-        except:
-            ws = sh.add_worksheet(title="LOGIN_LOG", rows="1000", cols="2")
-            ws.append_row(["Timestamp", "Email"])
+        storage = get_storage()
+        storage.ensure_tab("LOGIN_LOG", ["Timestamp", "Email"])
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ws.append_row([timestamp, email])
+        storage.append_rows("LOGIN_LOG", [[timestamp, email]])
     except Exception as e:
         print(f"Login Log Error: {e}")
 
@@ -148,6 +252,13 @@ if 'user_email' not in st.session_state: st.session_state.user_email = ""
 if 'current_page' not in st.session_state: st.session_state.current_page = "📅 สรุปยอดขายรายวัน"
 if "target_edit_data" not in st.session_state: st.session_state.target_edit_data = {}
 
+# --- Tracing: เริ่มจับเวลา rerun นี้ (rerun ที่จบด้วย st.stop() / st.rerun() จะไม่ถูกบันทึก) ---
+setup_tracing()
+rerun_trace = start_rerun(
+    page=st.session_state.current_page,
+    session=hashlib.md5(st.session_state.user_email.encode()).hexdigest()[:8] if st.session_state.user_email else None,
+)
+
 # --- AUTO LOGIN LOGIC ---
 url_token = st.query_params.get("token", None)
 
@@ -227,463 +338,469 @@ def highlight_negative(val):
         return 'color: #ff4b4b; font-weight: bold;'
     return ''
 
-def clean_text_for_html(text):
-    if not isinstance(text, str):
-        text = str(text)
-    
-    # 1. ลบอักขระควบคุม (เช่น \n, \r, \t) เปลี่ยนเป็นเว้นวรรค
-    text = re.sub(r'[\r\n\t]+', ' ', text)
-    
-    # 2. เก็บเฉพาะ: ภาษาไทย, อังกฤษ, ตัวเลข, ช่องว่าง, และเครื่องหมาย ( ) . - _ /
-    # อักขระอื่นๆ ที่อาจก่อปัญหา (เช่น " ' < > & % $ #) จะถูกลบทิ้ง
-    text = re.sub(r'[^\u0e00-\u0e7f a-zA-Z0-9\.\-\_\(\)\/]+', '', text)
-    
-    return text.strip()
+@traced(kind="sheet", cache="hit", rows=lambda r: len(r[0]))
+def fetch_sheet_values(tab_name):
+    """ข้อมูลดิบทั้ง Tab (แถวแรก = หัวตาราง) + เวลาที่เริ่มอ่าน (ใช้ตัดสินว่า job ไหนในคิวอยู่ในข้อมูลชุดนี้แล้ว)
+    โหลดใหม่เบื้องหลังทุก REFRESH_INTERVALS["sheet"] วินาที (ห้ามแก้ไข grid ที่ได้: ใช้ร่วมกันทุก session)"""
+    storage, queue, mirror = get_storage(), get_write_queue(), get_local_mirror()
+    def load():
+        cache_miss()
+        return load_sheet_tab(tab_name, storage, queue, mirror)
+    return get_refresher().get(f"sheet:{tab_name}", load, REFRESH_INTERVALS["sheet"], label=f"Sheet {tab_name}")
+
+def load_sheet_tab(tab_name, storage, queue, mirror):
+    """อ่าน Tab จาก Sheet ตรงๆ คืน (grid, fetched_at) + เก็บสำเนาลงเครื่อง (เรียกได้จาก Thread เบื้องหลัง: ไม่ใช้ st.*)"""
+    def read():
+        # Delta pull: version ของ Spreadsheet ยังเท่ากับตอน sync ล่าสุด -> ใช้สำเนาในเครื่อง ไม่ต้องดึงทั้ง Tab
+        # สำเนาคือข้อมูล ณ fetched_at ของสำเนาเอง (ไม่ใช่ตอนนี้: version บน Drive อาจอัปเดตช้ากว่าการเขียน)
+        # ใช้ได้เฉพาะเมื่อไม่มี job ที่เขียนหลังจากนั้น และสำเนาอายุไม่เกิน DONE_RETENTION_SECONDS (job ที่เขียนหลังจากนั้นยังอยู่ในคิวให้ตรวจ)
+        try: version = storage.sheet_version()
+        except Exception as e:
+            print(f"Sheet version check failed ({tab_name}): {e}")
+            version = None
+        if version is not None:
+            try: cached = mirror.load_tab(tab_name, version)
+            except Exception as e:
+                print(f"Local mirror read failed ({tab_name}): {e}")
+                cached = None
+            if cached is not None:
+                mirror_at = cached[1]
+                fresh_enough = time.time_ns() - mirror_at < DONE_RETENTION_SECONDS * 1_000_000_000
+                if fresh_enough and not queue.has_unsynced(tab_name, mirror_at): return cached[0], version, mirror_at
+        return storage.read_tab(tab_name), version, None
+
+    # อ่านผ่านคิว: ไม่อ่านระหว่างที่ batch ของ Tab นี้กำลังเขียน (ไม่งั้น overlay ซ้อนซ้ำ)
+    (grid, version, mirror_at), fetched_at = queue.read_tab(tab_name, read)
+    if mirror_at is not None: return grid, mirror_at
+    # เก็บสำเนาลงเครื่อง (เขียนเฉพาะแถวที่เปลี่ยน) ไว้ใช้ตอน Sheet ไม่ตอบสนอง + ครั้งถัดไป
+    try: mirror.sync_tab(tab_name, grid, fetched_at, version)
+    except Exception as e: print(f"Local mirror sync failed ({tab_name}): {e}")
+    return grid, fetched_at
+
+def sheet_source(tab_name):
+    """แหล่งข้อมูลของ Tab: ("sheet", fetched_at) หรือ ("mirror", fetched_at) ถ้า Sheet ไม่ตอบสนองและมีสำเนาในเครื่อง"""
+    mirror, refresher, name = get_local_mirror(), get_refresher(), f"sheet:{tab_name}"
+    # เพิ่งอ่านไม่สำเร็จ -> ใช้สำเนาไปก่อน ไม่ต้องรอ timeout ทุก rerun
+    if not mirror.should_retry(tab_name):
+        mirror_at = mirror.fetched_at(tab_name)
+        if mirror_at is not None: return "mirror", mirror_at
+    # ถึงรอบลองใหม่แต่ Refresher ยังถือข้อมูลชุดเดิมจากการโหลดที่ล้มเหลว -> โหลดใหม่เดี๋ยวนี้
+    elif mirror.is_offline(tab_name) and refresher.last_error(name) is not None:
+        refresher.invalidate(name)
+    fetched_at = None
+    try:
+        _, fetched_at = fetch_sheet_values(tab_name)
+        # โหลดล่าสุดล้มเหลว (ได้ข้อมูลชุดเดิม stale จาก Refresher) = Sheet ไม่ตอบสนองเหมือนกัน -> อ่านอย่างเดียว
+        error = refresher.last_error(name)
+    except Exception as e:
+        error = e
+    if error is None:
+        mirror.mark_online(tab_name)
+        return "sheet", fetched_at
+    mirror_at = mirror.fetched_at(tab_name)
+    if mirror_at is None and fetched_at is None: return "sheet", None  # ไม่มีข้อมูลเลย -> ให้ตัวโหลดแจ้ง error ตามเดิม
+    print(f"Sheet read failed ({tab_name}), using local data (read-only): {error}")
+    mirror.mark_offline(tab_name, error)
+    return ("mirror", mirror_at) if mirror_at is not None else ("sheet", fetched_at)
+
+def is_read_only(tab_name):
+    return get_local_mirror().is_offline(tab_name)
+
+def read_sheet_grid(tab_name, source=("sheet", None)):
+    """ข้อมูลดิบของ Tab รวมรายการที่ยังรอเขียนลง Sheet ในคิว"""
+    if source[0] == "mirror":
+        grid, fetched_at = get_local_mirror().load_tab(tab_name)
+    else:
+        grid, fetched_at = fetch_sheet_values(tab_name)
+    return get_write_queue().overlay(tab_name, grid, fetched_at)
 
-@st.cache_data(ttl=300)
-def get_stock_from_sheet():
+def read_sheet_grid_fresh(tab_name):
+    """เหมือน read_sheet_grid แต่อ่านจาก Sheet ใหม่ (ไม่ผ่าน cache) ถ้า Sheet ไม่ตอบสนองใช้สำเนาในเครื่องแทน"""
+    mirror = get_local_mirror()
+    if mirror.should_retry(tab_name):
+        try:
+            grid, fetched_at = load_sheet_tab(tab_name, get_storage(), get_write_queue(), mirror)
+            mirror.mark_online(tab_name)
+            return get_write_queue().overlay(tab_name, grid, fetched_at)
+        except Exception as e:
+            if mirror.fetched_at(tab_name) is None: raise
+            print(f"Sheet read failed ({tab_name}), using local mirror: {e}")
+            mirror.mark_offline(tab_name, e)
+    return read_sheet_grid(tab_name, ("mirror", None))
+
+def read_sheet_records(tab_name, source=("sheet", None)):
+    """เหมือน ws.get_all_records() แต่รวมรายการที่ยังรอเขียนลง Sheet ในคิวด้วย"""
+    return grid_records(read_sheet_grid(tab_name, source))
+
+def mirror_is_current(tab_name):
+    """ใช้ index ในสำเนาตอบ query ได้ไหม (มีสำเนาแล้ว และไม่มีรายการในคิวที่ยังไม่อยู่ในสำเนา ไม่งั้นให้กรองจาก DataFrame)"""
+    fetched_at = get_local_mirror().fetched_at(tab_name)
+    return fetched_at is not None and not get_write_queue().has_unsynced(tab_name, fetched_at)
+
+def mirror_po_rows(**filters):
+    """แถว PO ที่ตรงเงื่อนไข (ดู LocalMirror.select_rows) ค้นด้วย SQL จากสำเนา คืน DataFrame หรือ None ถ้าใช้สำเนาไม่ได้"""
     try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_STOCK)
-        data = ws.get_all_records()
-        df = pd.DataFrame(data)
-        
-        # ลบช่องว่างหัวตาราง (เผื่อมีเว้นวรรคหน้าหลัง)
-        df.columns = df.columns.astype(str).str.strip()
-        
-        # ==========================================
-        # 🛠️ MAPPING COLUMN (อัปเดตใหม่ตามไฟล์ JST)
-        # ==========================================
-        col_map = {
-            # --- 1. รหัสสินค้า (Product ID) ---
-            'รหัสสินค้า': 'Product_ID', 'รหัส': 'Product_ID', 'ID': 'Product_ID',
-            'รหัสSKU': 'Product_ID',  # <--- อัปเดตใหม่
-            
-            # --- 2. ชื่อสินค้า (Product Name) ---
-            'ชื่อสินค้า': 'Product_Name', 'ชื่อ': 'Product_Name', 'Name': 'Product_Name',
-            
-            # --- 3. รูปภาพ (Image) ---
-            'รูป': 'Image', 'รูปภาพ': 'Image', 'Link รูป': 'Image',
-            'รูปภาพ SKU': 'Image',    # <--- อัปเดตใหม่
-            'รูปภาพ SPU': 'Image',    # (สำรอง)
-            
-            # --- 4. จำนวนสต็อก (Initial Stock) ---
-            'Stock': 'Initial_Stock', 'จำนวน': 'Initial_Stock', 'สต็อก': 'Initial_Stock', 'คงเหลือ': 'Initial_Stock',
-            'สินค้าคงคลัง': 'Initial_Stock', 
-            'จํานวนที่ใช้ได้': 'Initial_Stock', # <--- อัปเดตใหม่
-            
-            # --- 5. จุดเตือนขั้นต่ำ (Min Limit) ---
-            'Min_Limit': 'Min_Limit', 'Min': 'Min_Limit', 'จุดเตือน': 'Min_Limit',
-            'สต็อกความปลอดภัยน้อยสุด': 'Min_Limit',
-            'จำนวนน้อยสุดในการเติมสินค้า (MIN)': 'Min_Limit', # <--- อัปเดตใหม่
-            
-            # --- 6. หมวดหมู่ (Type) ---
-            'Type': 'Product_Type', 'หมวดหมู่': 'Product_Type', 'Category': 'Product_Type', 'กลุ่ม': 'Product_Type',
+        if not mirror_is_current(TAB_NAME_PO): return None
+        found = get_local_mirror().select_rows(TAB_NAME_PO, **filters)
+    except Exception as e:
+        print(f"Local mirror query failed ({TAB_NAME_PO}): {e}")
+        return None
+    if found is None: return None
+    grid, row_indexes = found
+    df = po_frame_from_records(grid_records(grid))
+    if not df.empty: df['Sheet_Row_Index'] = row_indexes
+    return df
+
+def mirror_po_keys(query):
+    """[(เลข PO, รหัสสินค้า)] ที่ขึ้นต้นด้วยคำค้น จาก index ในสำเนา หรือ None ถ้าใช้สำเนาไม่ได้"""
+    try:
+        if not mirror_is_current(TAB_NAME_PO): return None
+        return get_local_mirror().search_keys(TAB_NAME_PO, query, PO_SEARCH_LIMIT)
+    except Exception as e:
+        print(f"Local mirror query failed ({TAB_NAME_PO}): {e}")
+        return None
 
-            # --- 7. (ใหม่) หมายเหตุ ---
-            'หมายเหตุ': 'Note', 'Note': 'Note', 'Remark': 'Note', 'Remarks': 'Note'
-        }
-        
-        # เปลี่ยนชื่อคอลัมน์ตาม Map ที่ตั้งไว้
-        df = df.rename(columns={k:v for k,v in col_map.items() if k in df.columns})
-        
-        # เติมค่า Default หากคอลัมน์ขาดหายไป
-        if 'Initial_Stock' not in df.columns: df['Initial_Stock'] = 0
-        if 'Product_ID' not in df.columns: df['Product_ID'] = "Unknown"
-        if 'Product_Name' not in df.columns: df['Product_Name'] = df['Product_ID']
-        if 'Product_Type' not in df.columns: df['Product_Type'] = "ทั่วไป"
-        if 'Note' not in df.columns: df['Note'] = ""
-        
-        # แปลงข้อมูลตัวเลขให้ถูกต้อง
-        df['Initial_Stock'] = pd.to_numeric(df['Initial_Stock'], errors='coerce').fillna(0).astype(int)
+@traced(kind="sheet", cache="hit")
+def get_stock_from_sheet():
+    return load_stock_from_sheet(get_write_queue().revision(TAB_NAME_STOCK), sheet_source(TAB_NAME_STOCK))
+
+@st.cache_data(ttl=300)
+def load_stock_from_sheet(queue_revision, source):
+    cache_miss()
+    try:
+        # Mapping คอลัมน์ / ค่า Default / ชนิดข้อมูล (ดู jst/sheet_frames.py)
+        df = master_frame_from_grid(read_sheet_grid(TAB_NAME_STOCK, source))
         
+        # version ของข้อมูลชุดนี้ (ใช้เป็น key ของ Report Cache)
+        df.attrs['version'] = time.time_ns()
         return df
     except Exception as e:
         st.error(f"❌ อ่านข้อมูล Master Stock ไม่ได้: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=300)
+@traced(kind="sheet", cache="hit")
 def get_po_data():
+    return load_po_data(get_write_queue().revision(TAB_NAME_PO), sheet_source(TAB_NAME_PO))
+
+@st.cache_data(ttl=300)
+def load_po_data(queue_revision, source):
+    cache_miss()
     try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_PO)
-        data = ws.get_all_records()
-        df = pd.DataFrame(data)
-        
-        col_map = {
-            'รหัสสินค้า': 'Product_ID', 'เลข PO': 'PO_Number', 'ขนส่ง': 'Transport_Type',
-            'วันที่สั่งซื้อ': 'Order_Date', 
-            'Expected_Date': 'Expected_Date', 'วันที่คาดว่าจะได้รับ': 'Expected_Date', 'วันที่คาดการณ์': 'Expected_Date',
-            'วันที่ได้รับ': 'Received_Date', 
-            'จำนวน': 'Qty_Ordered',          
-            'จำนวนที่ได้รับ': 'Qty_Received', 
-            'ราคา/ชิ้น': 'Price_Unit_NoVAT', 'ราคา (หยวน)': 'Total_Yuan', 'เรทเงิน': 'Yuan_Rate',
-            'เรทค่าขนส่ง': 'Ship_Rate', 'ขนาด (คิว)': 'CBM', 'ค่าส่ง': 'Ship_Cost', 'น้ำหนัก / KG': 'Transport_Weight',
-            'SHOPEE': 'Shopee_Price', 'LAZADA': 'Lazada_Price', 'TIKTOK': 'TikTok_Price', 'หมายเหตุ': 'Note',
-            'ราคา (บาท)': 'Total_THB', 'Link_Shop': 'Link', 'WeChat': 'WeChat'
-        }
-        df = df.rename(columns={k:v for k,v in col_map.items() if k in df.columns})
-
-        if not df.empty:
-            df['Sheet_Row_Index'] = range(2, len(df) + 2)
-            for col in ['Qty_Ordered', 'Qty_Received', 'Total_Yuan', 'Yuan_Rate']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-            if 'Qty_Received' not in df.columns: df['Qty_Received'] = 0
-            if 'Expected_Date' not in df.columns: df['Expected_Date'] = None
+        # Mapping คอลัมน์ / ชนิดข้อมูล (ดู jst/sheet_frames.py)
+        df = po_frame_from_records(read_sheet_records(TAB_NAME_PO, source))
                  
+        # version ของข้อมูลชุดนี้ (ใช้เป็น key ของ Report Cache)
+        df.attrs['version'] = time.time_ns()
         return df
     except Exception as e:
         st.error(f"❌ อ่านข้อมูล PO ไม่ได้: {e}")
         return pd.DataFrame()
+
 def get_next_auto_po():
-    """ฟังก์ชันคำนวณหาเลข รอเลขสินค้าเข้าXXX ตัวถัดไป"""
-    prefix = "รอเลขสินค้าเข้า"
-    
-    # ดึงข้อมูล PO ปัจจุบันมาเช็ค
+    """เลข รอเลขสินค้าเข้าXXX ถัดไป จากข้อมูล PO (ใช้เป็น seed ของตัวจองเลข และสำรองเมื่อจองไม่ได้)"""
     df = get_po_data()
-    
-    if df.empty:
-        return f"{prefix}001"
+    if df.empty or 'PO_Number' not in df.columns: return format_auto_po(1)
+    return format_auto_po(max_auto_po_number(df['PO_Number']) + 1)
 
-    # กรองเฉพาะ PO ที่ขึ้นต้นด้วย prefix นี้
-    # แปลงเป็น string ก่อนเผื่อมีข้อมูลขยะ
-    mask = df['PO_Number'].astype(str).str.startswith(prefix)
-    existing_pos = df.loc[mask, 'PO_Number'].unique()
+@st.cache_resource
+def get_po_allocator():
+    """ตัวจองเลข PO อัตโนมัติ (ดู jst/po_allocator.py)"""
+    def seed():
+        df = get_po_data()
+        return max_auto_po_number(df['PO_Number']) if 'PO_Number' in df.columns else 0
+    return AutoPoAllocator(get_storage(), seed)
+
+def reserve_auto_po(cart_key):
+    """เลข PO อัตโนมัติ 1 เลขต่อ 1 ตะกร้า: จองครั้งแรกที่ต้องใช้ แล้วใช้เลขเดิมจนกว่าจะบันทึกสำเร็จ (release_auto_po)"""
+    state_key = f"{cart_key}_auto_po"
+    if not st.session_state.get(state_key):
+        try:
+            st.session_state[state_key] = get_po_allocator().reserve(st.session_state.get('user_email', ''))
+        except Exception as e:
+            print(f"Auto PO reserve failed: {e}")
+            st.warning(f"⚠️ จองเลข PO อัตโนมัติไม่ได้ ใช้เลขจากข้อมูล PO ปัจจุบันแทน: {e}")
+            st.session_state[state_key] = get_next_auto_po()
+    return st.session_state[state_key]
 
-    if len(existing_pos) == 0:
-        return f"{prefix}001"
+def release_auto_po(cart_key):
+    st.session_state.pop(f"{cart_key}_auto_po", None)
 
-    max_num = 0
-    for po in existing_pos:
-        try:
-            # ตัด prefix ออกแล้วแปลงเป็นตัวเลข
-            num_part = str(po).replace(prefix, "")
-            num_val = int(num_part)
-            if num_val > max_num:
-                max_num = num_val
-        except:
-            continue
 
-    new_num = max_num + 1
-    return f"{prefix}{new_num:03d}"
+@st.cache_resource
+def get_sales_store():
+    # ยอดขายทั้งหมดเก็บเป็น Parquet แบ่งตาม ปี/เดือน (ดู jst/sales_store.py)
+    return SalesStore(os.path.join(CACHE_ROOT, "sale", "store"))
+
+def latest_sale_date(index):
+    known = [entry['date_max'] for entry in index if entry['date_max']]
+    return date.fromisoformat(max(known)) if known else None
+
+def load_sale_file_index(storage, store):
+    """รายชื่อไฟล์ยอดขาย + sync ไฟล์ที่มียอดขายวันล่าสุดไว้ล่วงหน้า (หน้าแรกใช้ช่วงนี้ทุกครั้ง)"""
+    cache_miss()
+    with span("drive_list", kind="drive") as list_span:
+        items = storage.list_files(FOLDER_ID_DATA_SALE)
+        list_span.set(rows=len(items))
+    index = build_file_index(items, "sale", store=store)
+    latest = latest_sale_date(index)
+    if latest:
+        try:
+            selected = select_files_in_range(index, latest, None)
+            sync_folder(storage.download, index, "sale", parse_sale_excel, selected_ids={entry['id'] for entry in selected}, store=store, **INGEST_OPTIONS)
+        except Exception as e:
+            print(f"Sale pre-sync failed: {e}")
+    return index
+
+@traced(kind="drive", cache="hit")
+def get_sale_file_index():
+    """รายชื่อไฟล์ยอดขายทั้งหมดใน Folder (ทุกหน้า) พร้อมช่วงวันที่ที่แต่ละไฟล์ครอบคลุม"""
+    storage, store = get_storage(), get_sales_store()
+    try:
+        return get_refresher().get("sale_index", lambda: load_sale_file_index(storage, store), REFRESH_INTERVALS["sale_index"], label="ไฟล์ยอดขาย")
+    except Exception as e:
+        st.warning(f"⚠️ อ่านรายชื่อไฟล์ Sale ไม่ได้: {e}")
+        return []
 
+def get_latest_sale_date():
+    return latest_sale_date(get_sale_file_index())
 
 @st.cache_data(ttl=300)
-def get_sale_from_folder():
+def sync_sale_files(date_from=None, date_to=None):
+    """Sync เฉพาะไฟล์ยอดขายที่ครอบคลุมช่วง date_from..date_to (None = ไม่จำกัด) ลง Sales Store
+    คืน True ถ้ามีไฟล์ยอดขายในช่วงนั้น"""
+    cache_miss()
     try:
-        creds = get_credentials()
-        service = build('drive', 'v3', credentials=creds)
-        results = service.files().list(q=f"'{FOLDER_ID_DATA_SALE}' in parents and trashed=false", orderBy='modifiedTime desc', pageSize=100, fields="files(id, name)").execute()
-        items = results.get('files', [])
-        if not items: return pd.DataFrame()
-        
-        all_dfs = [] 
-        for item in items:
-            if not item['name'].endswith(('.xlsx', '.xls')): continue
-            try:
-                request = service.files().get_media(fileId=item['id'])
-                fh = io.BytesIO()
-                downloader = MediaIoBaseDownload(fh, request)
-                done = False
-                while done is False: status, done = downloader.next_chunk()
-                fh.seek(0)
-                temp_df = pd.read_excel(fh)
-                col_map = {'รหัสสินค้า':'Product_ID', 'จำนวน':'Qty_Sold', 'ร้านค้า':'Shop', 'เวลาสั่งซื้อ':'Order_Time'}
-                temp_df = temp_df.rename(columns={k:v for k,v in col_map.items() if k in temp_df.columns})
-                
-                if 'Qty_Sold' in temp_df.columns: 
-                    temp_df['Qty_Sold'] = pd.to_numeric(temp_df['Qty_Sold'], errors='coerce').fillna(0).astype(int)
-                if 'Order_Time' in temp_df.columns:
-                    temp_df['Order_Time'] = pd.to_datetime(temp_df['Order_Time'], errors='coerce')
-                    temp_df['Date_Only'] = temp_df['Order_Time'].dt.date
-                
-                if not temp_df.empty: all_dfs.append(temp_df)
-            except: continue
-
-        return pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+        index = get_sale_file_index()
+        if not index: return False
+        selected = select_files_in_range(index, date_from, date_to)
+        if not selected: return False
+        
+        # โหลดเฉพาะไฟล์ใหม่/ที่ถูกแก้ไข (แบบขนาน) ไฟล์เดิมอยู่ใน Sales Store แล้ว
+        sync_folder(
+            get_storage().download, index, "sale", parse_sale_excel,
+            selected_ids={entry['id'] for entry in selected}, store=get_sales_store(), **INGEST_OPTIONS
+        )
+        return True
     except Exception as e:
         st.warning(f"⚠️ อ่านไฟล์ Excel Sale ไม่ทัน: {e}")
-        return pd.DataFrame()
-@st.cache_data(ttl=60)
-def get_actual_stock_from_folder():
-    """ฟังก์ชันดึงยอดคงเหลือจริง (Fixed: แก้ปัญหาคอลัมน์ซ้ำ)"""
-    # st.info("กำลังอ่านไฟล์ Stock...") # (เอาออกได้ถ้าไม่อยากให้รกหน้าจอ)
-    
-    try:
-        creds = get_credentials()
-        service = build('drive', 'v3', credentials=creds)
-        
-        results = service.files().list(
-            q=f"'{FOLDER_ID_STOCK_ACTUAL}' in parents and trashed=false", 
-            orderBy='modifiedTime desc', pageSize=10, fields="files(id, name)"
-        ).execute()
-        items = results.get('files', [])
-        
-        if not items: return pd.DataFrame()
-        
-        all_dfs = [] 
-        for item in items:
-            if not item['name'].endswith(('.xlsx', '.xls')): continue
-            try:
-                # 1. โหลดไฟล์
-                request = service.files().get_media(fileId=item['id'])
-                fh = io.BytesIO()
-                downloader = MediaIoBaseDownload(fh, request)
-                done = False
-                while done is False: status, done = downloader.next_chunk()
-                fh.seek(0)
-                
-                # 2. หาบรรทัดหัวตาราง (Header)
-                temp_raw = pd.read_excel(fh, header=None)
-                header_row = 0
-                for i in range(min(15, len(temp_raw))):
-                    row_str = temp_raw.iloc[i].astype(str).str.cat(sep=' ')
-                    if 'SKU' in row_str or 'รหัส' in row_str:
-                        header_row = i
-                        break
-                
-                # 3. อ่านข้อมูลจริง
-                fh.seek(0)
-                temp_df = pd.read_excel(fh, header=header_row)
-                temp_df.columns = temp_df.columns.astype(str).str.strip() # ล้างชื่อคอลัมน์
-                
-                # =========================================================
-                # 🏆 COLUMN SELECTION (เลือกคอลัมน์ที่ดีที่สุดเพียง 1 เดียว)
-                # =========================================================
-                col_map = {}
-                
-                # หา ID (เลือกตัวแรกที่เจอ)
-                for col in temp_df.columns:
-                    if col in ['รหัสSKU', 'SKU', 'รหัสสินค้า', 'รหัส', 'Item No']:
-                        col_map[col] = 'Product_ID'
-                        break # เจอแล้วหยุดเลย
-                
-                # หา Stock (มีลำดับความสำคัญ)
-                best_stock_col = None
-                
-                # ลำดับ 1: เจาะจงคำว่า "ใช้ได้" (ตามไฟล์คุณ)
-                for col in temp_df.columns:
-                    if 'ใช้ได้' in col: 
-                        best_stock_col = col
-                        break
-                
-                # ลำดับ 2: ถ้าไม่เจอ หาคำว่า "คงเหลือ"
-                if not best_stock_col:
-                    for col in temp_df.columns:
-                        if 'คงเหลือ' in col: 
-                            best_stock_col = col
-                            break
-                            
-                # ลำดับ 3: ถ้าไม่เจอ หาคำว่า "Stock" หรือ "จำนวน"
-                if not best_stock_col:
-                    for col in temp_df.columns:
-                        if 'Stock' in col or 'จำนวน' in col:
-                            best_stock_col = col
-                            break
-                
-                # Map ชื่อคอลัมน์
-                if best_stock_col:
-                    col_map[best_stock_col] = 'Real_Stock'
-
-                # =========================================================
+        return False
 
-                # เปลี่ยนชื่อและดึงข้อมูล
-                if 'Product_ID' in col_map.values() and 'Real_Stock' in col_map.values():
-                    temp_df = temp_df.rename(columns={k:v for k,v in col_map.items() if k in temp_df.columns})
-                    
-                    # แปลงข้อมูล (Clean Data)
-                    temp_df['Real_Stock'] = pd.to_numeric(temp_df['Real_Stock'], errors='coerce').fillna(0).astype(int)
-                    temp_df['Product_ID'] = temp_df['Product_ID'].astype(str).str.strip()
-                    
-                    # กรองแถวที่ไม่มีข้อมูล
-                    temp_df = temp_df[temp_df['Product_ID'].str.len() > 1]
-                    
-                    all_dfs.append(temp_df[['Product_ID', 'Real_Stock']])
-                    
-            except Exception as err:
-                print(f"Skip file {item['name']}: {err}")
-                continue
+@traced(kind="drive", cache="hit")
+def get_sales_cube(date_from=None, date_to=None):
+    """ยอดขายรวมรายวัน (Product_ID x วัน x ร้าน) หลัง sync ช่วงวันที่ที่ต้องใช้ (None = ไม่มีไฟล์ยอดขาย)"""
+    if not sync_sale_files(date_from, date_to): return None
+    return get_sales_store().cube()
+
+@traced(kind="drive", cache="hit")
+def get_sale_from_folder(date_from=None, date_to=None):
+    """รายการขายดิบในช่วง date_from..date_to อ่านเฉพาะ Partition เดือนที่อยู่ในช่วง"""
+    if not sync_sale_files(date_from, date_to): return pd.DataFrame()
+    df = get_sales_store().query(date_from, date_to)
+    if not df.empty: df['Date_Only'] = df['Order_Time'].dt.normalize()
+    return df
+
+def load_actual_stock(storage):
+    """ยอดคงเหลือจริงจากไฟล์ Stock ใน Folder รวมตาม Product_ID (Fixed: แก้ปัญหาคอลัมน์ซ้ำ)"""
+    cache_miss()
+    with span("drive_list", kind="drive"):
+        items = storage.list_files(FOLDER_ID_STOCK_ACTUAL, limit=10)
+    
+    if not items: return pd.DataFrame()
+    
+    # ดาวน์โหลด + parse (Streaming) เฉพาะไฟล์ที่เปลี่ยน พร้อมกันหลายไฟล์ ไฟล์เดิมอ่านจาก cache
+    # Layout หัวตารางของแต่ละไฟล์ถูกจำไว้ ไม่ต้องค้นหาใหม่ทุกรอบ
+    all_dfs = sync_folder_frames(
+        storage.download, items, "stock", parse_stock_excel,
+        reuse_layouts=True, **INGEST_OPTIONS
+    )
+
+    if all_dfs:
+        final_df = pd.concat(all_dfs, ignore_index=True)
+        df_stock = final_df.groupby('Product_ID', as_index=False)['Real_Stock'].sum()
+        df_stock.attrs['version'] = time.time_ns()
+        return df_stock
+    
+    return pd.DataFrame()
 
-        if all_dfs:
-            final_df = pd.concat(all_dfs, ignore_index=True)
-            return final_df.groupby('Product_ID', as_index=False)['Real_Stock'].sum()
-        
-        return pd.DataFrame()
+@traced(kind="drive", cache="hit")
+def get_actual_stock_from_folder():
+    """ยอดคงเหลือจริง (โหลดใหม่เบื้องหลังทุก REFRESH_INTERVALS["stock_files"] วินาที ห้ามแก้ไข DataFrame ที่ได้)"""
+    storage = get_storage()
+    try:
+        return get_refresher().get("stock_files", lambda: load_actual_stock(storage), REFRESH_INTERVALS["stock_files"], label="ไฟล์ Stock")
     except Exception as e:
         st.warning(f"⚠️ เกิดข้อผิดพลาด: {e}")
         return pd.DataFrame()
 
-# --- Functions: Save Data ---
-def save_po_edit_split(row_index, current_row_data, new_row_data):
-    try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_PO)
-        
-        formatted_curr = []
-        for item in current_row_data:
-            if isinstance(item, (date, datetime)): formatted_curr.append(item.strftime("%Y-%m-%d"))
-            elif item is None: formatted_curr.append("")
-            else: formatted_curr.append(item)
-        
-        range_name = f"A{row_index}:X{row_index}" 
-        ws.update(range_name, [formatted_curr])
-        
-        formatted_new = []
-        for item in new_row_data:
-            if isinstance(item, (date, datetime)): formatted_new.append(item.strftime("%Y-%m-%d"))
-            elif item is None: formatted_new.append("")
-            else: formatted_new.append(item)
-            
-        ws.append_row(formatted_new)
-        
-        st.cache_data.clear() 
-        return True
-    except Exception as e:
-        st.error(f"❌ บันทึก Split ไม่สำเร็จ: {e}")
-        return False
+def add_po_search_columns(df_po):
+    """คอลัมน์ช่วยค้นหาใน po_edit_dialog_v2 (เลข PO / รหัสสินค้า เป็นข้อความตัดช่องว่าง)"""
+    if not df_po.empty:
+        df_po['PO_Str'] = df_po['PO_Number'].astype(str).str.strip()
+        df_po['PID_Str'] = df_po['Product_ID'].astype(str).str.strip()
+    return df_po
+
+@traced(kind="sheet")
+def read_po_sheet_fresh():
+    """อ่าน Tab PO_DATA ทั้งหมดแบบไม่ผ่าน cache (รวมรายการที่รอเขียนในคิว) + คอลัมน์ช่วยค้นหา (ใช้ใน po_edit_dialog_v2)
+    ชนิดข้อมูลเหมือน get_po_data() (ดู jst/sheet_frames.py)"""
+    return add_po_search_columns(po_frame_from_records(grid_records(read_sheet_grid_fresh(TAB_NAME_PO))))
+
+def build_po_lookup(df_po_fresh):
+    """index สำหรับค้นหารายการใน po_edit_dialog_v2 (สร้างครั้งเดียวต่อข้อมูล 1 ชุด)
+    คืน (ข้อความที่แสดง -> ตำแหน่งแถว, (PO, PID) -> ตำแหน่งแถว, ข้อความเรียงให้ "รอของ" ขึ้นก่อน, (PO, PID) -> [ข้อความ])"""
+    if df_po_fresh.empty: return {}, {}, [], {}
+    qty_ord = pd.to_numeric(df_po_fresh.get('Qty_Ordered', 0), errors='coerce')
+    qty_ord = pd.Series(qty_ord, index=df_po_fresh.index).fillna(0).astype(int)
+    recv_date = df_po_fresh['Received_Date'].astype(str).str.strip() if 'Received_Date' in df_po_fresh.columns else pd.Series('', index=df_po_fresh.index)
+    is_received = (recv_date != '') & (recv_date.str.lower() != 'nat')
+    status_icon = np.where(is_received, "✅ รับแล้ว", np.where(qty_ord <= 0, "✅ ครบ/ปิด", "⏳ รอของ"))
+
+    po_val = df_po_fresh['PO_Number'].astype(str)
+    pid_val = df_po_fresh['Product_ID'].astype(str)
+    display_text = "[" + pd.Series(status_icon, index=df_po_fresh.index) + "] " + po_val + " : " + pid_val + " (สั่ง: " + qty_ord.astype(str) + ")"
+
+    positions = range(len(df_po_fresh))
+    po_map = dict(zip(display_text, positions))
+    po_map_key = dict(zip(zip(po_val.str.strip(), pid_val.str.strip()), positions))
+    sorted_keys = sorted(po_map.keys(), key=lambda x: "⏳" not in x)
+    key_texts = {}
+    for text in sorted_keys:
+        row = df_po_fresh.iloc[po_map[text]]
+        key_texts.setdefault((str(row['PO_Number']).strip(), str(row['Product_ID']).strip()), []).append(text)
+    return po_map, po_map_key, sorted_keys, key_texts
+
+def po_search_options(query, po_lookup, keep=()):
+    """ตัวเลือกรายการใน po_edit_dialog_v2: ไม่มีคำค้น = ทุกรายการ, มีคำค้น = เลข PO / รหัสสินค้าที่ขึ้นต้นด้วยคำค้น
+    ค้นจาก index ในสำเนา SQLite (mirror_po_keys) ถ้าใช้สำเนาไม่ได้กรองจาก key_texts แทน + รายการที่เลือกไว้แล้ว"""
+    po_map, _, sorted_keys, key_texts = po_lookup
+    query = str(query or "").strip()
+    if not query: return sorted_keys
+    pairs = mirror_po_keys(query)
+    if pairs is None:
+        q = query.lower()
+        pairs = [k for k in key_texts if k[0].lower().startswith(q) or k[1].lower().startswith(q)][:PO_SEARCH_LIMIT]
+    found = sorted((t for pair in pairs for t in key_texts.get(tuple(pair), [])), key=lambda x: "⏳" not in x)
+    kept = [k for k in dict.fromkeys(keep) if isinstance(k, str) and k in po_map and k not in found]
+    return kept + found
+
+def get_po_fresh_version():
+    # version ของไฟล์บน Drive (หรือไฟล์ในเครื่อง) + รอบการแก้ไขในคิวที่ยังไม่ถึง Sheet
+    return get_storage().sheet_version(), get_write_queue().revision(TAB_NAME_PO)
 
-def save_po_edit_update(row_index, current_row_data):
-    try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_PO)
-        
-        formatted_curr = []
-        for item in current_row_data:
-            if isinstance(item, (date, datetime)): formatted_curr.append(item.strftime("%Y-%m-%d"))
-            elif item is None: formatted_curr.append("")
-            else: formatted_curr.append(item)
-        
-        range_name = f"A{row_index}:X{row_index}" 
-        ws.update(range_name, [formatted_curr])
-        
-        st.cache_data.clear() 
-        return True
-    except Exception as e:
-        st.error(f"❌ บันทึก Update ไม่สำเร็จ: {e}")
-        return False
+@st.cache_resource
+def get_po_snapshot():
+    """PO_DATA สดสำหรับหน้าแก้ไข: เช็ค version ของ Spreadsheet ก่อน ถ้าไม่เปลี่ยนใช้ข้อมูล + index เดิม"""
+    return SheetSnapshot(read_po_sheet_fresh, get_po_fresh_version, build_po_lookup, probe_interval=PO_FRESH_PROBE_SECONDS)
 
-def save_po_batch_to_sheet(rows_data):
-    try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_PO)
-        ws.append_rows(rows_data)
-        st.cache_data.clear() 
-        return True
-    except Exception as e:
-        st.error(f"❌ บันทึก Batch ไม่สำเร็จ: {e}")
+# --- Cache Invalidation: ล้างเฉพาะข้อมูลที่ถูกเขียน (Cache ยอดขาย / Stock จากไฟล์ไม่เกี่ยว ใช้ต่อได้) ---
+PO_REPORTS = ("po_base", "po_table")
+MASTER_REPORTS = ("daily_sales", "po_base", "po_table", "master_rows", "catalog")
+
+def invalidate_po_cache():
+    get_refresher().invalidate(f"sheet:{TAB_NAME_PO}")
+    load_po_data.clear()
+    get_po_snapshot().invalidate()
+    get_report_cache().invalidate(PO_REPORTS)
+
+def invalidate_master_cache():
+    get_refresher().invalidate(f"sheet:{TAB_NAME_STOCK}")
+    load_stock_from_sheet.clear()
+    get_report_cache().invalidate(MASTER_REPORTS)
+
+# --- Functions: Save Data ---
+# บันทึกผ่าน Write Queue: ข้อมูลในแอปเปลี่ยนทันที ส่วนการเขียนลง Google Sheet ทำเบื้องหลัง (สถานะแสดงที่ Sidebar)
+def queue_po_write(ops, label):
+    if is_read_only(TAB_NAME_PO):
+        st.error("📴 Google Sheet ไม่ตอบสนอง กำลังใช้สำเนาในเครื่อง (อ่านอย่างเดียว) กรุณาลองใหม่ภายหลัง")
         return False
-def delete_po_row_from_sheet(row_index):
     try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_PO)
-        
-        # ลบแถวตาม Index (Google Sheet เริ่มนับแถว 1, ข้อมูลเริ่มแถว 2)
-        ws.delete_rows(int(row_index))
-        
-        st.cache_data.clear() # ล้าง Cache เพื่อให้ข้อมูลอัปเดตทันที
+        get_write_queue().submit(TAB_NAME_PO, ops, label)
+        get_po_snapshot().invalidate()
         return True
     except Exception as e:
-        st.error(f"❌ ลบข้อมูลไม่สำเร็จ: {e}")
+        st.error(f"❌ บันทึก PO ไม่สำเร็จ: {e}")
         return False
 
+@traced(kind="write")
+def save_po_rows_batch(updates, appends=()):
+    """บันทึกหลายแถวของ PO เป็นชุดเดียว: updates = [(Sheet_Row_Index, ข้อมูลแถว), ...], appends = แถวใหม่ต่อท้าย"""
+    ops = [("write", (row_index, 1, [values])) for row_index, values in updates]
+    if appends: ops.append(("append", list(appends)))
+    return queue_po_write(ops, f"แก้ไข PO {len(updates)} แถว" + (f" + แยก {len(appends)} แถว" if appends else ""))
 
-def update_master_limits(df_edited):
+@traced(kind="write")
+def save_po_batch_to_sheet(rows_data):
+    return queue_po_write([("append", rows_data)], f"เพิ่ม PO {len(rows_data)} แถว")
+
+@traced(kind="write")
+def delete_po_row_from_sheet(row_index):
+    # ลบแถวตาม Index (Google Sheet เริ่มนับแถว 1, ข้อมูลเริ่มแถว 2)
+    return queue_po_write([("delete", int(row_index))], f"ลบ PO แถวที่ {int(row_index)}")
+
+def get_catalog(df_master):
+    """ตัวเลือก/ชื่อ/รูป/หมวดหมู่สินค้า สร้างครั้งเดียวต่อ version ของ Master (ดู jst/catalog.py)"""
+    return get_report_cache().get_or_compute(("catalog", frame_version(df_master)), lambda: ProductCatalog(df_master))
+
+def sku_select_options(catalog, query, keep=()):
+    """ตัวเลือกสินค้าสำหรับ Dropdown: ผลค้นหาที่ดีที่สุด SKU_OPTION_LIMIT รายการ + รายการที่เลือกไว้แล้ว (ไม่ให้หลุดจากตัวเลือก)"""
+    found = catalog.search_labels(query, SKU_OPTION_LIMIT) if query else catalog.labels[:SKU_OPTION_LIMIT]
+    kept = [k for k in dict.fromkeys(keep) if isinstance(k, str) and k and k not in found]
+    return kept + found
+
+def sku_search_input(key):
+    return st.text_input("🔍 ค้นหาสินค้า (รหัส / ชื่อ)", key=key, placeholder="พิมพ์รหัสหรือชื่อสินค้า แล้วกด Enter...")
+
+def get_master_row_index(df_master):
+    """Product_ID -> [เลขแถวใน Sheet] (สร้างครั้งเดียวต่อ version ของ Master)"""
+    return get_report_cache().get_or_compute(("master_rows", frame_version(df_master)), lambda: master_row_index(df_master))
+
+@traced(kind="write")
+def update_master_limits(df_master, df_view, edited_rows):
+    """บันทึกเฉพาะเซลล์ที่ถูกแก้ใน st.data_editor (edited_rows = {ตำแหน่งแถวใน df_view: {คอลัมน์: ค่าใหม่}})"""
+    if is_read_only(TAB_NAME_STOCK):
+        st.error("📴 Google Sheet ไม่ตอบสนอง กำลังใช้สำเนาในเครื่อง (อ่านอย่างเดียว) กรุณาลองใหม่ภายหลัง")
+        return
     try:
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_STOCK)
-        
-        headers = ws.row_values(1)
-        all_rows = ws.get_all_values()
-
-        # หา Index รหัสสินค้า (Product_ID)
-        pid_idx = -1
-        for i, h in enumerate(headers):
-            if h in ['รหัสสินค้า', 'รหัส', 'ID', 'Product_ID']:
-                pid_idx = i
-                break
-        
-        if pid_idx == -1: 
-            st.error("❌ ไม่พบคอลัมน์ Product_ID ใน Google Sheet")
+        header = list(df_master.attrs.get('sheet_header', []))
+        if 'Sheet_Row_Index' not in df_master.columns or not header:
+            st.error("❌ ไม่พบตำแหน่งแถวของ Master ใน Google Sheet")
             return
+        row_index = get_master_row_index(df_master)
 
-        # กำหนดคอลัมน์ที่จะอัปเดต: (ชื่อใน DF, ชื่อใน Sheet, ประเภทข้อมูล)
-        targets = [
-            ("Min_Limit", "Min_Limit", int),
-            ("Note", "Note", str)
-        ]
-
-        for df_col, sheet_header, dtype in targets:
-            # 1. ตรวจสอบ/สร้าง Header ใน Sheet ถ้ายังไม่มี
-            if sheet_header not in headers:
-                ws.update_cell(1, len(headers) + 1, sheet_header)
-                headers = ws.row_values(1) # โหลด Header ใหม่
-                col_index = len(headers)
-            else:
-                col_index = headers.index(sheet_header) + 1
-
-            # 2. เตรียมข้อมูลจากหน้าเว็บ (df_edited) ใส่ Dictionary
-            data_map = {}
-            for index, row in df_edited.iterrows():
-                pid = str(row['Product_ID']).strip()
-                raw_val = row.get(df_col, "")
-                
-                if dtype == int:
-                    try: clean_val = int(float(str(raw_val).replace(',', '').strip()))
-                    except: clean_val = 0
-                else:
-                    clean_val = str(raw_val) if pd.notna(raw_val) else ""
-                
-                data_map[pid] = clean_val
-
-            # 3. เตรียมข้อมูลสำหรับ Update (เทียบกับแถวเดิมใน Sheet)
-            values_to_update = []
-            for row in all_rows[1:]: # ข้าม Header
-                row_pid = str(row[pid_idx]).strip() if len(row) > pid_idx else ""
-                final_val = "" if dtype == str else 0
-                
-                # ถ้าเป็นสินค้าที่ถูกแก้ในหน้าเว็บ -> ใช้ค่าใหม่
-                if row_pid in data_map:
-                    final_val = data_map[row_pid]
-                else:
-                    # ถ้าไม่ได้แก้ (เช่น ติด Filter อยู่) -> ให้คงค่าเดิมใน Sheet ไว้
-                    if len(row) >= col_index:
-                        curr_val = row[col_index-1]
-                        if dtype == int:
-                            try: final_val = int(float(str(curr_val).replace(",", "")))
-                            except: final_val = 0
-                        else:
-                            final_val = str(curr_val)
-                
-                values_to_update.append([final_val])
-
-            # 4. บันทึกลง Sheet (Batch Update)
-            if values_to_update:
-                range_name = f"{gspread.utils.rowcol_to_a1(2, col_index)}:{gspread.utils.rowcol_to_a1(len(values_to_update)+1, col_index)}"
-                ws.update(range_name, values_to_update)
-
-        st.toast("✅ บันทึกข้อมูล (จุดเตือน & หมายเหตุ) สำเร็จ!", icon="💾")
-        st.cache_data.clear()
-        time.sleep(1)
+        ops, changed = master_limit_ops(header, row_index, df_view, edited_rows)
+        if not changed:
+            st.toast("ไม่มีข้อมูลที่เปลี่ยนแปลง", icon="ℹ️")
+            return
+        get_write_queue().submit(TAB_NAME_STOCK, ops, f"จุดเตือน & หมายเหตุ {changed} ช่อง")
+        st.toast(f"✅ บันทึกข้อมูล (จุดเตือน & หมายเหตุ) {changed} ช่อง แล้ว กำลังเขียนลง Sheet เบื้องหลัง", icon="💾")
             
     except Exception as e:
         st.error(f"❌ เกิดข้อผิดพลาด: {str(e)}")
 
+@st.fragment(run_every=WRITE_STATUS_REFRESH_SECONDS)
+def show_write_status():
+    """สถานะคิวบันทึกลง Google Sheet (อัปเดตเองทุกไม่กี่วินาที)"""
+    queue = get_write_queue()
+    status = queue.status()
+    if status['failed']:
+        st.error(f"❌ บันทึกลง Sheet ไม่สำเร็จ {status['failed']} รายการ: {status['error']}")
+        st.caption(" / ".join(status['failed_labels']))
+        c1, c2 = st.columns(2)
+        if c1.button("🔁 ลองใหม่", use_container_width=True):
+            queue.retry_failed()
+            st.rerun()
+        if c2.button("🗑️ ยกเลิก", use_container_width=True, help="ทิ้งรายการที่ค้างทั้งหมด แล้วโหลดข้อมูลจริงจาก Sheet"):
+            tabs = queue.discard_failed()
+            if TAB_NAME_PO in tabs: invalidate_po_cache()
+            if TAB_NAME_STOCK in tabs: invalidate_master_cache()
+            st.rerun()
+    elif status['pending']:
+        st.info(f"⏳ กำลังบันทึกลง Sheet {status['pending']} รายการ...")
+    offline = get_local_mirror().offline_tabs()
+    if offline:
+        st.warning(f"📴 Google Sheet ไม่ตอบสนอง: ใช้สำเนาในเครื่อง (อ่านอย่างเดียว) สำหรับ {', '.join(offline)}")
+        st.caption(" / ".join(offline.values()))
+
 # ==========================================
 # 5. Main App & Data Loading
 # ==========================================
@@ -700,7 +817,11 @@ st.title("📊 JST Hybrid Management System")
 with st.sidebar:
     if st.button("🔄 รีเฟรชข้อมูลล่าสุด", type="primary", use_container_width=True):
         st.cache_data.clear()
+        get_storage().reset()
+        get_refresher().invalidate_all()
         st.rerun()
+    if isinstance(get_storage(), LocalStorage): st.caption(f"💾 แหล่งข้อมูล: ไฟล์ในเครื่อง `{get_storage().root}`")
+    show_write_status()
     
     st.divider()
     st.subheader("📂 เมนูจัดการไฟล์")
@@ -718,19 +839,51 @@ if 'po_temp_cart' not in st.session_state: st.session_state.po_temp_cart = []
 with st.spinner('กำลังโหลดข้อมูล...'):
     df_master = get_stock_from_sheet()
     df_po = get_po_data()
-    df_sale = get_sale_from_folder()
-    
-    if not df_master.empty: df_master['Product_ID'] = df_master['Product_ID'].astype(str)
-    if not df_po.empty: df_po['Product_ID'] = df_po['Product_ID'].astype(str)
-    if not df_sale.empty: df_sale['Product_ID'] = df_sale['Product_ID'].astype(str)
+    # Sync เฉพาะไฟล์ที่มียอดขายวันล่าสุด (หน้าอื่น sync ช่วงวันที่ที่ต้องใช้เอง)
+    sales_cube = get_sales_cube(date_from=get_latest_sale_date())
+    # Product_ID เป็น str ตั้งแต่ตอนโหลดแล้ว (MASTER_SCHEMA / PO_SCHEMA)
+    catalog = get_catalog(df_master)
 
 recent_sales_map = {}
 latest_date_str = "ไม่พบข้อมูล"
-if not df_sale.empty and 'Date_Only' in df_sale.columns:
-    max_date = df_sale['Date_Only'].max()
-    latest_date_str = max_date.strftime("%d/%m/%Y")
-    df_latest_sale = df_sale[df_sale['Date_Only'] == max_date]
-    recent_sales_map = df_latest_sale.groupby('Product_ID')['Qty_Sold'].sum().fillna(0).astype(int).to_dict()
+if sales_cube is not None:
+    max_date, recent_sales_map = sales_cube.latest_day()
+    if max_date: latest_date_str = max_date.strftime("%d/%m/%Y")
+
+def show_data_status():
+    """เวลาของข้อมูลแต่ละแหล่งที่ใช้ในหน้านี้ (โหลดใหม่เบื้องหลัง ดู jst/refresher.py)"""
+    lines = []
+    for s in get_refresher().status():
+        if s['loaded_at'] is None: continue
+        icon = "⚠️" if s['stale'] else "🕒"
+        line = f"{icon} {s['label']}: {datetime.fromtimestamp(s['loaded_at']).strftime('%d/%m %H:%M:%S')}"
+        if s['error']: line += f" (โหลดใหม่ไม่สำเร็จ: {s['error'][:80]})"
+        lines.append(line)
+    if lines: st.caption("**ข้อมูล ณ**  \n" + "  \n".join(lines))
+
+with st.sidebar: show_data_status()
+
+def show_profiler(trace):
+    """เวลาแต่ละขั้นตอนของ rerun นี้: สรุปตามประเภทงาน + รายละเอียดทุก span (ดู jst/tracing.py)"""
+    total_ms = trace.duration * 1000
+    traced_ms = sum(s.duration for s in trace.spans if s.parent is None and s.duration is not None) * 1000
+    st.caption(f"รวม {total_ms:,.0f} ms · จับเวลาได้ {traced_ms:,.0f} ms · อื่นๆ (UI) {max(0, total_ms - traced_ms):,.0f} ms")
+    summary = trace.summary()
+    if summary:
+        st.dataframe(pd.DataFrame({"ประเภท": list(summary), "ms": list(summary.values())}), hide_index=True, use_container_width=True)
+    rows = [{
+        "ขั้นตอน": "· " * s.depth + s.name, "ประเภท": s.kind,
+        "ms": round(s.duration * 1000, 1) if s.duration is not None else None,
+        "แถว": s.rows, "KB": round(s.bytes / 1024, 1) if s.bytes else None,
+        "cache": s.cache or "", "error": s.error or "",
+    } for s in trace.spans]
+    if rows: st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    if TRACE_LOG_PATH: st.caption(f"Log: `{TRACE_LOG_PATH}`")
+
+# ขนาดหน่วยความจำของข้อมูลหลัก (ดูว่า Schema ช่วยลดได้เท่าไร)
+with st.sidebar.expander("🧠 หน่วยความจำข้อมูล", expanded=False):
+    frames = {"Master": df_master, "PO": df_po, "Daily Sales": sales_cube.table() if sales_cube is not None else None}
+    st.dataframe(memory_report(frames), hide_index=True, use_container_width=True)
 
 # ==========================================
 # DIALOGS
@@ -755,12 +908,6 @@ def show_history_dialog(fixed_product_id=None):
     <style>
         div[data-testid="stDialog"] { width: 98vw !important; min-width: 98vw !important; max-width: 98vw !important; left: 1vw !important; margin: 0 !important; }
         div[data-testid="stDialog"] > div { width: 100% !important; max-width: 100% !important; }
-        .po-table-container { overflow: auto; max-height: 75vh; margin-top: 10px; }
-        .custom-po-table { width: 100%; border-collapse: separate; font-size: 12px; color: #e0e0e0; min-width: 2000px; }
-        .custom-po-table th { background-color: #1e3c72; color: white; padding: 10px; text-align: center; border-bottom: 2px solid #fff; border-right: 1px solid #4a4a4a; position: sticky; top: 0; z-index: 10; white-space: nowrap; vertical-align: middle; }
-        .custom-po-table td { padding: 8px 5px; border-bottom: 1px solid #111; border-right: 1px solid #444; vertical-align: middle; text-align: center; }
-        .td-merged { border-right: 2px solid #666 !important; background-color: inherit; }
-        .status-badge { padding: 4px 8px; border-radius: 12px; font-weight: bold; font-size: 12px; display: inline-block; width: 100px;}
     </style>
     """, unsafe_allow_html=True)
     
@@ -768,45 +915,47 @@ def show_history_dialog(fixed_product_id=None):
     if not selected_pid:
         st.caption("ค้นหาและเลือกสินค้าเพื่อดูประวัติการสั่งซื้อทั้งหมด")
         if df_master.empty: return
-        product_options = df_master.apply(lambda x: f"{x['Product_ID']} : {x['Product_Name']}", axis=1).tolist()
-        selected_product = st.selectbox("🔍 ค้นหาสินค้า", options=product_options, index=None)
-        if selected_product: selected_pid = selected_product.split(" : ")[0]
+        query = sku_search_input("hist_sku_q")
+        options = sku_select_options(catalog, query, [st.session_state.get("hist_sel_prod")])
+        selected_product = st.selectbox("เลือกสินค้า", options=options, index=None, key="hist_sel_prod")
+        if selected_product: selected_pid = pid_from_label(selected_product)
     
     if selected_pid:
         if not df_po.empty:
-            df_history = df_po[df_po['Product_ID'] == selected_pid].copy()
+            # ประวัติรายสินค้า: ค้นด้วย index ในสำเนา SQLite ถ้าใช้ไม่ได้ (มีรายการในคิวที่ยังไม่อยู่ในสำเนา) กรองจาก df_po
+            df_history = mirror_po_rows(product_id=selected_pid)
+            if df_history is None: df_history = df_po[df_po['Product_ID'] == selected_pid].copy()
             
             if not df_history.empty:
-                df_history['Product_ID'] = df_history['Product_ID'].astype(str)
-                df_master_t = df_master.copy()
-                df_master_t['Product_ID'] = df_master_t['Product_ID'].astype(str)
+                # Product_ID / วันที่ ของ df_po และ df_master แปลงตั้งแต่ตอนโหลดแล้ว
                 cols_to_use = ['Product_ID', 'Product_Name', 'Image', 'Product_Type']
-                valid_cols = [c for c in cols_to_use if c in df_master_t.columns]
-                df_final = pd.merge(df_history, df_master_t[valid_cols], on='Product_ID', how='left')
-                
-                for col in ['Order_Date', 'Received_Date', 'Expected_Date']:
-                    if col in df_final.columns:
-                        df_final[col] = pd.to_datetime(df_final[col], errors='coerce')
-
-                # ฟังก์ชันเช็คสถานะ
-                def get_status_hist(row):
-                    qty_ord = float(row.get('Qty_Ordered', 0))
-                    qty_recv = float(row.get('Qty_Received', 0))
-                    if qty_recv >= qty_ord and qty_ord > 0: return "เรียบร้อย", "#d4edda", "#155724"
-                    if qty_recv > 0 and qty_recv < qty_ord: return "สินค้าไม่ครบ", "#fff3cd", "#856404"
-                    exp_date = row.get('Expected_Date')
-                    if pd.notna(exp_date):
-                        today_date = pd.Timestamp.today().normalize()
-                        diff_days = (exp_date - today_date).days
-                        if 0 <= diff_days <= 4: return "สินค้าใกล้ถึง", "#cce5ff", "#004085"
-                    return "รอจัดส่ง", "#f8f9fa", "#333333"
-
-                status_results = df_final.apply(get_status_hist, axis=1)
-                df_final['Status_Text'] = status_results.apply(lambda x: x[0])
-                df_final['Status_BG'] = status_results.apply(lambda x: x[1])
-                df_final['Status_Color'] = status_results.apply(lambda x: x[2])
+                valid_cols = [c for c in cols_to_use if c in df_master.columns]
+                df_final = pd.merge(df_history, df_master[valid_cols], on='Product_ID', how='left')
+
+                # เช็คสถานะ (ดู jst/status.py)
+                apply_po_status(df_final)
                 df_final = df_final.sort_values(by=['Order_Date', 'PO_Number', 'Received_Date'], ascending=[False, False, True])
 
+                # CSS ของตาราง (ตารางอยู่ใน iframe ของ Grid)
+                history_grid_css = """
+                    .custom-po-table { width: 100%; border-collapse: separate; font-family: sans-serif; font-size: 12px; color: #e0e0e0; min-width: 2000px; }
+                    .custom-po-table th { background-color: #1e3c72; color: white; padding: 10px; text-align: center; border-bottom: 2px solid #fff; border-right: 1px solid #4a4a4a; white-space: nowrap; vertical-align: middle; }
+                    .custom-po-table td { padding: 8px 5px; border-bottom: 1px solid #111; border-right: 1px solid #444; vertical-align: middle; text-align: center; }
+                    .custom-po-table tr.g0 { background-color: #222222; }
+                    .custom-po-table tr.g1 { background-color: #2e2e2e; }
+                    .td-merged { border-right: 2px solid #666 !important; background-color: inherit; }
+                    .status-badge { padding: 4px 8px; border-radius: 12px; font-weight: bold; font-size: 12px; display: inline-block; width: 100px;}
+                    .cell-main { font-weight: bold; }
+                    .cell-sub { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; max-width: 200px; margin: 0 auto; font-size: 12px; }
+                    .col-img img { width: 50px; height: 50px; }
+                    .col-qty-ord { color: #AED6F1; font-weight: bold; }
+                    .qty-recv { font-weight: bold; }
+                    .qty-mismatch { color: #ff4b4b; }
+                    a { text-decoration: none; font-size: 16px; }
+                    a.btn-link { margin-right: 5px; color: #007bff; }
+                    a.btn-chat { color: #25D366; }
+                """
+
                 # Helper functions
                 def fmt_num(val, decimals=2):
                     try: return f"{float(val):,.{decimals}f}"
@@ -814,103 +963,88 @@ def show_history_dialog(fixed_product_id=None):
                 def fmt_date(d):
                     if pd.isna(d) or str(d) == 'NaT': return "-"
                     return d.strftime("%d/%m/%Y")
-                grouped = df_final.groupby(['PO_Number', 'Product_ID'], sort=False)
-                table_html = "<div class='po-table-container'><table class='custom-po-table'><thead><tr><th>รหัสสินค้า</th><th>รูปสินค้า</th><th>สถานะ</th><th>เลข PO</th><th>ประเภทการนำเข้า</th><th style='background-color: #5f00bf;'>วันที่สั่งซื้อ</th><th style='background-color: #5f00bf;'>วันคาดการณ์</th><th style='background-color: #5f00bf;'>วันที่ได้รับ</th><th style='background-color: #5f00bf;'>ระยะเวลา</th><th style='background-color: #5f00bf;'>จำนวนที่ได้รับ</th><th style='background-color: #00bf00;'>จำนวนสั่งซื้อ</th><th style='background-color: #00bf00;'>ต้นทุน/ชิ้น (฿)</th><th>ยอดเงินหยวน (¥)</th><th>ยอดเงินบาทที่ใช้ (฿)</th><th>เรทเงิน</th><th>เรทค่าขนส่ง</th><th>ขนาด (คิว)</th><th>ค่าส่ง</th><th>น้ำหนัก / KG</th><th>ราคา / ชิ้น (หยวน)</th><th style='background-color: #ff6600;'>SHOPEE</th><th>LAZADA</th><th style='background-color: #000000;'>TIKTOK</th><th>หมายเหตุ</th><th>ร้านค้า</th></tr></thead><tbody>"
-
-                for group_idx, ((po, pid), group) in enumerate(grouped):
-                    row_count = len(group)
-                    first_row = group.iloc[0] 
-                    is_internal = (str(first_row.get('Transport_Type', '')).strip() == "สินค้าภายใน")
-
-                    total_order_qty = group['Qty_Ordered'].sum()
-                    if total_order_qty == 0: total_order_qty = 1 
-                    total_yuan = group['Total_Yuan'].sum()
-                    total_ship_cost = group['Ship_Cost'].sum()
-                    calc_total_thb_used = 0
-                    if is_internal:
-                        calc_total_thb_used = group['Total_THB'].sum()
-                    else:
-                        for _, r in group.iterrows():
-                            calc_total_thb_used += (float(r.get('Total_Yuan',0)) * float(r.get('Yuan_Rate',0)))
-
-                    cost_per_unit_thb = (calc_total_thb_used + total_ship_cost) / total_order_qty if total_order_qty > 0 else 0
-                    price_per_unit_yuan = total_yuan / total_order_qty if total_order_qty > 0 else 0
-                    rate = float(first_row.get('Yuan_Rate', 0))
-
-                    bg_color = "#222222" if group_idx % 2 == 0 else "#2e2e2e"
-                    s_text = first_row['Status_Text']
-                    s_bg = first_row['Status_BG']
-                    s_col = first_row['Status_Color']
-
-                    for idx, (i, row) in enumerate(group.iterrows()):
-                        table_html += f"<tr style='background-color: {bg_color};'>"
-                        if idx == 0:
-                            curr_token = st.query_params.get("token", "")
-                            ts = int(time.time() * 1000)
-                            full_pname = str(row.get("Product_Name", "")).replace('"', '&quot;').replace('\n', ' ')
-                            table_html += f"<td rowspan='{row_count}' class='td-merged' title='{full_pname}'>"
-                            table_html += f"<b>{row['Product_ID']}</b><br>"
-                            table_html += f"<div style='white-space: nowrap; overflow: hidden; text-overflow: ellipsis; max-width: 200px; margin: 0 auto; font-size: 12px;'>{full_pname}</div></td>"
-                            img_src = row.get('Image', '')
-                            img_html = f"<img src='{img_src}' width='50' height='50'>" if str(img_src).startswith('http') else ""
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{img_html}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'><span class='status-badge' style='background-color:{s_bg}; color:{s_col};'>{s_text}</span></td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{row['PO_Number']}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{row.get('Transport_Type', '-')}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_date(row['Order_Date'])}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_date(row.get('Expected_Date'))}</td>"
-                        recv_d = fmt_date(row['Received_Date'])
-                        table_html += f"<td>{recv_d}</td>"
-                        wait_val = "-"
-
-                        if pd.notna(row['Received_Date']) and pd.notna(row['Order_Date']):
-                            wait_val = f"{(row['Received_Date'] - row['Order_Date']).days} วัน"
-                        table_html += f"<td>{wait_val}</td>"
+
+                purple, green = "background-color: #5f00bf;", "background-color: #00bf00;"
+                grid_columns = [
+                    grid_column("รหัสสินค้า", merged=True),
+                    grid_column("รูปสินค้า", "col-img", merged=True),
+                    grid_column("สถานะ", merged=True),
+                    grid_column("เลข PO", merged=True),
+                    grid_column("ประเภทการนำเข้า", merged=True),
+                    grid_column("วันที่สั่งซื้อ", style=purple, merged=True),
+                    grid_column("วันคาดการณ์", style=purple, merged=True),
+                    grid_column("วันที่ได้รับ", style=purple),
+                    grid_column("ระยะเวลา", style=purple),
+                    grid_column("จำนวนที่ได้รับ", "qty-recv", style=purple),
+                    grid_column("จำนวนสั่งซื้อ", "col-qty-ord", style=green, merged=True),
+                    grid_column("ต้นทุน/ชิ้น (฿)", style=green, merged=True),
+                    grid_column("ยอดเงินหยวน (¥)", merged=True),
+                    grid_column("ยอดเงินบาทที่ใช้ (฿)", merged=True),
+                    grid_column("เรทเงิน", merged=True),
+                    grid_column("เรทค่าขนส่ง", merged=True),
+                    grid_column("ขนาด (คิว)", merged=True),
+                    grid_column("ค่าส่ง", merged=True),
+                    grid_column("น้ำหนัก / KG", merged=True),
+                    grid_column("ราคา / ชิ้น (หยวน)", merged=True),
+                    grid_column("SHOPEE", style="background-color: #ff6600;", merged=True),
+                    grid_column("LAZADA", merged=True),
+                    grid_column("TIKTOK", style="background-color: #000000;", merged=True),
+                    grid_column("หมายเหตุ", merged=True),
+                    grid_column("ร้านค้า", merged=True),
+                ]
+                grid_groups = []
+                curr_token = st.query_params.get("token", "")
+                ts = int(time.time() * 1000)
+
+                # ยอดสรุปของทุกกลุ่ม (PO + สินค้า) คำนวณครั้งเดียว ใช้ engine เดียวกับหน้ารายการสั่งซื้อ (ดู jst/po_groups.py)
+                for group_idx, (first_row, group_rows) in enumerate(iter_po_groups(df_final)):
+                    is_internal = first_row['Is_Internal']
+
+                    full_pname = str(first_row.get("Product_Name", "")).replace('\n', ' ')
+                    img_src = first_row.get('Image', '')
+                    link_val = str(first_row.get("Link", "")).strip()
+                    wechat_val = str(first_row.get("WeChat", "")).strip()
+                    icons = []
+                    if link_val and link_val.lower() not in ['nan', 'none', '']:
+                        icons.append(["🔗", f"?view_info={urllib.parse.quote(link_val)}&t={ts}_0&token={curr_token}", "btn-link"])
+                    if wechat_val and wechat_val.lower() not in ['nan', 'none', '']:
+                        icons.append(["💬", f"?view_info={urllib.parse.quote(wechat_val)}&t={ts}_0&token={curr_token}", "btn-chat"])
+
+                    dash_if_internal = lambda v: "-" if is_internal else v
+                    merged = [
+                        grid_cell(str(first_row['Product_ID']), sub=full_pname, title=full_pname),
+                        grid_cell(img=img_src) if str(img_src).startswith('http') else "",
+                        grid_cell(badge=first_row['Status_Text'], bg=first_row['Status_BG'], fg=first_row['Status_Color']),
+                        str(first_row['PO_Number']),
+                        str(first_row.get('Transport_Type', '-')),
+                        fmt_date(first_row['Order_Date']),
+                        fmt_date(first_row.get('Expected_Date')),
+                        f"{int(first_row['Total_Order_Qty']):,}",
+                        fmt_num(first_row['Cost_Per_Unit_THB']),
+                        dash_if_internal(fmt_num(first_row['Total_Yuan_Sum'])),
+                        fmt_num(first_row['THB_Used']),
+                        dash_if_internal(fmt_num(first_row['Rate'])),
+                        dash_if_internal(fmt_num(first_row.get('Ship_Rate',0))),
+                        dash_if_internal(fmt_num(first_row.get('CBM',0), 4)),
+                        dash_if_internal(fmt_num(first_row['Total_Ship_Cost'])),
+                        dash_if_internal(fmt_num(first_row.get('Transport_Weight',0))),
+                        dash_if_internal(fmt_num(first_row['Price_Per_Unit_Yuan'])),
+                        fmt_num(first_row.get('Shopee_Price',0)),
+                        fmt_num(first_row.get('Lazada_Price',0)),
+                        fmt_num(first_row.get('TikTok_Price',0)),
+                        str(first_row.get("Note","")).replace('\n', ' '),
+                        grid_cell(links=icons) if icons else "-",
+                    ]
+
+                    rows = []
+                    for row in group_rows:
+                        wait_val = f"{int(row['Wait_Days'])} วัน" if pd.notna(row['Wait_Days']) else "-"
                         qty_recv = int(row.get('Qty_Received', 0))
-                        q_style = "color: #ff4b4b; font-weight:bold;" if (qty_recv > 0 and qty_recv != int(row.get('Qty_Ordered', 0))) else "font-weight:bold;"
-                        table_html += f"<td style='{q_style}'>{qty_recv:,}</td>"
-                        if idx == 0:
-                            table_html += f"<td rowspan='{row_count}' class='td-merged' style='color:#AED6F1; font-weight:bold;'>{int(total_order_qty):,}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_num(cost_per_unit_thb)}</td>"
-                            val_yuan = "-" if is_internal else fmt_num(total_yuan)
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_yuan}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_num(calc_total_thb_used)}</td>"
-                            val_rate = "-" if is_internal else fmt_num(rate)
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_rate}</td>"
-                            val_ship_rate = "-" if is_internal else fmt_num(row.get('Ship_Rate',0))
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_ship_rate}</td>"
-                            val_cbm = "-" if is_internal else fmt_num(row.get('CBM',0), 4)
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_cbm}</td>"
-                            val_ship_cost = "-" if is_internal else fmt_num(total_ship_cost)
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_ship_cost}</td>"
-                            val_weight = "-" if is_internal else fmt_num(row.get('Transport_Weight',0))
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_weight}</td>"
-                            val_unit_yuan = "-" if is_internal else fmt_num(price_per_unit_yuan)
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{val_unit_yuan}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_num(row.get('Shopee_Price',0))}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_num(row.get('Lazada_Price',0))}</td>"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{fmt_num(row.get('TikTok_Price',0))}</td>"
-                            clean_note = str(row.get("Note","")).replace('\n', ' ')
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{clean_note}</td>"
-                            link_val = str(row.get("Link", "")).strip()
-                            wechat_val = str(row.get("WeChat", "")).strip()
-                            icons_html = ""
-                            import urllib.parse
-                            
-                            if link_val and link_val.lower() not in ['nan', 'none', '']:
-                                safe_link = urllib.parse.quote(link_val)
-                                icons_html += f"<a href='?view_info={safe_link}&t={int(time.time()*1000)}_{idx}&token={curr_token}' target='_self' style='text-decoration:none; font-size:16px; margin-right:5px; color:#007bff;'>🔗</a>"
-
-                            if wechat_val and wechat_val.lower() not in ['nan', 'none', '']:
-                                safe_wechat = urllib.parse.quote(wechat_val)
-                                icons_html += f"<a href='?view_info={safe_wechat}&t={int(time.time()*1000)}_{idx}&token={curr_token}' target='_self' style='text-decoration:none; font-size:16px; color:#25D366;'>💬</a>"
-                            
-                            final_icons = icons_html if icons_html else "-"
-                            table_html += f"<td rowspan='{row_count}' class='td-merged'>{final_icons}</td>"
-
-                        table_html += "</tr>"
-                table_html += "</tbody></table></div>"
-                st.markdown(table_html, unsafe_allow_html=True)
+                        q_cls = "qty-mismatch" if (qty_recv > 0 and qty_recv != int(row.get('Qty_Ordered', 0))) else None
+                        rows.append([fmt_date(row['Received_Date']), wait_val, grid_cell(f"{qty_recv:,}", cls=q_cls)])
+                    grid_groups.append((merged, rows))
+
+                render_grid(grid_columns, grid_groups, height=640, row_height=67, css=history_grid_css, table_class="custom-po-table")
             else: 
                 st.warning("❌ ไม่พบประวัติการสั่งซื้อสำหรับสินค้านี้")
         else: 
@@ -919,96 +1053,34 @@ def show_history_dialog(fixed_product_id=None):
 @st.dialog("📝 บันทึกรับของ / แก้ไข PO", width="large")
 def po_edit_dialog_v2(pre_selected_po=None, pre_selected_pid=None):
     selected_row, row_index = None, None
-    po_map = {}
-    po_map_key = {}
     
     # =================================================================================
-    # ⭐️ STEP 1: โหลดข้อมูล PO ใหม่สดๆ จาก Google Sheet (เพื่อแก้ปัญหา Cache ไม่อัปเดต)
+    # ⭐️ STEP 1: ข้อมูล PO สดจาก Google Sheet (โหลดใหม่เฉพาะเมื่อ Sheet มีการแก้ไข ดู get_po_snapshot)
     # =================================================================================
     try:
-        # ใช้ Credential เดิมที่มีอยู่
-        creds = get_credentials()
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(MASTER_SHEET_ID)
-        ws = sh.worksheet(TAB_NAME_PO)
-        
-        # ดึงข้อมูลทั้งหมดใหม่
-        fresh_po_data = ws.get_all_records()
-        df_po_fresh = pd.DataFrame(fresh_po_data)
-        
-        # Map column names ให้เหมือน df_po ปกติ
-        col_map = {
-            'รหัสสินค้า': 'Product_ID', 'เลข PO': 'PO_Number', 'ขนส่ง': 'Transport_Type',
-            'วันที่สั่งซื้อ': 'Order_Date', 
-            'Expected_Date': 'Expected_Date', 'วันที่คาดว่าจะได้รับ': 'Expected_Date', 'วันที่คาดการณ์': 'Expected_Date',
-            'วันที่ได้รับ': 'Received_Date', 
-            'จำนวน': 'Qty_Ordered',          
-            'จำนวนที่ได้รับ': 'Qty_Received', 
-            'ราคา/ชิ้น': 'Price_Unit_NoVAT', 'ราคา (หยวน)': 'Total_Yuan', 'เรทเงิน': 'Yuan_Rate',
-            'เรทค่าขนส่ง': 'Ship_Rate', 'ขนาด (คิว)': 'CBM', 'ค่าส่ง': 'Ship_Cost', 'น้ำหนัก / KG': 'Transport_Weight',
-            'SHOPEE': 'Shopee_Price', 'LAZADA': 'Lazada_Price', 'TIKTOK': 'TikTok_Price', 'หมายเหตุ': 'Note',
-            'ราคา (บาท)': 'Total_THB', 'Link_Shop': 'Link', 'WeChat': 'WeChat'
-        }
-        df_po_fresh = df_po_fresh.rename(columns={k:v for k,v in col_map.items() if k in df_po_fresh.columns})
-        
-        if not df_po_fresh.empty:
-            # สร้าง Index จำลองให้ตรงกับแถวใน Sheet (เริ่มที่ 2)
-            df_po_fresh['Sheet_Row_Index'] = range(2, len(df_po_fresh) + 2)
-            
-            # แปลงตัวเลขที่สำคัญ
-            for col in ['Qty_Ordered', 'Qty_Received', 'Total_Yuan', 'Yuan_Rate', 'CBM', 'Transport_Weight']:
-                if col in df_po_fresh.columns:
-                    df_po_fresh[col] = pd.to_numeric(df_po_fresh[col], errors='coerce').fillna(0)
-            
-            if 'Qty_Received' not in df_po_fresh.columns: df_po_fresh['Qty_Received'] = 0
-            if 'Expected_Date' not in df_po_fresh.columns: df_po_fresh['Expected_Date'] = None
-            
-            # สร้าง Helper Column สำหรับการค้นหา (แปลงเป็น String ให้หมด)
-            df_po_fresh['PO_Str'] = df_po_fresh['PO_Number'].astype(str).str.strip()
-            df_po_fresh['PID_Str'] = df_po_fresh['Product_ID'].astype(str).str.strip()
-
+        df_po_fresh, po_lookup = get_po_snapshot().get()
     except Exception as e:
         st.error(f"❌ โหลดข้อมูล PO ล่าสุดไม่ได้: {e}")
-        df_po_fresh = df_po.copy()  # fallback ไปใช้ข้อมูล cache ถ้าดึงสดไม่ได้
-        # สร้าง Helper Column ให้ fallback ด้วย
-        if not df_po_fresh.empty:
-            df_po_fresh['PO_Str'] = df_po_fresh['PO_Number'].astype(str).str.strip()
-            df_po_fresh['PID_Str'] = df_po_fresh['Product_ID'].astype(str).str.strip()
-
-    # =================================================================================
-    # ⭐️ STEP 2: เตรียมข้อมูลสำหรับค้นหา (ใช้ df_po_fresh ที่ดึงมาใหม่)
-    # =================================================================================
-    if not df_po_fresh.empty:
-        for idx, row in df_po_fresh.iterrows():
-            qty_ord = int(row.get('Qty_Ordered', 0))
-            recv_date = str(row.get('Received_Date', '')).strip()
-            is_received = (recv_date != '' and recv_date.lower() != 'nat')
-            status_icon = "✅ รับแล้ว" if is_received else ("✅ ครบ/ปิด" if qty_ord <= 0 else "⏳ รอของ")
-            
-            # Display Text
-            po_val = str(row.get('PO_Number','-'))
-            pid_val = str(row.get('Product_ID','-'))
-            display_text = f"[{status_icon}] {po_val} : {pid_val} (สั่ง: {qty_ord})"
-            
-            po_map[display_text] = row
-            key_id = (po_val.strip(), pid_val.strip())
-            po_map_key[key_id] = row
+        df_po_fresh = add_po_search_columns(df_po.copy())  # fallback ไปใช้ข้อมูล cache ถ้าดึงสดไม่ได้
+        po_lookup = build_po_lookup(df_po_fresh)
+    po_map, po_map_key = po_lookup[0], po_lookup[1]
 
     # --- Logic การเลือกรายการ ---
     if pre_selected_po and pre_selected_pid:
         target_key = (str(pre_selected_po).strip(), str(pre_selected_pid).strip())
         if target_key in po_map_key:
-            selected_row = po_map_key[target_key]
+            selected_row = df_po_fresh.iloc[po_map_key[target_key]]
             if 'Sheet_Row_Index' in selected_row: row_index = selected_row['Sheet_Row_Index']
         else:
             st.error(f"❌ ไม่พบรายการที่เลือก {target_key}")
 
     if selected_row is None:
         st.caption("🔍 ค้นหารายการที่ต้องการแก้ไข หรือ รับของ (ข้อมูล Real-time)")
-        sorted_keys = sorted([k for k in po_map.keys() if isinstance(k, str)], key=lambda x: "⏳" not in x)
-        search_key = st.selectbox("เลือกรายการ", options=sorted_keys, index=None, placeholder="พิมพ์เลข PO หรือ รหัสสินค้า...")
+        query = st.text_input("🔍 ค้นหา (เลข PO / รหัสสินค้า)", key="po_edit_q", placeholder="พิมพ์เลข PO หรือรหัสสินค้า แล้วกด Enter...")
+        options = po_search_options(query, po_lookup, [st.session_state.get("po_edit_sel")])
+        search_key = st.selectbox("เลือกรายการ", options=options, index=None, key="po_edit_sel", placeholder="พิมพ์เลข PO หรือ รหัสสินค้า...")
         if search_key:
-            selected_row = po_map[search_key]
+            selected_row = df_po_fresh.iloc[po_map[search_key]]
             if 'Sheet_Row_Index' in selected_row: row_index = selected_row['Sheet_Row_Index']
             
     st.divider()
@@ -1028,12 +1100,9 @@ def po_edit_dialog_v2(pre_selected_po=None, pre_selected_pid=None):
         with st.container(border=True):
             c_img, c_detail = st.columns([1, 4])
             img_url = get_val('Image', '')
-            if not df_master.empty:
-                df_master['PID_Str'] = df_master['Product_ID'].astype(str).str.strip()
-                m_row = df_master[df_master['PID_Str'] == pid_current]
-                if not m_row.empty: 
-                    img_url = m_row.iloc[0].get('Image', img_url)
-                    pname = m_row.iloc[0].get('Product_Name', pname)
+            if catalog.position(pid_current) is not None:
+                img_url = catalog.image(pid_current, img_url)
+                pname = catalog.name(pid_current, pname)
             if img_url: c_img.image(img_url, width=80)
             c_detail.markdown(f"### {pid_current}")
             c_detail.write(f"**{pname}**")
@@ -1102,7 +1171,7 @@ def po_edit_dialog_v2(pre_selected_po=None, pre_selected_pid=None):
             r1, r2, r3, r4 = st.columns(4)
             new_qty_recv = r1.number_input("จำนวนที่ได้รับ (ชิ้น)", min_value=0, value=0, key="e_qty_recv")
             
-            try: d_recv_def = datetime.strptime(str(get_val('Received_Date', date.today())), "%Y-%m-%d").date()
+            try: d_recv_def = datetime.strptime(str(get_val('Received_Date', date.today()))[:10], "%Y-%m-%d").date()
             except: d_recv_def = date.today()
             new_recv_date = r2.date_input("วันที่ได้รับของ", value=d_recv_def, key="e_recv_date")
             
@@ -1119,7 +1188,7 @@ def po_edit_dialog_v2(pre_selected_po=None, pre_selected_pid=None):
                 new_trans = h2.selectbox("ขนส่ง", trans_opts, index=idx_trans, key="e_trans")
                 is_internal = (new_trans == "สินค้าภายใน") 
                 
-                try: d_ord_def = datetime.strptime(str(get_val('Order_Date', date.today())), "%Y-%m-%d").date()
+                try: d_ord_def = datetime.strptime(str(get_val('Order_Date', date.today()))[:10], "%Y-%m-%d").date()
                 except: d_ord_def = date.today()
                 new_ord_date = h3.date_input("วันที่สั่งซื้อ", value=d_ord_def, key="e_ord_date")
                 
@@ -1282,6 +1351,7 @@ def po_edit_dialog_v2(pre_selected_po=None, pre_selected_pid=None):
                     rows_to_update_batch.append({"idx": r_idx, "data": data_row})
 
                 # --- จัดการ Split ---
+                rows_to_append = []
                 if new_qty_recv > 0 and new_qty_recv < new_qty_ordered:
                     rem_qty = new_qty_ordered - new_qty_recv
                     rem_ratio = rem_qty / new_qty_ordered
@@ -1296,27 +1366,20 @@ def po_edit_dialog_v2(pre_selected_po=None, pre_selected_pid=None):
                         date_exp_str
                     ]
                     
-                    curr_update_data = next((item['data'] for item in rows_to_update_batch if item['idx'] == row_index), None)
-                    if curr_update_data:
-                        save_po_edit_split(row_index, data_rem, curr_update_data)
-                        st.success("✅ บันทึกรับของ (แยกรายการ) เรียบร้อย!")
-                        st.session_state.active_dialog = None
-                        st.session_state.target_edit_data = {}
-                        time.sleep(1)
-                        st.rerun()
-                        return
-
-                # --- Update ปกติ ---
-                success_count = 0
-                for item in rows_to_update_batch:
-                    if save_po_edit_update(item["idx"], item["data"]):
-                        success_count += 1
-                
-                if success_count > 0:
-                    st.success(f"✅ บันทึกเรียบร้อย! (อัปเดต {success_count} รายการ)")
+                    # แถวเดิม = ส่วนที่ยังค้างรับ, ส่วนที่รับแล้วต่อท้ายเป็นแถวใหม่ (ส่งใน request เดียว)
+                    # บันทึกแบบแยกรายการเขียนเฉพาะแถวนี้ (แถวอื่นใน PO ไม่ถูกแก้ เหมือนเดิม)
+                    curr_item = next((item for item in rows_to_update_batch if item['idx'] == row_index), None)
+                    if curr_item:
+                        rows_to_append.append(curr_item['data'])
+                        rows_to_update_batch = [{"idx": row_index, "data": data_rem}]
+
+                # --- บันทึกทุกแถวในครั้งเดียว ---
+                updates = [(item["idx"], item["data"]) for item in rows_to_update_batch]
+                if save_po_rows_batch(updates, rows_to_append):
+                    if rows_to_append: st.toast("✅ บันทึกรับของ (แยกรายการ) เรียบร้อย!")
+                    else: st.toast(f"✅ บันทึกเรียบร้อย! (อัปเดต {len(updates)} รายการ)")
                     st.session_state.active_dialog = None
                     st.session_state.target_edit_data = {}
-                    time.sleep(1)
                     st.rerun()
                 else:
                     st.error("❌ เกิดข้อผิดพลาดในการบันทึก")
@@ -1331,9 +1394,8 @@ def delete_confirm_dialog():
         idx_to_del = st.session_state.get("target_delete_idx")
         if idx_to_del:
             if delete_po_row_from_sheet(idx_to_del):
-                st.success("ลบข้อมูลเรียบร้อย")
+                st.toast("🗑️ ลบข้อมูลเรียบร้อย")
                 st.session_state.active_dialog = None
-                time.sleep(1)
                 st.rerun()
     
     if col2.button("ยกเลิก", use_container_width=True):
@@ -1398,18 +1460,14 @@ def po_batch_dialog():
     # --- 2. Item Form Section ---
     with st.container(border=True):
         st.subheader("2. รายละเอียดสินค้า")
-        prod_list = []
-        if not df_master.empty:
-            prod_list = df_master.apply(lambda x: f"{x['Product_ID']} : {x['Product_Name']}", axis=1).tolist()
-        
-        sel_prod = st.selectbox("เลือกสินค้า", prod_list, index=None, key="bp_sel_prod")
+        query = sku_search_input("bp_sku_q")
+        sel_prod = st.selectbox("เลือกสินค้า", sku_select_options(catalog, query, [st.session_state.get("bp_sel_prod")]), index=None, key="bp_sel_prod")
         
         img_url = ""
         pid = ""
         if sel_prod:
-            pid = sel_prod.split(" : ")[0]
-            item_data = df_master[df_master['Product_ID'] == pid]
-            if not item_data.empty: img_url = item_data.iloc[0].get('Image', '')
+            pid = pid_from_label(sel_prod)
+            img_url = catalog.image(pid, "")
 
         with st.form(key="add_item_form", clear_on_submit=False):
             col_img, col_data = st.columns([1, 4])
@@ -1456,7 +1514,7 @@ def po_batch_dialog():
                     # Logic Auto PO
                     final_po_num = po_number
                     if not final_po_num:
-                        final_po_num = get_next_auto_po()
+                        final_po_num = reserve_auto_po("bp")
                         st.toast(f"ℹ️ ใช้เลข PO อัตโนมัติ: {final_po_num}")
 
                     c_qty = qty if qty is not None else 0
@@ -1524,11 +1582,11 @@ def po_batch_dialog():
                      i["Exp"] 
                  ])
             if save_po_batch_to_sheet(rows):
-                st.success("✅ บันทึกสำเร็จ!")
+                st.toast("✅ บันทึกสำเร็จ!")
                 st.session_state.po_temp_cart = []
                 if "bp_po_num" in st.session_state: del st.session_state["bp_po_num"]
+                release_auto_po("bp")
                 st.session_state.active_dialog = None 
-                time.sleep(1)
                 st.rerun()
 
 @st.dialog("📝 บันทึก PO สินค้าภายใน (Internal)", width="large")
@@ -1572,18 +1630,14 @@ def po_internal_batch_dialog():
     # --- 2. Item Form Section ---
     with st.container(border=True):
         st.subheader("2. รายละเอียดสินค้า")
-        prod_list = []
-        if not df_master.empty:
-            prod_list = df_master.apply(lambda x: f"{x['Product_ID']} : {x['Product_Name']}", axis=1).tolist()
-        
-        sel_prod = st.selectbox("เลือกสินค้า", prod_list, index=None, key="int_sel_prod")
+        query = sku_search_input("int_sku_q")
+        sel_prod = st.selectbox("เลือกสินค้า", sku_select_options(catalog, query, [st.session_state.get("int_sel_prod")]), index=None, key="int_sel_prod")
         
         img_url = ""
         pid = ""
         if sel_prod:
-            pid = sel_prod.split(" : ")[0]
-            item_data = df_master[df_master['Product_ID'] == pid]
-            if not item_data.empty: img_url = item_data.iloc[0].get('Image', '')
+            pid = pid_from_label(sel_prod)
+            img_url = catalog.image(pid, "")
 
         with st.form(key="add_item_form_internal", clear_on_submit=False):
             col_img, col_data = st.columns([1, 4])
@@ -1619,7 +1673,7 @@ def po_internal_batch_dialog():
                     # Logic Auto PO
                     final_po_num = po_number
                     if not final_po_num:
-                        final_po_num = get_next_auto_po()
+                        final_po_num = reserve_auto_po("int")
                         st.toast(f"ℹ️ ใช้เลข PO อัตโนมัติ: {final_po_num}")
 
                     c_qty = qty if qty is not None else 0
@@ -1676,11 +1730,11 @@ def po_internal_batch_dialog():
                      i["Exp"] 
                  ])
             if save_po_batch_to_sheet(rows):
-                st.success("✅ บันทึกสำเร็จ!")
+                st.toast("✅ บันทึกสำเร็จ!")
                 st.session_state.po_temp_cart = []
                 if "int_po_num" in st.session_state: del st.session_state["int_po_num"]
+                release_auto_po("int")
                 st.session_state.active_dialog = None 
-                time.sleep(1)
                 st.rerun()
 
 @st.dialog("📝 บันทึก PO หลายรายการ", width="large")
@@ -1731,15 +1785,17 @@ def po_multi_item_dialog():
     with st.container(border=True):
         st.subheader("2. รายการสินค้า")
         
-        # Prepare Master Data for Dropdown
-        product_options = []
-        if not df_master.empty:
-            product_options = df_master.apply(lambda x: f"{x['Product_ID']} : {x['Product_Name']}", axis=1).tolist()
-
         # Data Editor Setup
         if "mi_items_df" not in st.session_state:
             st.session_state.mi_items_df = pd.DataFrame([{"สินค้า": None, "จำนวน": 0}])
 
+        # Prepare Master Data for Dropdown (ผลค้นหา + สินค้าที่อยู่ในตารางแล้ว)
+        editor_state = st.session_state.get("mi_editor", {})
+        in_table = list(st.session_state.mi_items_df["สินค้า"])
+        in_table += [r.get("สินค้า") for r in editor_state.get("edited_rows", {}).values()]
+        in_table += [r.get("สินค้า") for r in editor_state.get("added_rows", [])]
+        product_options = sku_select_options(catalog, sku_search_input("mi_sku_q"), in_table)
+
         edited_df = st.data_editor(
             st.session_state.mi_items_df,
             column_config={
@@ -1787,7 +1843,7 @@ def po_multi_item_dialog():
         if total_qty_calculated > 0 and not edited_df.empty:
             for idx, row in edited_df.iterrows():
                 if row["สินค้า"] and row["จำนวน"] > 0:
-                    sku = row["สินค้า"].split(" : ")[0]
+                    sku = pid_from_label(row["สินค้า"])
                     qty = row["จำนวน"]
                     
                     # Calculate Row Values
@@ -1838,7 +1894,7 @@ def po_multi_item_dialog():
             # Logic Auto PO
             final_po_num = po_number
             if not final_po_num:
-                final_po_num = get_next_auto_po()
+                final_po_num = reserve_auto_po("mi")
                 st.toast(f"ℹ️ บันทึกโดยใช้เลข: {final_po_num}")
 
             c_rate_money = rate_money if rate_money is not None else 0.0
@@ -1881,10 +1937,10 @@ def po_multi_item_dialog():
                 rows_to_save.append(row_data)
 
             if save_po_batch_to_sheet(rows_to_save):
-                st.success(f"✅ บันทึก {len(rows_to_save)} รายการเรียบร้อยแล้ว!")
+                st.toast(f"✅ บันทึก {len(rows_to_save)} รายการเรียบร้อยแล้ว!")
                 if "mi_items_df" in st.session_state: del st.session_state.mi_items_df
                 if "mi_exp_date" in st.session_state: del st.session_state.mi_exp_date # Clear date state
-                time.sleep(1.5)
+                release_auto_po("mi")
                 st.session_state.active_dialog = None
                 st.rerun()
 
@@ -1993,14 +2049,7 @@ if st.session_state.current_page == "📅 สรุปยอดขายรา
         # --- ส่วน Category / Movement / SKU ---
         col_cat, col_move, col_sku = st.columns([1.5, 1.5, 3])
         
-        category_options = ["แสดงทั้งหมด"]
-        if not df_master.empty and 'Product_Type' in df_master.columns:
-            unique_types = sorted(df_master['Product_Type'].astype(str).unique().tolist())
-            category_options += unique_types
-            
-        sku_options = []
-        if not df_master.empty:
-            sku_options = df_master.apply(lambda x: f"{x['Product_ID']} : {x['Product_Name']}", axis=1).tolist()
+        category_options = ["แสดงทั้งหมด"] + catalog.types
             
         with col_cat: 
             selected_category = st.selectbox("หมวดหมู่สินค้า", category_options, key="filter_category")
@@ -2008,11 +2057,12 @@ if st.session_state.current_page == "📅 สรุปยอดขายรา
         with col_move:
             movement_filter = st.selectbox(
                 "การเคลื่อนไหว", 
-                ["ทั้งหมด", "สินค้าที่มีการเคลื่อนไหว", 'สินค้าที่ "ไม่มี" การเคลื่อนไหว'],
+                MOVEMENT_OPTIONS,
                 key="filter_movement"
             )
 
         with col_sku: 
+            sku_options = sku_select_options(catalog, sku_search_input("filter_sku_q"), st.session_state.get("filter_skus", []))
             selected_skus = st.multiselect("รายการที่เลือก (Choose options):", sku_options, key="filter_skus")
 
     # --- เริ่มประมวลผลข้อมูล ---
@@ -2022,116 +2072,33 @@ if st.session_state.current_page == "📅 สรุปยอดขายรา
     if start_date and end_date:
         if start_date > end_date: st.error("⚠️ วันที่เริ่มต้นต้องมาก่อนวันที่สิ้นสุด")
         else:
-            # 1. กรองข้อมูลการขายตามวันที่
-            if not df_sale.empty and 'Date_Only' in df_sale.columns:
-                mask_range = (df_sale['Date_Only'] >= start_date) & (df_sale['Date_Only'] <= end_date)
-                df_sale_range = df_sale.loc[mask_range].copy()
-                
-                df_pivot = pd.DataFrame()
-                if not df_sale_range.empty:
-                    thai_abbr = ["", "ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.", "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค."]
-                    df_sale_range['Day_Col'] = df_sale_range['Order_Time'].apply(lambda x: f"{x.day} {thai_abbr[x.month]}")
-                    df_sale_range['Day_Sort'] = df_sale_range['Order_Time'].dt.strftime('%Y%m%d')
-                    
-                    # Pivot Table: แปลงแถวเป็นคอลัมน์วันที่
-                    pivot_data = df_sale_range.groupby(['Product_ID', 'Day_Col', 'Day_Sort'])['Qty_Sold'].sum().reset_index()
-                    df_pivot = pivot_data.pivot(index='Product_ID', columns='Day_Col', values='Qty_Sold').fillna(0).astype(int)
-                    
-                    # กรอง Focus Date
+            # 1. ยอดขายรายวันในช่วงวันที่ (slice จาก Daily Sales Cube ไม่ต้อง groupby รายการขายดิบ)
+            range_cube = get_sales_cube(start_date, end_date)
+            if range_cube is not None:
+                focus_cube = get_sales_cube(focus_date, focus_date) if (use_focus_date and focus_date) else None
+                df_real_stock = get_actual_stock_from_folder()
+                curr_token = st.query_params.get("token", "")
+
+                def build_daily_sales_report():
+                    """คำนวณรายงาน (pivot / merge / สถานะ ดู jst/reports.py) + สร้าง Grid คืน (จำนวนรายการ, HTML) หรือ None ถ้าไม่พบสินค้า"""
+                    focus_products = None
                     if use_focus_date and focus_date:
-                        products_sold_on_focus = df_sale[(df_sale['Date_Only'] == focus_date) & (df_sale['Qty_Sold'] > 0)]['Product_ID'].unique()
-                        df_pivot = df_pivot[df_pivot.index.isin(products_sold_on_focus)]
-
-                # Merge กับ Master
-                if not df_pivot.empty:
-                    df_pivot = df_pivot.reset_index()
-                    final_report = pd.merge(df_master, df_pivot, on='Product_ID', how='left')
-                else: 
-                    final_report = df_master.copy()
-                
-                # หาคอลัมน์วันที่ทั้งหมด
-                day_cols = [c for c in final_report.columns if c not in df_master.columns]
-                day_cols = [c for c in day_cols if isinstance(c, str) and "🔴" not in c and "หมด" not in c]
-
-                final_report[day_cols] = final_report[day_cols].fillna(0).astype(int)
-                
-                # Apply Filters
-                if selected_category != "แสดงทั้งหมด": final_report = final_report[final_report['Product_Type'] == selected_category]
-                if selected_skus:
-                    selected_ids = [item.split(" : ")[0] for item in selected_skus]
-                    final_report = final_report[final_report['Product_ID'].isin(selected_ids)]
-                if use_focus_date and focus_date and not df_pivot.empty:
-                     final_report = final_report[final_report['Product_ID'].isin(df_pivot['Product_ID'])]
-                elif use_focus_date and focus_date and df_pivot.empty:
-                     final_report = pd.DataFrame()
-
-                if final_report.empty: st.warning(f"⚠️ ไม่พบข้อมูลสินค้า")
-                else:
-                    final_report['Total_Sales_Range'] = final_report[day_cols].sum(axis=1).astype(int)
-                    
-                    # Logic: กรองสินค้าตามการเคลื่อนไหว
-                    if movement_filter == "สินค้าที่มีการเคลื่อนไหว":
-                        final_report = final_report[final_report['Total_Sales_Range'] > 0]
-                    elif movement_filter == 'สินค้าที่ "ไม่มี" การเคลื่อนไหว':
-                        final_report = final_report[final_report['Total_Sales_Range'] == 0]
-                    
-                    # 2. คำนวณ Current Stock (Real vs Calculated)
-                    df_real_stock = get_actual_stock_from_folder()
-                    
-                    if not df_real_stock.empty:
-                        real_stock_map = df_real_stock.set_index('Product_ID')['Real_Stock'].to_dict()
-                        final_report['Real_Stock_File'] = final_report['Product_ID'].map(real_stock_map)
-                        stock_map = df_master.set_index('Product_ID')['Initial_Stock'].to_dict()
-                        
-                        final_report['Current_Stock'] = final_report.apply(
-                            lambda x: x['Real_Stock_File'] if pd.notna(x['Real_Stock_File']) else (stock_map.get(x['Product_ID'], 0) - recent_sales_map.get(x['Product_ID'], 0)), 
-                            axis=1
-                        )
-                    else:
-                        stock_map = df_master.set_index('Product_ID')['Initial_Stock'].to_dict()
-                        final_report['Current_Stock'] = final_report['Product_ID'].apply(lambda x: stock_map.get(x, 0) - recent_sales_map.get(x, 0))
-
-                    final_report['Current_Stock'] = pd.to_numeric(final_report['Current_Stock'], errors='coerce').fillna(0).astype(int)
-
-                    # 3. คำนวณสถานะ (Status)
-                    if 'Min_Limit' not in final_report.columns: final_report['Min_Limit'] = 0
-                    final_report['Min_Limit'] = pd.to_numeric(final_report['Min_Limit'], errors='coerce').fillna(0).astype(int)
-
-                    def calc_sales_status(row):
-                        curr = row['Current_Stock']
-                        limit = row['Min_Limit']
-                        if curr <= 0: return "🔴 หมด"
-                        elif curr <= limit: return "⚠️ ใกล้หมด"
-                        else: return "🟢 ปกติ"
+                        focus_products = focus_cube.products_sold_on(focus_date) if focus_cube is not None else []
+                    report = daily_sales_frame(
+                        df_master, range_cube, start_date, end_date, df_real_stock, recent_sales_map,
+                        focus_products=focus_products,
+                        category=None if selected_category == "แสดงทั้งหมด" else selected_category,
+                        product_ids=[pid_from_label(item) for item in selected_skus],
+                        movement=movement_filter,
+                    )
+                    if report is None: return None
+                    final_df, day_cols = report
 
-                    final_report['Status'] = final_report.apply(calc_sales_status, axis=1)
-                    
-                    # เรียงลำดับคอลัมน์วันที่
-                    if not df_sale_range.empty:
-                         pivot_data_temp = df_sale_range.groupby(['Product_ID', 'Day_Col', 'Day_Sort'])['Qty_Sold'].sum().reset_index()
-                         sorted_day_cols = sorted(day_cols, key=lambda x: pivot_data_temp[pivot_data_temp['Day_Col'] == x]['Day_Sort'].values[0] if x in pivot_data_temp['Day_Col'].values else 0)
-                    else: sorted_day_cols = sorted(day_cols)
-
-                    fixed_cols = ['Product_ID', 'Image', 'Product_Name', 'Product_Type', 'Current_Stock', 'Total_Sales_Range', 'Status']
-                    available_fixed = [c for c in fixed_cols if c in final_report.columns]
-                    final_df = final_report[available_fixed + sorted_day_cols]
-                    
-                    st.divider()
-                    
                     # =========================================================
-                    # 🖌️ CSS Style (กำหนด CSS ครั้งเดียวตรงนี้)
+                    # 🖌️ CSS Style ของตาราง (ตารางอยู่ใน iframe ของ Grid จึงต้องส่ง CSS ไปด้วย)
                     # =========================================================
-                    st.markdown("""
-                    <style>
-                        .daily-sales-table-wrapper { 
-                            overflow-x: auto; 
-                            width: 100%; 
-                            margin-top: 5px; 
-                            background: #1c1c1c; 
-                            border-radius: 8px; 
-                            border: 1px solid #444; 
-                            margin-bottom: 20px;
-                        }
+                    daily_sales_css = """
+                        .grid-wrap { background: #1c1c1c; border-radius: 8px; border: 1px solid #444; box-sizing: border-box; }
                         .daily-sales-table { 
                             width: 100%; 
                             min-width: 1200px; 
@@ -2142,9 +2109,9 @@ if st.session_state.current_page == "📅 สรุปยอดขายรา
                             color: #ddd; 
                         }
                         .daily-sales-table th, .daily-sales-table td { padding: 4px 6px; line-height: 1.2; text-align: center; border-bottom: 1px solid #333; border-right: 1px solid #333; white-space: nowrap; vertical-align: middle; }
-                        .daily-sales-table thead th { position: sticky; top: 0; z-index: 100; background-color: #1e3c72 !important; color: white !important; font-weight: 700; border-bottom: 2px solid #ffffff !important; min-height: 40px; }
-                        .daily-sales-table tbody tr:nth-child(even) td { background-color: #262626 !important; }
-                        .daily-sales-table tbody tr:nth-child(odd) td { background-color: #1c1c1c !important; }
+                        .daily-sales-table thead th { z-index: 100; background-color: #1e3c72 !important; color: white !important; font-weight: 700; border-bottom: 2px solid #ffffff !important; min-height: 40px; }
+                        .daily-sales-table tbody tr.g1 td { background-color: #262626 !important; }
+                        .daily-sales-table tbody tr.g0 td { background-color: #1c1c1c !important; }
                         .daily-sales-table tbody tr:hover td { background-color: #333 !important; }
                         .negative-value { color: #FF0000 !important; font-weight: bold !important; }
                         
@@ -2152,77 +2119,31 @@ if st.session_state.current_page == "📅 สรุปยอดขายรา
                         .col-small { width: 80px !important; min-width: 80px !important; }
                         .col-medium { width: 100px !important; min-width: 100px !important; }
                         .col-image { width: 50px !important; min-width: 50px !important; }
+                        .col-image img { width: 40px; height: 40px; object-fit: cover; border-radius: 4px; }
                         .col-name { width: 250px !important; min-width: 200px !important; text-align: left !important; }
                         a.history-link { text-decoration: none; color: white; font-size: 16px; cursor: pointer; }
                         a.history-link:hover { transform: scale(1.2); }
-                    </style>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown(f"**📊 แสดงผลทั้งหมด:** {len(final_df):,} รายการ")
-                    curr_token = st.query_params.get("token", "")
+                    """
 
                     # =========================================================
-                    # 🚀 เทคนิค Batch Rendering: ทยอยวาดทีละ 100 รายการ
-                    # ช่วยให้ Scroll ดูได้หมดในหน้าเดียว และแก้ปัญหาตัวอักษรเพี้ยน
+                    # 🚀 Virtualized Grid: ส่งข้อมูลเป็น JSON แล้ววาดเฉพาะแถวที่มองเห็น (ดู jst/grid.py)
                     # =========================================================
-                    chunk_size = 100  
-                    
-                    for start_idx in range(0, len(final_df), chunk_size):
-                        end_idx = start_idx + chunk_size
-                        df_chunk = final_df.iloc[start_idx:end_idx]
-                        
-                        html_parts = []
-                        html_parts.append('<div class="daily-sales-table-wrapper"><table class="daily-sales-table">')
-                        
-                        # สร้าง Header ทุกครั้งเพื่อให้แต่ละก้อนมีหัวตาราง
-                        html_parts.append('<thead><tr>')
-                        html_parts.append('<th class="col-history">ประวัติ</th>')
-                        html_parts.append('<th class="col-small">รหัส</th>')
-                        html_parts.append('<th class="col-image">รูป</th>')
-                        html_parts.append('<th class="col-name">ชื่อสินค้า</th>')
-                        html_parts.append('<th class="col-small">คงเหลือ</th>')
-                        html_parts.append('<th class="col-medium">ยอดรวม</th>')
-                        html_parts.append('<th class="col-medium">สถานะ</th>')
-                        for day_col in sorted_day_cols: 
-                            html_parts.append(f'<th class="col-small">{day_col}</th>')
-                        html_parts.append('</tr></thead>')
-                        
-                        html_parts.append('<tbody>')
-                        for idx, row in df_chunk.iterrows():
-                            current_stock_class = "negative-value" if row['Current_Stock'] < 0 else ""
-                            safe_pid = urllib.parse.quote(str(row['Product_ID']).strip())
-                            h_link = f"?history_pid={safe_pid}&token={curr_token}"
-                            
-                            raw_name = str(row.get("Product_Name", ""))
-                            clean_name = clean_text_for_html(raw_name)
-                            if len(clean_name) > 50: clean_name = clean_name[:47] + "..."
-
-                            html_parts.append('<tr>')
-                            html_parts.append(f'<td class="col-history"><a class="history-link" href="{h_link}" target="_self">📜</a></td>')
-                            html_parts.append(f'<td class="col-small">{row["Product_ID"]}</td>')
-                            
-                            if pd.notna(row.get('Image')) and str(row['Image']).startswith('http'):
-                                html_parts.append(f'<td class="col-image"><img src="{row["Image"]}" style="width: 40px; height: 40px; object-fit: cover; border-radius: 4px;"></td>')
-                            else: 
-                                html_parts.append('<td class="col-image"></td>')
-                            
-                            html_parts.append(f'<td class="col-name">{clean_name}</td>')
-                            html_parts.append(f'<td class="col-small {current_stock_class}">{row["Current_Stock"]}</td>')
-                            html_parts.append(f'<td class="col-medium">{row["Total_Sales_Range"]}</td>')
-                            html_parts.append(f'<td class="col-medium">{row["Status"]}</td>')
-                            
-                            for day_col in sorted_day_cols:
-                                day_value = row.get(day_col, 0)
-                                day_class = "negative-value" if isinstance(day_value, (int, float)) and day_value < 0 else ""
-                                val_show = int(day_value) if isinstance(day_value, (int, float)) else day_value
-                                html_parts.append(f'<td class="col-small {day_class}">{val_show}</td>')
-                            
-                            html_parts.append('</tr>')
-                        
-                        html_parts.append('</tbody></table></div>')
-                        
-                        # แสดงผลทันทีทีละก้อน (Chunk)
-                        st.markdown("".join(html_parts), unsafe_allow_html=True)
+                    grid_columns, grid_groups = daily_sales_grid(final_df, day_cols, curr_token)
+                    return len(final_df), grid_html(grid_columns, grid_groups, height=DAILY_SALES_GRID_HEIGHT, row_height=49, css=daily_sales_css, table_class="daily-sales-table")
+
+                # ผลรายงานถูก cache ตาม version ของข้อมูลต้นทาง + ตัวกรอง (rerun ที่ตัวกรองเดิมไม่ต้องคำนวณใหม่)
+                report_key = (
+                    "daily_sales", frame_version(df_master), range_cube.version, frame_version(df_real_stock),
+                    normalize_filters(start_date, end_date, focus_date if use_focus_date else None, selected_category, movement_filter, selected_skus, curr_token)
+                )
+                daily_report = get_report_cache().get_or_compute(report_key, build_daily_sales_report)
+
+                if daily_report is None: st.warning(f"⚠️ ไม่พบข้อมูลสินค้า")
+                else:
+                    report_rows, report_html = daily_report
+                    st.divider()
+                    st.markdown(f"**📊 แสดงผลทั้งหมด:** {report_rows:,} รายการ")
+                    show_grid(report_html, height=DAILY_SALES_GRID_HEIGHT)
             else: st.error("⚠️ ไม่พบข้อมูลการขายในช่วงเวลานี้")
 
 # --- Page 2: Purchase Orders ---
@@ -2261,28 +2182,14 @@ elif st.session_state.current_page == "📝 รายการสั่งซื
         # ✅ [STEP 1] เตรียมข้อมูลก่อน (Merge Data First)
         # ต้องรวมข้อมูลก่อน เพื่อเอาชื่อสินค้าและ SKU มาสร้างเป็นตัวเลือกในกล่องค้นหา
         # ==================================================================================
-        df_po_filter = df_po.copy()
-        
-        # แปลงวันที่ให้ถูกต้อง
-        if 'Order_Date' in df_po_filter.columns: df_po_filter['Order_Date'] = pd.to_datetime(df_po_filter['Order_Date'], errors='coerce')
-        if 'Received_Date' in df_po_filter.columns: df_po_filter['Received_Date'] = pd.to_datetime(df_po_filter['Received_Date'], errors='coerce')
-        if 'Expected_Date' in df_po_filter.columns: df_po_filter['Expected_Date'] = pd.to_datetime(df_po_filter['Expected_Date'], errors='coerce')
-        df_po_filter['Product_ID'] = df_po_filter['Product_ID'].astype(str)
+        po_versions = (frame_version(df_po), frame_version(df_master))
 
-        # Merge กับ Master Data
-        df_display = pd.merge(df_po_filter, df_master[['Product_ID','Product_Name','Image','Product_Type']], on='Product_ID', how='left')
+        def build_po_base():
+            """ข้อมูล PO ที่ Merge กับ Master แล้ว + ตัวเลือกในกล่องค้นหา (คำนวณใหม่เมื่อข้อมูล PO/Master เปลี่ยนเท่านั้น)"""
+            # Merge กับ Master + ตัวเลือกเลข PO / สินค้า (ดู jst/reports.py)
+            return po_base_frame(df_po, df_master)
 
-        # ==================================================================================
-        # ✅ [STEP 1] เตรียมข้อมูลตัวเลือก (Search Options)
-        # ==================================================================================
-        # 1. เตรียมรายการเลข PO
-        po_options = sorted(df_display['PO_Number'].astype(str).unique().tolist(), reverse=True)
-        
-        # 2. เตรียมรายการสินค้า (SKU : Product Name)
-        df_display['Product_Label'] = df_display.apply(
-            lambda x: f"{x['Product_ID']} : {str(x['Product_Name'])}", axis=1
-        )
-        product_options = sorted(df_display['Product_Label'].unique().tolist())
+        df_po_base, po_options, product_options = get_report_cache().get_or_compute(("po_base",) + po_versions, build_po_base)
 
         # ==================================================================================
         # ✅ [STEP 2] แสดงตัวกรอง (UI Filters) - ปรับแยกช่อง PO / SKU
@@ -2310,9 +2217,7 @@ elif st.session_state.current_page == "📝 รายการสั่งซื
             with c_status:
                 sel_status = st.selectbox("สถานะ:", ["ทั้งหมด", "สินค้าใกล้ถึง", "รอจัดส่ง", "สินค้าไม่ครบ", "เรียบร้อย"])
             with c_cat:
-                all_types = ["แสดงทั้งหมด"]
-                if not df_master.empty and 'Product_Type' in df_master.columns:
-                    all_types += sorted(df_master['Product_Type'].astype(str).unique().tolist())
+                all_types = ["แสดงทั้งหมด"] + catalog.types
                 sel_cat_po = st.selectbox("หมวดหมู่สินค้า", all_types, key="po_cat_filter")
             
             # ส่วนกรองวันที่
@@ -2324,283 +2229,53 @@ elif st.session_state.current_page == "📝 รายการสั่งซื
             with c_d2:
                 d_end = st.date_input("ถึง", value=date.today(), disabled=not use_date_filter)
 
-        # ==================================================================================
-        # ✅ [STEP 3] กรองข้อมูลตามที่เลือก (Filtering Logic)
-        # ==================================================================================
-        
-        # 1. กรองตามเลข PO
-        if sel_po_items:
-            df_display = df_display[df_display['PO_Number'].astype(str).isin(sel_po_items)]
-
-        # 2. กรองตาม SKU / สินค้า
-        if sel_sku_items:
-            df_display = df_display[df_display['Product_Label'].isin(sel_sku_items)]
-
-        # 2. กรองตามวันที่ (ถ้าติ๊ก)
-        if use_date_filter:
-            mask_date = (df_display['Order_Date'].dt.date >= d_start) & (df_display['Order_Date'].dt.date <= d_end)
-            df_display = df_display[mask_date]
-            
-        # 3. กรองตามหมวดหมู่
-        if sel_cat_po != "แสดงทั้งหมด":
-            df_display = df_display[df_display['Product_Type'] == sel_cat_po]
-
-        def get_status(row):
-            qty_ord = float(row.get('Qty_Ordered', 0))
-            qty_recv = float(row.get('Qty_Received', 0))
-            if qty_recv >= qty_ord and qty_ord > 0:
-                return "เรียบร้อย", "#d4edda", "#155724" 
-            if qty_recv > 0 and qty_recv < qty_ord:
-                return "สินค้าไม่ครบ", "#fff3cd", "#856404" 
-            exp_date = row.get('Expected_Date')
-            if pd.notna(exp_date):
-                today_date = pd.Timestamp.today().normalize()
-                diff_days = (exp_date - today_date).days
-                if 0 <= diff_days <= 4:
-                    return "สินค้าใกล้ถึง", "#cce5ff", "#004085" 
-            return "รอจัดส่ง", "#f8f9fa", "#333333" 
-
-        status_results = df_display.apply(get_status, axis=1)
-        df_display['Status_Text'] = status_results.apply(lambda x: x[0])
-        df_display['Status_BG'] = status_results.apply(lambda x: x[1])
-        df_display['Status_Color'] = status_results.apply(lambda x: x[2])
-
-        if sel_status != "ทั้งหมด":
-            df_display = df_display[df_display['Status_Text'] == sel_status]
-
-        df_display = df_display.sort_values(by=['Order_Date', 'PO_Number', 'Product_ID'], ascending=[False, False, False])
-        
-        st.markdown("""
-        <style>
-            .po-table-container { overflow-x: auto; box-shadow: 0 4px 6px rgba(0,0,0,0.3); margin-top: 10px; }
-            .custom-po-table { width: 100%; border-collapse: separate; font-size: 13px; color: #e0e0e0; min-width: 2200px; }
-            .custom-po-table th { background-color: #1e3c72; color: white; padding: 10px; text-align: center; border-bottom: 2px solid #fff; border-right: 1px solid #4a4a4a; position: sticky; top: 0; white-space: nowrap; vertical-align: middle;}
-            .custom-po-table td { padding: 8px 5px; border-bottom: 1px solid #111; border-right: 1px solid #444; vertical-align: middle; text-align: center; }
-            .td-merged { border-right: 2px solid #666 !important; background-color: inherit; }
-            .status-badge { padding: 4px 8px; border-radius: 12px; font-weight: bold; font-size: 12px; display: inline-block; width: 120px;}
-        </style>
-        """, unsafe_allow_html=True)
-
-        def fmt_date(d):
-            try:
-                if pd.isna(d) or str(d).lower() == 'nat' or str(d).strip() == "": return "-"
-                # แปลง string เป็น datetime ก่อนถ้าจำเป็น
-                if isinstance(d, str): d = pd.to_datetime(d, errors='coerce')
-                if pd.isna(d): return "-"
-                return d.strftime("%d/%m/%Y")
-            except: return "-"
-
-        def fmt_num(val, decimals=2):
-            try: return f"{float(val):,.{decimals}f}"
-            except: return "0.00"
-        
-        table_html = """
-        <div class='po-table-container'>
-        <table class='custom-po-table'>
-            <thead>
-                <tr>
-                    <th style='width:60px;'>แก้ไข</th>
-                    <th>รหัสสินค้า</th>
-                    <th style='width:50px;'>รูป</th>
-                    <th>สถานะ</th>
-                    <th>เลข PO</th>
-                    <th>ขนส่ง</th>
-                    <th style='background-color: #5f00bf;'>วันที่สั่งซื้อ</th>
-                    <th style='background-color: #5f00bf;'>วันคาดการณ์</th>
-                    <th style='background-color: #5f00bf;'>วันที่ได้รับ</th>
-                    <th style='background-color: #5f00bf;'>ระยะเวลา</th>
-                    <th style='background-color: #5f00bf;'>รับแล้ว</th>
-                    <th style='background-color: #00bf00;'>สั่งซื้อ</th>
-                    <th style='background-color: #00bf00;'>ต้นทุน/ชิ้น (฿)</th>
-                    <th>ยอดหยวน (¥)</th>
-                    <th>ยอดบาทรวม (฿)</th>
-                    <th>เรทเงิน</th>
-                    <th>เรทขนส่ง</th>
-                    <th>คิว (CBM)</th>
-                    <th>ค่าส่งรวม</th>
-                    <th>น้ำหนัก (KG)</th>
-                    <th>ราคา/ชิ้น (¥)</th>
-                    <th style='background-color: #ff6600;'>SHOPEE</th>
-                    <th>LAZADA</th>
-                    <th style='background-color: #000000;'>TIKTOK</th>
-                    <th>หมายเหตุ</th>
-                    <th>Link</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-
-        # จัดกลุ่มข้อมูลตาม PO และ สินค้า
-        grouped = df_display.groupby(['PO_Number', 'Product_ID'], sort=False)
-        
-        for group_idx, ((po, pid), group) in enumerate(grouped):
-            row_count = len(group)
-            first_row = group.iloc[0] 
-            
-            # ตรวจสอบว่าเป็นสินค้าภายในหรือไม่
-            is_internal = (str(first_row.get('Transport_Type', '')).strip() == "สินค้าภายใน")
-
-            # --- คำนวณยอดรวมของกลุ่ม ---
-            total_order_qty = group['Qty_Ordered'].sum()
-            if total_order_qty == 0: total_order_qty = 1 
-            
-            total_yuan = group['Total_Yuan'].sum()
-            total_ship_cost = group['Ship_Cost'].sum()
-            
-            calc_total_thb_used = 0
-            if is_internal:
-                calc_total_thb_used = group['Total_THB'].sum()
-            else:
-                for _, r in group.iterrows():
-                    calc_total_thb_used += (float(r.get('Total_Yuan',0)) * float(r.get('Yuan_Rate',0)))
-
-            # คำนวณต้นทุนต่อชิ้น
-            cost_per_unit_thb = (calc_total_thb_used + total_ship_cost) / total_order_qty if total_order_qty > 0 else 0
-            price_per_unit_yuan = total_yuan / total_order_qty if total_order_qty > 0 else 0
-            rate = float(first_row.get('Yuan_Rate', 0))
-
-            # กำหนดสีพื้นหลังสลับบรรทัด
-            bg_color = "#222222" if group_idx % 2 == 0 else "#2e2e2e"
-            
-            # ดึงค่าสถานะ
-            s_text = first_row.get('Status_Text', '-')
-            s_bg = first_row.get('Status_BG', '#333')
-            s_col = first_row.get('Status_Color', '#fff')
-
-            # --- เริ่มวนลูปสร้างแถวในตาราง ---
-            for idx, (i, row) in enumerate(group.iterrows()):
-                table_html += f'<tr style="background-color: {bg_color};">'
-                
-                # =======================================================
-                # ส่วนที่ 1: คอลัมน์ที่ Merge (แสดงเฉพาะบรรทัดแรกของกลุ่ม)
-                # =======================================================
-                if idx == 0:
-                    # 1. ปุ่มแก้ไข/ลบ
-                    curr_token = st.query_params.get("token", "")
-                    ts = int(time.time() * 1000)
-                    safe_pid = urllib.parse.quote(str(row['Product_ID']).strip())
-                    safe_po = urllib.parse.quote(str(row['PO_Number']).strip())
-                    row_idx_del = row.get("Sheet_Row_Index", 0)
-
-                    btn_edit = f"<a href='?edit_po={safe_po}&edit_pid={safe_pid}&t={ts}&token={curr_token}' target='_self' style='text-decoration:none; font-size:18px; margin-right:5px;'>✏️</a>"
-                    btn_del = f"<a href='?delete_idx={row_idx_del}&del_po={safe_po}&token={curr_token}' target='_self' style='text-decoration:none; font-size:18px; color:#ff4b4b;'>🗑️</a>"
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{btn_edit}{btn_del}</td>'
-
-                    # 2. รหัสสินค้า + ชื่อสินค้า (แก้บัคอักขระพิเศษ)
-                    p_name_raw = str(row.get("Product_Name", ""))
-                    p_name_clean = clean_text_for_html(p_name_raw)
-                    p_id = str(row['Product_ID'])
-                    
-                    table_html += f'<td rowspan="{row_count}" class="td-merged" title="{p_name_clean}">'
-                    table_html += f'<div style="font-weight:bold; color:#fff;">{p_id}</div>'
-                    table_html += f'<div style="font-size:12px; color:#aaa; white-space:nowrap; overflow:hidden; text-overflow:ellipsis; max-width:180px;">{p_name_clean}</div>'
-                    table_html += '</td>'
-                    
-                    # 3. รูปภาพ
-                    img_src = str(row.get('Image', ''))
-                    img_tag = f'<img src="{img_src}" style="width:40px; height:40px; object-fit:cover; border-radius:4px;">' if img_src.startswith('http') else ''
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{img_tag}</td>'
-                    
-                    # 4. สถานะ
-                    table_html += f'<td rowspan="{row_count}" class="td-merged"><span class="status-badge" style="background-color:{s_bg}; color:{s_col};">{s_text}</span></td>'
-                    
-                    # 5. เลข PO
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{row["PO_Number"]}</td>'
-                    
-                    # 6. ขนส่ง (แก้บัคตรงนี้: ใส่ Tag td ครอบตัวแปรให้ถูกต้อง)
-                    t_type = clean_text_for_html(str(row.get("Transport_Type", "-"))) 
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{t_type}</td>'
-                    
-                    # 7. วันที่สั่ง + วันคาดการณ์
-                    d_ord = fmt_date(row["Order_Date"])
-                    d_exp = fmt_date(row.get("Expected_Date"))
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{d_ord}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{d_exp}</td>'
-
-                # =======================================================
-                # ส่วนที่ 2: คอลัมน์ย่อย (ข้อมูลแยกแต่ละแถว)
-                # =======================================================
-                # 8. วันที่ได้รับ
-                d_recv = fmt_date(row['Received_Date'])
-                table_html += f'<td>{d_recv}</td>'
-                
-                # 9. ระยะเวลา (Wait)
-                wait_txt = "-"
-                if pd.notna(row['Received_Date']) and pd.notna(row['Order_Date']):
-                    try: wait_txt = f"{(row['Received_Date'] - row['Order_Date']).days} วัน"
-                    except: pass
-                table_html += f'<td>{wait_txt}</td>'
-
-                # 10. จำนวนที่ได้รับ (Received Qty)
-                q_recv = int(row.get('Qty_Received', 0))
-                q_ord_row = int(row.get('Qty_Ordered', 0))
-                style_q = "color:#ff4b4b; font-weight:bold;" if (q_recv > 0 and q_recv != q_ord_row) else ""
-                table_html += f'<td style="{style_q}">{q_recv:,}</td>'
-
-                # =======================================================
-                # ส่วนที่ 3: คอลัมน์สรุป (Merge เหมือนส่วนที่ 1)
-                # =======================================================
-                if idx == 0:
-                    # 11. จำนวนสั่งซื้อรวม
-                    table_html += f'<td rowspan="{row_count}" class="td-merged" style="color:#AED6F1; font-weight:bold;">{int(total_order_qty):,}</td>'
-                    
-                    # 12. ต้นทุนต่อชิ้น
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{fmt_num(cost_per_unit_thb)}</td>'
-                    
-                    # 13-14. ยอดเงินรวม (หยวน/บาท)
-                    val_yuan = "-" if is_internal else fmt_num(total_yuan)
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{val_yuan}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{fmt_num(calc_total_thb_used)}</td>'
-                    
-                    # 15-16. เรทเงิน + เรทขนส่ง
-                    v_rate = "-" if is_internal else fmt_num(rate)
-                    v_ship_rate = "-" if is_internal else fmt_num(row.get("Ship_Rate",0))
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{v_rate}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{v_ship_rate}</td>'
-                    
-                    # 17-19. CBM, ค่าส่ง, น้ำหนัก
-                    v_cbm = "-" if is_internal else fmt_num(row.get("CBM",0), 4)
-                    v_ship_cost = "-" if is_internal else fmt_num(total_ship_cost)
-                    v_weight = "-" if is_internal else fmt_num(row.get("Transport_Weight",0))
-                    
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{v_cbm}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{v_ship_cost}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{v_weight}</td>'
-                    
-                    # 20. ราคาต่อชิ้น (หยวน)
-                    v_unit_yuan = "-" if is_internal else fmt_num(price_per_unit_yuan)
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{v_unit_yuan}</td>'
-                    
-                    # 21-23. ราคาขาย (Shopee/Lazada/TikTok)
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{fmt_num(row.get("Shopee_Price",0))}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{fmt_num(row.get("Lazada_Price",0))}</td>'
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{fmt_num(row.get("TikTok_Price",0))}</td>'
-                    
-                    # 24. หมายเหตุ
-                    note_txt = clean_text_for_html(str(row.get("Note","")))
-                    table_html += f'<td rowspan="{row_count}" class="td-merged" style="font-size:12px;">{note_txt}</td>'
-                    
-                    # 25. Link/Contact
-                    link_val = str(row.get("Link", "")).strip()
-                    wechat_val = str(row.get("WeChat", "")).strip()
-                    icons = ""
-                    if len(link_val) > 5:
-                        s_link = urllib.parse.quote(link_val)
-                        icons += f"<a href='?view_info={s_link}&t={ts}_{idx}&token={curr_token}' style='text-decoration:none; margin-right:5px;'>🔗</a>"
-                    if len(wechat_val) > 1:
-                        s_chat = urllib.parse.quote(wechat_val)
-                        icons += f"<a href='?view_info={s_chat}&t={ts}_{idx}&token={curr_token}' style='text-decoration:none;'>💬</a>"
-                    
-                    table_html += f'<td rowspan="{row_count}" class="td-merged">{icons if icons else "-"}</td>'
-
-                # ปิด Tag แถว
-                table_html += "</tr>"
-
-        # ปิด Tag ตาราง
-        table_html += "</tbody></table></div>"
+        curr_token = st.query_params.get("token", "")
+
+        def build_po_report():
+            """กรอง + คำนวณสถานะ + สร้าง Grid ของหน้า PO คืน HTML ของตาราง"""
+            # ==================================================================================
+            # ✅ [STEP 3] กรองข้อมูลตามที่เลือก + คำนวณสถานะ + เรียงล่าสุดก่อน (ดู jst/reports.py)
+            # ==================================================================================
+            df_display = po_report_frame(
+                df_po_base, sel_po_items, sel_sku_items,
+                date_range=(d_start, d_end) if use_date_filter else None,
+                category=None if sel_cat_po == "แสดงทั้งหมด" else sel_cat_po,
+                status=None if sel_status == "ทั้งหมด" else sel_status,
+            )
         
-        # แสดงผล
-        st.markdown(table_html, unsafe_allow_html=True)
+            po_grid_css = """
+                .grid-wrap { box-shadow: 0 4px 6px rgba(0,0,0,0.3); }
+                .custom-po-table { width: 100%; border-collapse: separate; font-family: sans-serif; font-size: 13px; color: #e0e0e0; min-width: 2200px; }
+                .custom-po-table th { background-color: #1e3c72; color: white; padding: 10px; text-align: center; border-bottom: 2px solid #fff; border-right: 1px solid #4a4a4a; white-space: nowrap; vertical-align: middle;}
+                .custom-po-table td { padding: 8px 5px; border-bottom: 1px solid #111; border-right: 1px solid #444; vertical-align: middle; text-align: center; }
+                .custom-po-table tr.g0 { background-color: #222222; }
+                .custom-po-table tr.g1 { background-color: #2e2e2e; }
+                .td-merged { border-right: 2px solid #666 !important; background-color: inherit; }
+                .status-badge { padding: 4px 8px; border-radius: 12px; font-weight: bold; font-size: 12px; display: inline-block; width: 120px;}
+                .cell-main { font-weight: bold; color: #fff; }
+                .cell-sub { font-size: 12px; color: #aaa; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; max-width: 180px; }
+                .col-img img { width: 40px; height: 40px; object-fit: cover; border-radius: 4px; }
+                .col-qty-ord { color: #AED6F1; font-weight: bold; }
+                .col-note { font-size: 12px; }
+                .qty-mismatch { color: #ff4b4b; font-weight: bold; }
+                a { text-decoration: none; }
+                a.btn-edit { font-size: 18px; margin-right: 5px; }
+                a.btn-del { font-size: 18px; color: #ff4b4b; }
+                a.btn-link { margin-right: 5px; }
+            """
+
+            # คอลัมน์ + กลุ่ม (PO + สินค้า) ของตาราง (ดู jst/reports.py)
+            grid_columns, grid_groups = po_grid(df_display, curr_token)
+
+            # แสดงผลด้วย Virtualized Grid: วาดเฉพาะกลุ่มที่มองเห็น (ดู jst/grid.py)
+            return grid_html(grid_columns, grid_groups, height=PO_GRID_HEIGHT, row_height=57, css=po_grid_css, table_class="custom-po-table")
+
+        # ผลตาราง cache ตาม version ข้อมูล + ตัวกรอง (สถานะ "สินค้าใกล้ถึง" ขึ้นกับวันนี้ จึงใส่วันที่ใน key ด้วย)
+        report_key = ("po_table",) + po_versions + (normalize_filters(
+            sel_po_items, sel_sku_items, sel_status, sel_cat_po,
+            d_start if use_date_filter else None, d_end if use_date_filter else None, curr_token, date.today()
+        ),)
+        show_grid(get_report_cache().get_or_compute(report_key, build_po_report), height=PO_GRID_HEIGHT)
     else:
         st.info("ยังไม่มีข้อมูลรายการสั่งซื้อ (PO)")
 
@@ -2612,77 +2287,15 @@ elif st.session_state.current_page == "📈 รายงาน Stock":
     df_real_stock = get_actual_stock_from_folder()
     
     if not df_master.empty and 'Product_ID' in df_master.columns:
-        # เตรียมข้อมูลพื้นฐานจาก Master และ PO
-        if not df_po.empty and 'Product_ID' in df_po.columns:
-            df_po_latest = df_po.drop_duplicates(subset=['Product_ID'], keep='last')
-            df_stock_report = pd.merge(df_master, df_po_latest, on='Product_ID', how='left')
-        else:
-            df_stock_report = df_master.copy()
-            df_stock_report['PO_Number'] = ""
-        
-        # คำนวณยอดขายและสต็อกตั้งต้น
-        total_sales_map = {}
-        if not df_sale.empty and 'Product_ID' in df_sale.columns:
-            total_sales_map = df_sale.groupby('Product_ID')['Qty_Sold'].sum().fillna(0).astype(int).to_dict()
-        
-        # Map ยอดขาย
-        df_stock_report['Recent_Sold'] = df_stock_report['Product_ID'].map(recent_sales_map).fillna(0).astype(int)
-        df_stock_report['Total_Sold_All'] = df_stock_report['Product_ID'].map(total_sales_map).fillna(0).astype(int)
-        
-        if 'Initial_Stock' not in df_stock_report.columns: df_stock_report['Initial_Stock'] = 0
-        
-        # =========================================================
-        # 🔥 LOGIC 1: การคำนวณยอดคงเหลือ (Current Stock)
-        # =========================================================
-        
-        # สูตร 1: คำนวณปกติ (Master - Sales)
-        df_stock_report['Calculated_Stock'] = df_stock_report['Initial_Stock'] - df_stock_report['Recent_Sold']
-        
-        # สูตร 2: ถ้ามีไฟล์จริง ให้เอาไฟล์จริงมา Map
-        if not df_real_stock.empty:
-            real_stock_map = df_real_stock.set_index('Product_ID')['Real_Stock'].to_dict()
-            df_stock_report['Real_Stock_File'] = df_stock_report['Product_ID'].map(real_stock_map)
-            
-            # ** ถ้ามี Real Stock ในไฟล์ ให้ใช้ค่าจากไฟล์ / ถ้าไม่มี ให้ใช้ค่าจากการคำนวณ **
-            df_stock_report['Current_Stock'] = df_stock_report.apply(
-                lambda x: x['Real_Stock_File'] if pd.notna(x['Real_Stock_File']) else x['Calculated_Stock'], 
-                axis=1
-            )
-            # สร้างตัวแปรบอกแหล่งที่มาข้อมูล (เอาไว้คำนวณเฉยๆ ไม่แสดงผล)
-            df_stock_report['Source'] = df_stock_report['Real_Stock_File'].apply(lambda x: "✅ ไฟล์จริง" if pd.notna(x) else "🧮 คำนวณ")
-        else:
-            # ถ้าไม่มีไฟล์จริงเลย ใช้สูตรคำนวณล้วน
-            df_stock_report['Current_Stock'] = df_stock_report['Calculated_Stock']
-            df_stock_report['Source'] = "🧮 คำนวณ"
+        # คำนวณรายงาน (จับเวลาใน Profiler)
+        with span("stock_report", kind="compute") as stock_span:
+            # คำนวณยอดขายทั้งหมด (ยอดขายหลังวันที่ของ Master = recent_sales_map)
+            total_sales_cube = get_sales_cube()
+            total_sales_map = total_sales_cube.totals() if total_sales_cube is not None else {}
 
-        # =========================================================
-        # 🛠️ LOGIC 2: การคำนวณสถานะและแก้ Error (แก้ไขใหม่)
-        # =========================================================
-
-        # 1. บังคับให้ Current_Stock เป็นตัวเลข (กันเหนียว)
-        df_stock_report['Current_Stock'] = pd.to_numeric(df_stock_report['Current_Stock'], errors='coerce').fillna(0).astype(int)
-
-        # 2. จัดการ Min_Limit ให้เป็นตัวเลขเท่านั้น (แก้จุดที่ Error)
-        if 'Min_Limit' not in df_stock_report.columns:
-            df_stock_report['Min_Limit'] = 0
-            
-        # บังคับแปลง Min_Limit เป็นตัวเลข (ถ้า Error หรือว่าง ให้เป็น 0)
-        df_stock_report['Min_Limit'] = pd.to_numeric(df_stock_report['Min_Limit'], errors='coerce').fillna(0).astype(int)
-
-        # 3. ฟังก์ชันคำนวณสถานะ
-        def calc_status(row):
-            current = row['Current_Stock']
-            limit = row['Min_Limit']
-            
-            if current <= 0:
-                return "🔴 หมดเกลี้ยง"  # ถ้าเป็น 0 หรือติดลบ
-            elif current <= limit: 
-                return "⚠️ ของใกล้หมด" # ✅ ถ้าเหลือน้อยกว่าหรือเท่ากับจุดเตือน ให้ขึ้นเตือนทันที
-            else:
-                return "🟢 มีของ"      # นอกนั้นถือว่าปกติ
-
-        # สร้าง Column Status ใหม่
-        df_stock_report['Status'] = df_stock_report.apply(calc_status, axis=1)
+            # merge PO ล่าสุด -> คงเหลือ (ไฟล์จริง / คำนวณ) -> สถานะ (ดู jst/reports.py)
+            df_stock_report = stock_report_frame(df_master, df_po, df_real_stock, recent_sales_map, total_sales_map)
+            stock_span.set(rows=len(df_stock_report))
 
         # =========================================================
         # ส่วนแสดงผล UI (ปรับปรุง: ปุ่มอยู่บน + ตารางยาว + ตัดคอลัมน์รกออก)
@@ -2703,7 +2316,8 @@ elif st.session_state.current_page == "📈 รายงาน Stock":
         if selected_status: 
             edit_df = edit_df[edit_df['Status'].isin(selected_status)]
         if search_text: 
-            edit_df = edit_df[edit_df['Product_Name'].str.contains(search_text, case=False) | edit_df['Product_ID'].str.contains(search_text, case=False)]
+            # ค้นหาจาก Search Index ของ Catalog (รหัส / ชื่อ มีคำค้น ไม่สนตัวพิมพ์เล็กใหญ่)
+            edit_df = edit_df[edit_df['Product_ID'].isin(catalog.search_ids(search_text))]
 
         # 1. จัดการคอลัมน์ให้ครบ (เอา Source, Recent_Sold, PO_Number ออกแล้ว)
         final_cols = ["Product_ID", "Image", "Product_Name", "Current_Stock", "Status", "Min_Limit", "Note"]
@@ -2711,20 +2325,6 @@ elif st.session_state.current_page == "📈 รายงาน Stock":
         for c in final_cols:
             if c not in edit_df.columns: edit_df[c] = "" 
 
-        # -------------------------------------------------------
-        # 🆕 LOGIC พิเศษ: ดึงค่าที่แก้มาเตรียมบันทึก
-        # -------------------------------------------------------
-        df_for_save = edit_df.copy()
-        
-        if "stock_editor_key" in st.session_state:
-            edits = st.session_state["stock_editor_key"].get("edited_rows", {})
-            for row_idx, col_changes in edits.items():
-                for col_name, new_value in col_changes.items():
-                    try:
-                        col_idx = df_for_save.columns.get_loc(col_name)
-                        df_for_save.iloc[int(row_idx), col_idx] = new_value
-                    except: pass
-
         # -------------------------------------------------------
         # 💾 ปุ่มบันทึก (อยู่ด้านบน)
         # -------------------------------------------------------
@@ -2733,7 +2333,9 @@ elif st.session_state.current_page == "📈 รายงาน Stock":
             st.info(f"📋 แสดงผลทั้งหมด **{len(edit_df)}** รายการ (แก้ไขจุดเตือนในตาราง แล้วกดบันทึก)")
         with col_btn2:
             if st.button("💾 บันทึกค่าจุดเตือน", type="primary", use_container_width=True):
-                update_master_limits(df_for_save)
+                # ส่งเฉพาะช่องที่แก้ในตาราง (edited_rows อ้างอิงตำแหน่งแถวของ edit_df)
+                edits = st.session_state.get("stock_editor_key", {}).get("edited_rows", {})
+                update_master_limits(df_master, edit_df, edits)
                 st.rerun()
 
         # -------------------------------------------------------
@@ -2771,4 +2373,12 @@ elif st.session_state.active_dialog == "po_edit_direct":
     po_edit_dialog_v2(pre_selected_po=data.get("po"), pre_selected_pid=data.get("pid"))
 elif st.session_state.active_dialog == "history": show_history_dialog(fixed_product_id=st.session_state.get("selected_product_history"))
 elif st.session_state.active_dialog == "po_multi_item": po_multi_item_dialog()
-elif st.session_state.active_dialog == "delete_confirm": delete_confirm_dialog()
\ No newline at end of file
+elif st.session_state.active_dialog == "delete_confirm": delete_confirm_dialog()
+
+# ==========================================
+# ⏱️ PROFILER (ปิด trace ของ rerun นี้ + แสดงผลถ้าเปิดไว้)
+# ==========================================
+rerun_trace = finish_rerun(rerun_trace)
+with st.sidebar:
+    if st.toggle("⏱️ Profiler (เวลาแต่ละขั้นตอน)", key="show_profiler") and rerun_trace is not None:
+        show_profiler(rerun_trace)
@@ -0,0 +1,29 @@
+from jst.grid import grid_html
+from jst.reports import daily_sales_frame, daily_sales_grid, po_base_frame, po_report_frame, po_grid, stock_report_frame
+
+# ==========================================
+# Page Computations (ขั้นตอนของแต่ละหน้าใน app.py สำหรับ Benchmark)
+# ==========================================
+# ใช้ฟังก์ชันเดียวกับแอป (ดู jst/reports.py) ต่อกันตามลำดับของหน้านั้น โดยไม่มีตัวกรอง
+# (ส่วนที่ผูกกับ st.* เช่น ตัวกรอง / CSS / Report Cache ไม่ได้วัด)
+
+
+def daily_sales_report(df_master, cube, df_real_stock, recent_sales_map, date_from, date_to):
+    """หน้า 1 (ยอดขายรายวัน): pivot -> merge Master -> คงเหลือ / สถานะ -> Grid"""
+    report = daily_sales_frame(df_master, cube, date_from, date_to, df_real_stock, recent_sales_map)
+    if report is None: return 0, None
+    final_df, day_cols = report
+    grid_columns, grid_groups = daily_sales_grid(final_df, day_cols)
+    return len(final_df), grid_html(grid_columns, grid_groups, height=1000, row_height=49)
+
+
+def po_report(df_po, df_master, today=None):
+    """หน้า 2 (รายการสั่งซื้อ): merge Master -> สถานะ PO -> จัดกลุ่ม PO + สินค้า -> Grid"""
+    df_base, _, _ = po_base_frame(df_po, df_master)
+    grid_columns, grid_groups = po_grid(po_report_frame(df_base, today=today), ts=0)
+    return len(grid_groups), grid_html(grid_columns, grid_groups, height=1000, row_height=57)
+
+
+def stock_report(df_master, df_po, df_real_stock, recent_sales_map, total_sales_map):
+    """หน้า 3 (รายงาน Stock): merge PO ล่าสุด -> ยอดขาย -> คงเหลือ (ไฟล์จริง / คำนวณ) -> สถานะ"""
+    return stock_report_frame(df_master, df_po, df_real_stock, recent_sales_map, total_sales_map)
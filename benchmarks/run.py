@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from jst.ingest import parse_sale_excel, parse_stock_excel
+from jst.write_queue import grid_records
+from jst.sales_store import SalesStore
+from jst.catalog import ProductCatalog
+from jst.storage import LocalStorage
+from jst.sheet_frames import master_frame_from_grid, po_frame_from_records, master_row_index, master_limit_ops
+from benchmarks import synthetic, pages
+
+# ==========================================
+# Benchmark (วัดเวลาแต่ละขั้นตอนของ Data Pipeline + การคำนวณในแต่ละหน้า ด้วยข้อมูลจำลอง)
+# ==========================================
+# ใช้งาน (รันจากโฟลเดอร์โปรเจกต์):
+#   python -m benchmarks.run --size 10k
+#   python -m benchmarks.run --size 50k --repeat 5 --compare benchmarks/results/<ไฟล์ก่อนแก้>.json
+# ผลลัพธ์: JSON ที่ benchmarks/results/<size>-<เวลา>.json (best / median ของแต่ละขั้นตอน + version ของ library)
+# --compare: เทียบกับผลรอบก่อน ขั้นตอนที่ช้าลงเกิน --threshold จะถูกแจ้ง (exit code 1)
+
+SIZES = {
+    # skus = จำนวนสินค้าใน Master, po_rows = แถวใน PO_DATA, order_lines = รายการขาย (Sales Store / Cube)
+    # excel_rows = แถวในไฟล์ Excel ยอดขายที่ใช้วัดการ parse (ไฟล์จริง 1 ไฟล์ = 1 ช่วงวันที่)
+    "1k": {"skus": 1_000, "po_rows": 5_000, "order_lines": 100_000, "excel_rows": 20_000},
+    "10k": {"skus": 10_000, "po_rows": 50_000, "order_lines": 500_000, "excel_rows": 50_000},
+    "50k": {"skus": 50_000, "po_rows": 200_000, "order_lines": 1_000_000, "excel_rows": 100_000},
+}
+REPORT_DAYS = 30
+MASTER_EDITS = 500
+SEARCH_QUERIES = ["SKU0001", "เสื้อยืด สีดำ", "cotton", "ไซส์ L", "SKU9"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def timed(fn, repeat):
+    runs, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.stages = {}
+
+    def stage(self, name, fn, rows=None, repeat=None):
+        result, runs = timed(fn, repeat or self.repeat)
+        self.stages[name] = {
+            "best_s": round(min(runs), 4), "median_s": round(statistics.median(runs), 4),
+            "runs_s": [round(r, 4) for r in runs], "rows": rows,
+        }
+        print(f"  {name:<28} best {min(runs):8.3f}s  median {statistics.median(runs):8.3f}s" + (f"  ({rows:,} rows)" if rows else ""))
+        return result
+
+
+class _GridSource:
+    """Backend จำลองที่มีแค่ read_tab (ใช้เติมข้อมูลลง LocalStorage)"""
+    def __init__(self, grids): self.grids = grids
+    def read_tab(self, tab): return self.grids[tab]
+
+
+def run_suite(size, repeat, workdir):
+    params = SIZES[size]
+    bench = Bench(repeat)
+    print(f"▶ Generating synthetic data ({size}: {params})")
+    master_grid = synthetic.master_grid(params["skus"])
+    po_grid = synthetic.po_grid(params["po_rows"], params["skus"])
+    sales = synthetic.sales_frame(params["order_lines"], params["skus"])
+    sale_xlsx = synthetic.sales_excel(sales.head(params["excel_rows"]))
+    stock_xlsx = synthetic.stock_excel(params["skus"])
+
+    print("▶ Ingest")
+    bench.stage("parse_sale_excel", lambda: parse_sale_excel(sale_xlsx), rows=params["excel_rows"])
+    df_real_stock = bench.stage("parse_stock_excel", lambda: parse_stock_excel(stock_xlsx), rows=params["skus"])
+    layout = df_real_stock.attrs.get("layout")
+    bench.stage("parse_stock_excel_layout", lambda: parse_stock_excel(stock_xlsx, layout=layout), rows=params["skus"])
+
+    print("▶ Local storage (แทน Google Sheet / Drive)")
+    storage = LocalStorage(os.path.join(workdir, "storage"))
+    storage.import_from(_GridSource({"MASTER": master_grid, "PO_DATA": po_grid}), tabs=["MASTER", "PO_DATA"])
+    bench.stage("local_read_master", lambda: storage.read_tab("MASTER"), rows=params["skus"])
+    bench.stage("local_read_po", lambda: storage.read_tab("PO_DATA"), rows=params["po_rows"])
+
+    print("▶ Sheet frames")
+    df_master = bench.stage("master_frame_from_grid", lambda: master_frame_from_grid(master_grid), rows=params["skus"])
+    df_po = bench.stage("po_frame_from_grid", lambda: po_frame_from_records(grid_records(po_grid)), rows=params["po_rows"])
+
+    print("▶ Sales store / cube")
+    store = SalesStore(os.path.join(workdir, "sales"))
+    # ไฟล์ละ 1 เดือน เหมือนไฟล์ที่ Export จาก JST
+    monthly = [(f"sale-{month}", part) for month, part in sales.groupby(sales['Order_Time'].dt.strftime("%Y-%m"))]
+    def ingest_sales():
+        for file_id, part in monthly: store.save(file_id, part)
+        return store.cube().table()
+    bench.stage("sales_store_save", ingest_sales, rows=params["order_lines"], repeat=1)
+    cube = store.cube()
+    date_to = cube.latest_date()
+    date_from = date_to - pd.Timedelta(days=REPORT_DAYS - 1)
+    bench.stage("cube_pivot", lambda: cube.pivot(date_from, date_to), rows=len(cube.table()))
+    _, recent_sales_map = cube.latest_day()
+    total_sales_map = bench.stage("cube_totals", cube.totals, rows=len(cube.table()))
+
+    print("▶ Pages")
+    bench.stage("page1_daily_sales", lambda: pages.daily_sales_report(df_master, cube, df_real_stock, recent_sales_map, date_from, date_to), rows=params["skus"])
+    bench.stage("page2_po_report", lambda: pages.po_report(df_po, df_master), rows=params["po_rows"])
+    bench.stage("page3_stock_report", lambda: pages.stock_report(df_master, df_po, df_real_stock, recent_sales_map, total_sales_map), rows=params["skus"])
+
+    print("▶ Master edits / catalog")
+    rng = np.random.default_rng(4)
+    edit_pos = rng.choice(len(df_master), min(MASTER_EDITS, len(df_master)), replace=False)
+    edited_rows = {int(p): {"Min_Limit": int(rng.integers(0, 99)), "Note": "ตรวจแล้ว"} for p in edit_pos}
+    def master_edit():
+        return master_limit_ops(list(df_master.attrs["sheet_header"]), master_row_index(df_master), df_master, edited_rows)
+    bench.stage("master_limit_ops", master_edit, rows=len(edited_rows))
+    catalog = bench.stage("catalog_build", lambda: ProductCatalog(df_master), rows=params["skus"])
+    bench.stage("catalog_search", lambda: [catalog.search_labels(q, 50) for q in SEARCH_QUERIES], rows=len(SEARCH_QUERIES))
+
+    print("▶ Cache round trip (st.cache_data = pickle)")
+    frames = {"master": df_master, "po": df_po, "cube": cube.table()}
+    bench.stage("pickle_round_trip", lambda: pickle.loads(pickle.dumps(frames, protocol=pickle.HIGHEST_PROTOCOL)))
+    return params, bench.stages
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(stages, baseline_path, threshold):
+    """คืนรายการขั้นตอนที่ช้าลงเกิน threshold เท่า (เทียบค่า best)"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["stages"]
+    regressions = []
+    print(f"▶ Compare with {baseline_path}")
+    for name, cur in stages.items():
+        old = baseline.get(name)
+        if not old or not old["best_s"]: continue
+        ratio = cur["best_s"] / old["best_s"]
+        flag = "  ⚠️ slower" if ratio > threshold else ""
+        print(f"  {name:<28} {old['best_s']:8.3f}s -> {cur['best_s']:8.3f}s  x{ratio:.2f}{flag}")
+        if flag: regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark data pipeline + page computations ด้วยข้อมูลจำลอง")
+    parser.add_argument("--size", choices=sorted(SIZES), default="10k")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="ไฟล์ผลลัพธ์ JSON (ค่าเริ่มต้น benchmarks/results/<size>-<เวลา>.json)")
+    parser.add_argument("--compare", help="ไฟล์ผลลัพธ์รอบก่อนสำหรับเทียบ")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ช้าลงกี่เท่าถึงนับว่าถดถอย (ค่าเริ่มต้น 1.2)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="jst-bench-") as workdir:
+        params, stages = run_suite(args.size, max(1, args.repeat), workdir)
+
+    stamp = datetime.now()
+    result = {
+        "meta": {
+            "size": args.size, "params": params, "repeat": args.repeat,
+            "git": git_revision(), "timestamp": stamp.isoformat(timespec="seconds"),
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "stages": stages,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{args.size}-{stamp:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"✅ Saved {out}")
+
+    if args.compare and compare(stages, args.compare, args.threshold): return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import io
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# Synthetic Data (ข้อมูลจำลองสำหรับ Benchmark: หัวตารางภาษาไทยแบบเดียวกับไฟล์จริง)
+# ==========================================
+# - MASTER / PO_DATA: grid แบบ get_all_values() (แถวแรก = หัวตาราง, ทุกช่องเป็นข้อความ)
+# - ยอดขาย / Stock: ไฟล์ Excel (bytes) แบบที่ Export จาก JST
+# ใช้ seed คงที่ -> ข้อมูลชุดเดิมทุกครั้ง เทียบผลระหว่าง version ได้
+
+MASTER_HEADER = ['รหัสSKU', 'ชื่อสินค้า', 'รูปภาพ SKU', 'จํานวนที่ใช้ได้', 'จำนวนน้อยสุดในการเติมสินค้า (MIN)', 'หมวดหมู่', 'หมายเหตุ']
+PO_HEADER = [
+    'รหัสสินค้า', 'เลข PO', 'ขนส่ง', 'วันที่สั่งซื้อ', 'วันที่ได้รับ', 'ระยะเวลา', 'จำนวน', 'จำนวนที่ได้รับ',
+    'ราคา/ชิ้น', 'ราคา (หยวน)', 'ราคา (บาท)', 'เรทเงิน', 'เรทค่าขนส่ง', 'ขนาด (คิว)', 'ค่าส่ง', 'น้ำหนัก / KG',
+    'SHOPEE', 'LAZADA', 'TIKTOK', 'หมายเหตุ', 'Link_Shop', 'WeChat', 'Expected_Date',
+]
+SALE_HEADER = ['รหัสสินค้า', 'จำนวน', 'ร้านค้า', 'เวลาสั่งซื้อ']
+STOCK_PREAMBLE = [['รายงานสินค้าคงเหลือ'], ['คลัง: คลังหลัก'], []]
+STOCK_HEADER = ['ลำดับ', 'รหัสSKU', 'ชื่อสินค้า', 'จํานวนที่ใช้ได้', 'คงเหลือ']
+
+PRODUCT_TYPES = ['เสื้อผ้า', 'กระเป๋า', 'รองเท้า', 'เครื่องประดับ', 'ของใช้ในบ้าน', 'อุปกรณ์กีฬา', 'ของเล่น', 'ทั่วไป']
+TRANSPORTS = ['ทางรถ', 'ทางเรือ', 'สินค้าภายใน']
+SHOPS = ['Shopee ร้านหลัก', 'Lazada ร้านหลัก', 'TikTok ร้านหลัก', 'Shopee ร้านสอง', 'หน้าร้าน']
+NAME_WORDS = ['เสื้อยืด', 'กางเกง', 'กระเป๋าสะพาย', 'รองเท้าผ้าใบ', 'สร้อยคอ', 'แก้วน้ำ', 'ลูกบอล', 'ตุ๊กตา', 'Cotton', 'Oversize', 'สีดำ', 'สีขาว', 'ไซส์ L', 'ไซส์ M']
+
+
+def sku_ids(n):
+    return [f"SKU{i:06d}" for i in range(n)]
+
+
+def _names(rng, n):
+    words = np.array(NAME_WORDS)
+    picks = rng.integers(0, len(words), size=(n, 3))
+    return [" ".join(words[p]) for p in picks]
+
+
+def master_grid(n_skus, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = sku_ids(n_skus)
+    names = _names(rng, n_skus)
+    stock = rng.integers(0, 500, n_skus)
+    min_limit = rng.integers(0, 50, n_skus)
+    types = rng.choice(PRODUCT_TYPES, n_skus)
+    rows = [[pid, name, f"https://img.example.com/{pid}.jpg", str(s), str(m), t, ""]
+            for pid, name, s, m, t in zip(ids, names, stock, min_limit, types)]
+    return [list(MASTER_HEADER)] + rows
+
+
+def po_grid(n_rows, n_skus, seed=1, start="2023-01-01"):
+    """ประวัติ PO: 1 PO มีหลายสินค้า, บางรายการรับของหลายรอบ (หลายแถวต่อ PO + สินค้า)"""
+    rng = np.random.default_rng(seed)
+    ids = sku_ids(n_skus)
+    base = pd.Timestamp(start)
+    rows = []
+    po_no = 0
+    while len(rows) < n_rows:
+        po_no += 1
+        order_date = base + pd.Timedelta(days=int(rng.integers(0, 700)))
+        transport = TRANSPORTS[int(rng.integers(0, len(TRANSPORTS)))]
+        rate = round(float(rng.uniform(4.8, 5.3)), 2)
+        for pid in rng.choice(ids, int(rng.integers(1, 8))):
+            qty = int(rng.integers(10, 500))
+            yuan = round(qty * float(rng.uniform(5, 80)), 2)
+            expected = order_date + pd.Timedelta(days=int(rng.integers(7, 40)))
+            for part in range(int(rng.integers(1, 3))):
+                received = expected + pd.Timedelta(days=int(rng.integers(-3, 10)))
+                got = received <= pd.Timestamp.today()
+                rows.append([
+                    pid, f"PO{po_no:06d}", transport, order_date.strftime("%Y-%m-%d"),
+                    received.strftime("%Y-%m-%d") if got else "", str((received - order_date).days) if got else "",
+                    str(qty), str(qty // (part + 1) if got else 0),
+                    "", str(yuan), str(round(yuan * rate, 2)), str(rate), "6500", "0.35", "450", "12.5",
+                    "199", "209", "189", "", "https://shop.example.com/item", "wechat-id", expected.strftime("%Y-%m-%d"),
+                ])
+    return [list(PO_HEADER)] + rows[:n_rows]
+
+
+def sales_frame(n_lines, n_skus, days=365, seed=2, end="2025-12-31"):
+    """รายการขาย (หลังแปลงชื่อคอลัมน์แล้ว) สินค้าขายดีไม่เท่ากัน (Zipf)"""
+    rng = np.random.default_rng(seed)
+    ids = np.array(sku_ids(n_skus))
+    popularity = rng.zipf(1.3, n_lines) % n_skus
+    end_ts = pd.Timestamp(end)
+    seconds = rng.integers(0, days * 86400, n_lines)
+    return pd.DataFrame({
+        'Product_ID': ids[popularity],
+        'Qty_Sold': rng.integers(1, 4, n_lines).astype('int32'),
+        'Shop': rng.choice(SHOPS, n_lines),
+        'Order_Time': end_ts - pd.to_timedelta(seconds, unit='s'),
+    })
+
+
+def sales_excel(df):
+    """ไฟล์ Excel ยอดขายแบบ Export จาก JST (หัวตารางภาษาไทย)"""
+    out = df.rename(columns=dict(zip(['Product_ID', 'Qty_Sold', 'Shop', 'Order_Time'], SALE_HEADER)))
+    out[SALE_HEADER[3]] = out[SALE_HEADER[3]].dt.strftime("%Y-%m-%d %H:%M:%S")
+    fh = io.BytesIO()
+    out[SALE_HEADER].to_excel(fh, index=False)
+    return fh.getvalue()
+
+
+def stock_excel(n_skus, seed=3):
+    """ไฟล์ Stock คงเหลือแบบ Export จาก JST (มีหัวรายงานก่อนหัวตาราง)"""
+    rng = np.random.default_rng(seed)
+    ids = sku_ids(n_skus)
+    available = rng.integers(0, 500, n_skus)
+    rows = STOCK_PREAMBLE + [STOCK_HEADER] + [
+        [i + 1, pid, f"สินค้า {pid}", int(a), int(a) + 5] for i, (pid, a) in enumerate(zip(ids, available))
+    ]
+    fh = io.BytesIO()
+    pd.DataFrame(rows).to_excel(fh, index=False, header=False)
+    return fh.getvalue()
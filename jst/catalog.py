@@ -0,0 +1,79 @@
+import sys
+import threading
+import pandas as pd
+from jst.report_cache import estimate_size, frame_version
+from jst.search import SkuSearchIndex
+
+# ==========================================
+# Product Catalog (ข้อมูลสินค้าจาก Master ที่สร้างไว้ครั้งเดียวต่อ version)
+# ==========================================
+# - ตัวเลือกใน Dropdown "รหัส : ชื่อสินค้า" สร้างครั้งเดียว ไม่ต้อง df.apply ทุก rerun
+# - ค้นหาชื่อ / รูป / แถวของสินค้าจาก Product_ID แบบ O(1) แทนการกรองทั้งตาราง
+# - ไม่แก้ไข DataFrame ต้นทาง (df_master ใช้ร่วมกันทั้งแอป)
+# - Search Index (รหัส / ชื่อ) สร้างตอนถูกใช้ครั้งแรก (ดู jst/search.py)
+
+LABEL_SEPARATOR = " : "
+
+
+def pid_from_label(label):
+    """ตัวเลือก "รหัส : ชื่อสินค้า" -> รหัสสินค้า"""
+    return str(label).split(LABEL_SEPARATOR)[0]
+
+
+class ProductCatalog:
+    def __init__(self, df_master):
+        self.frame = df_master
+        self.version = frame_version(df_master)
+        cols = df_master.columns
+        pids = [str(p) for p in df_master['Product_ID']] if 'Product_ID' in cols else []
+        self._names = df_master['Product_Name'].tolist() if 'Product_Name' in cols else None
+        self._images = df_master['Image'].tolist() if 'Image' in cols else None
+
+        self.labels = [f"{pid}{LABEL_SEPARATOR}{name}" for pid, name in zip(pids, self._names or pids)]
+        # Product_ID (ตัดช่องว่าง) -> ตำแหน่งแถวแรกที่พบ
+        self.positions = {}
+        for i, pid in enumerate(pids): self.positions.setdefault(pid.strip(), i)
+        self.types = sorted({str(t) for t in df_master['Product_Type']}) if 'Product_Type' in cols else []
+        self._pids = pids
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __sizeof__(self):
+        # ไม่นับ self.frame: เป็น df_master ตัวเดียวกับที่ถูกนับอยู่แล้วที่อื่น (นับซ้ำ = Report Cache ไล่รายการออกเร็วเกิน)
+        size = object.__sizeof__(self) + estimate_size(self.labels) + estimate_size(self.positions)
+        return size + (sys.getsizeof(self._index) if self._index is not None else 0)
+
+    @property
+    def search_index(self):
+        with self._index_lock:
+            if self._index is None:
+                names = ["" if pd.isna(n) else n for n in (self._names or [""] * len(self._pids))]
+                self._index = SkuSearchIndex(self._pids, names)
+            return self._index
+
+    def search_labels(self, query, limit=None):
+        """ตัวเลือก "รหัส : ชื่อสินค้า" ที่ตรงกับคำค้น เรียงตามความเกี่ยวข้อง"""
+        return [self.labels[i] for i in self.search_index.search(query, limit)]
+
+    def search_ids(self, query):
+        """Product_ID ทั้งหมดที่รหัสหรือชื่อมีคำค้น"""
+        return {self._pids[i] for i in self.search_index.matches(query)}
+
+    def position(self, pid):
+        return self.positions.get(str(pid).strip())
+
+    def row(self, pid):
+        """แถวของสินค้าใน Master (Series) หรือ None ถ้าไม่พบ"""
+        pos = self.position(pid)
+        return self.frame.iloc[pos] if pos is not None else None
+
+    def name(self, pid, default=""):
+        pos = self.position(pid)
+        return self._names[pos] if pos is not None and self._names is not None else default
+
+    def image(self, pid, default=""):
+        pos = self.position(pid)
+        return self._images[pos] if pos is not None and self._images is not None else default
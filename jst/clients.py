@@ -0,0 +1,87 @@
+import queue
+import threading
+from contextlib import contextmanager
+import gspread
+from googleapiclient.discovery import build
+
+# ==========================================
+# Shared Google Clients (ใช้ร่วมกันทั้งแอป แทนการ authorize / open ใหม่ทุกครั้ง)
+# ==========================================
+# - gspread Client ตัวเดียว (requests Session -> HTTP keep-alive)
+# - Spreadsheet + Worksheet handle ถูก cache ไว้ ไม่ต้องดึง metadata ซ้ำ
+# - Drive service เป็น pool (httplib2 ไม่ thread-safe -> 1 service ต่อ 1 thread ที่ใช้งานอยู่)
+# - Token refresh ถูก lock ไว้ ไม่ให้หลาย thread refresh พร้อมกัน
+
+DRIVE_POOL_MAX_IDLE = 8
+
+
+def make_refresh_thread_safe(creds):
+    if getattr(creds, "_jst_locked_refresh", False): return creds
+    lock = threading.Lock()
+    original_refresh = creds.refresh
+
+    def refresh(request):
+        with lock:
+            # thread อื่น refresh ไปแล้วระหว่างรอ lock -> ใช้ token นั้นได้เลย
+            if creds.valid: return
+            original_refresh(request)
+
+    creds.refresh = refresh
+    creds._jst_locked_refresh = True
+    return creds
+
+
+class GoogleClients:
+    def __init__(self, creds, spreadsheet_id):
+        self.creds = make_refresh_thread_safe(creds)
+        self.spreadsheet_id = spreadsheet_id
+        self._lock = threading.RLock()
+        self._gc = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._drive_pool = queue.LifoQueue()
+
+    # --- Google Sheets ---
+    def gspread(self):
+        with self._lock:
+            if self._gc is None: self._gc = gspread.authorize(self.creds)
+            return self._gc
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._spreadsheet is None: self._spreadsheet = self.gspread().open_by_key(self.spreadsheet_id)
+            return self._spreadsheet
+
+    def worksheet(self, title, create_rows=None, create_cols=None, header=None):
+        """คืน Worksheet handle ที่ cache ไว้ (ถ้าส่ง create_rows มาด้วย จะสร้าง Tab ให้เมื่อยังไม่มี)"""
+        with self._lock:
+            ws = self._worksheets.get(title)
+            if ws is not None: return ws
+            sh = self.spreadsheet()
+            try: ws = sh.worksheet(title)
+            except gspread.exceptions.WorksheetNotFound:
+                if create_rows is None: raise
+                ws = sh.add_worksheet(title=title, rows=str(create_rows), cols=str(create_cols or 2))
+                if header: ws.append_row(header)
+            self._worksheets[title] = ws
+            return ws
+
+    def reset(self):
+        # ล้าง handle ทั้งหมด (เช่น หลังเปลี่ยนชื่อ Tab) รอบถัดไปจะเปิดใหม่
+        with self._lock:
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    # --- Google Drive ---
+    def new_drive_service(self):
+        return build('drive', 'v3', credentials=self.creds, cache_discovery=False)
+
+    @contextmanager
+    def drive(self):
+        """ยืม Drive service จาก pool (สร้างใหม่ถ้าไม่มีตัวว่าง) แล้วคืนเมื่อใช้เสร็จ"""
+        try: service = self._drive_pool.get_nowait()
+        except queue.Empty: service = self.new_drive_service()
+        try:
+            yield service
+        finally:
+            if self._drive_pool.qsize() < DRIVE_POOL_MAX_IDLE: self._drive_pool.put(service)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# Frame Schema (ชนิดข้อมูลของ DataFrame หลัก: Master / PO / ยอดขาย)
+# ==========================================
+# กำหนดชนิดข้อมูลครั้งเดียวตอนโหลด แทนการแปลงซ้ำในแต่ละหน้า
+# - "str"      ข้อความ (Product_ID ใน Master / PO: ใช้เป็น key ของ map / merge ทั่วทั้งแอป)
+# - "category" ข้อความที่ซ้ำกันมาก (หมวดหมู่, ขนส่ง, ร้านค้า) เก็บข้อความครั้งเดียว + รหัสตัวเลข
+# - "int"      จำนวนเต็ม ลดเหลือ int32 ถ้าค่าพอดี (ไม่ต่ำกว่านั้น กันบวก/ลบแล้วล้น)
+# - "float"    ตัวเลขทศนิยม (float64 เหมือนเดิม: เป็นราคา/เงิน ไม่ลดความละเอียด)
+# - "datetime" วันที่ -> datetime64 (ค่าที่อ่านไม่ได้ = NaT)
+# DataFrame ที่เล็กลง = st.cache_data pickle / copy ให้ทุก session เร็วขึ้น
+
+MASTER_SCHEMA = {
+    'Product_ID': 'str', 'Product_Type': 'category',
+    'Initial_Stock': 'int', 'Sheet_Row_Index': 'int',
+}
+PO_SCHEMA = {
+    'Product_ID': 'str', 'Transport_Type': 'category',
+    'Order_Date': 'datetime', 'Received_Date': 'datetime', 'Expected_Date': 'datetime',
+    'Qty_Ordered': 'int', 'Qty_Received': 'int', 'Total_Yuan': 'float', 'Yuan_Rate': 'float',
+    'CBM': 'float', 'Transport_Weight': 'float', 'Sheet_Row_Index': 'int',
+}
+# ยอดขาย (Sales Store / Daily Cube) ใช้ภายใน jst/ เท่านั้น -> Product_ID เป็น category ได้
+SALES_SCHEMA = {'Product_ID': 'category', 'Qty_Sold': 'int', 'Shop': 'category', 'Order_Time': 'datetime'}
+CUBE_SCHEMA = {'Product_ID': 'category', 'Sale_Date': 'datetime', 'Shop': 'category', 'Qty_Sold': 'int'}
+
+_INT32 = np.iinfo(np.int32)
+
+
+def compact_int(series):
+    values = pd.to_numeric(series, errors='coerce').fillna(0)
+    # มีทศนิยมจริง -> คงเป็นตัวเลขทศนิยมไว้ ไม่ปัดทิ้ง
+    if values.dtype.kind == 'f' and not (values % 1 == 0).all(): return values
+    if values.empty or (values.min() >= _INT32.min and values.max() <= _INT32.max): return values.astype('int32')
+    return values.astype('int64')
+
+
+def _convert(series, kind):
+    if kind == 'str': return series.astype(str)
+    if kind == 'category': return series if isinstance(series.dtype, pd.CategoricalDtype) else series.fillna("").astype(str).astype('category')
+    if kind == 'int': return compact_int(series)
+    if kind == 'float': return pd.to_numeric(series, errors='coerce').fillna(0).astype('float64')
+    if kind == 'datetime':
+        if series.dtype.kind == 'M': return series.astype('datetime64[ns]')
+        return pd.to_datetime(series, errors='coerce').astype('datetime64[ns]')
+    raise ValueError(f"unknown column kind: {kind}")
+
+
+def apply_schema(df, schema):
+    """แปลงคอลัมน์ที่มีอยู่ใน df ตาม schema (แก้ df เดิม คืน df เดิม) คอลัมน์ที่ไม่อยู่ใน schema ไม่ถูกแตะ"""
+    for col, kind in schema.items():
+        if col in df.columns: df[col] = _convert(df[col], kind)
+    return df
+
+
+def frame_memory(df):
+    """ขนาดหน่วยความจำจริง (bytes) ของ DataFrame รวมข้อความ"""
+    return int(df.memory_usage(index=True, deep=True).sum()) if df is not None else 0
+
+
+def memory_report(frames):
+    """ตารางสรุปหน่วยความจำ {ชื่อ: DataFrame} -> (ชื่อ, แถว, คอลัมน์, MB, คอลัมน์ที่ใหญ่ที่สุด)"""
+    rows = []
+    for name, df in frames.items():
+        if df is None: continue
+        usage = df.memory_usage(index=False, deep=True)
+        top = usage.idxmax() if len(usage) else ""
+        rows.append({
+            "ข้อมูล": name, "แถว": len(df), "คอลัมน์": len(df.columns),
+            "MB": round(frame_memory(df) / (1024 * 1024), 2),
+            "คอลัมน์ใหญ่สุด": f"{top} ({usage.max() / (1024 * 1024):.2f} MB)" if len(usage) else "-",
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,192 @@
+import os
+import json
+import urllib.parse
+import streamlit as st
+import streamlit.components.v1 as components
+from jst.tracing import traced
+
+# ==========================================
+# Virtualized Grid (ตารางใหญ่แบบวาดเฉพาะแถวที่มองเห็น)
+# ==========================================
+# - ส่งข้อมูลเป็น JSON แบบกะทัดรัด (แถวละ 1 array) แทน HTML ทั้งตาราง
+# - ข้อมูลแบ่งเป็น "กลุ่ม" (group) = แถวที่ต้อง merge cell (rowspan) ร่วมกัน จะถูกวาดพร้อมกันทั้งกลุ่มเสมอ
+# - หัวตาราง sticky, รูปภาพโหลดแบบ lazy
+# - แสดงผ่าน Custom Component (jst/grid_component): คลิกลิงก์ action -> ส่ง href กลับมาที่ Python
+#   แล้วเปลี่ยน query params + rerun (iframe ถูก sandbox เปลี่ยน URL ของหน้าหลักเองไม่ได้)
+#
+# ค่าใน cell: ข้อความ/ตัวเลขธรรมดา หรือ dict ที่มี key ต่อไปนี้ (ใส่เฉพาะที่ใช้)
+#   t = ข้อความ, sub = ข้อความบรรทัดที่ 2, title = tooltip, cls = class เพิ่ม, style = inline style
+#   img = URL รูป, badge/bg/fg = ป้ายสถานะ, links = [[ไอคอน, href, class], ...]
+
+
+def grid_column(title, cls="", style="", merged=False):
+    """คอลัมน์ของตาราง merged=True = ใช้ค่าเดียวทั้งกลุ่ม (rowspan)"""
+    return {"title": title, "cls": cls, "style": style, "m": merged}
+
+
+def grid_cell(t=None, **attrs):
+    cell = {k: v for k, v in attrs.items() if v not in (None, "")}
+    if t is not None: cell["t"] = t
+    return cell
+
+
+_GRID_BASE_CSS = """
+html, body { margin: 0; padding: 0; background: transparent; }
+.grid-wrap { overflow: auto; width: 100%; }
+.grid-wrap table { border-spacing: 0; }
+.grid-wrap thead th { position: sticky; top: 0; z-index: 10; }
+.grid-wrap tr.grid-spacer td { padding: 0 !important; border: 0 !important; background: transparent !important; }
+"""
+
+_GRID_SCRIPT = """
+(function() {
+  const D = JSON.parse(document.getElementById('grid-data').textContent);
+  const cols = D.cols, groups = D.groups, N = groups.length;
+  const wrap = document.getElementById('grid-wrap'), thead = document.getElementById('grid-head'), body = document.getElementById('grid-body');
+
+  // ความสูงของแต่ละกลุ่ม (เริ่มจากค่าประมาณ แล้วแก้เป็นค่าจริงหลังวาด) + ตำแหน่งสะสม
+  const h = new Float64Array(N), off = new Float64Array(N + 1);
+  for (let g = 0; g < N; g++) h[g] = groups[g][1].length * D.rowHeight;
+  const relayout = () => { for (let g = 0; g < N; g++) off[g + 1] = off[g] + h[g]; };
+  relayout();
+  const find = (y) => { let lo = 0, hi = N; while (lo < hi) { const mid = (lo + hi) >> 1; if (off[mid + 1] <= y) lo = mid + 1; else hi = mid; } return Math.min(lo, N - 1); };
+
+  const navigate = (e) => {
+    e.preventDefault();
+    if (window.gridAction) window.gridAction(e.currentTarget.getAttribute('href'));
+  };
+
+  const fill = (td, v) => {
+    if (v === null || v === undefined) return;
+    if (typeof v !== 'object') { td.textContent = v; return; }
+    if (v.cls) td.className += ' ' + v.cls;
+    if (v.style) td.style.cssText = v.style;
+    if (v.title) td.title = v.title;
+    if (v.img) { const im = document.createElement('img'); im.src = v.img; im.loading = 'lazy'; td.appendChild(im); }
+    if (v.badge !== undefined) {
+      const s = document.createElement('span'); s.className = 'status-badge'; s.textContent = v.badge;
+      s.style.backgroundColor = v.bg || ''; s.style.color = v.fg || ''; td.appendChild(s);
+    }
+    if (v.sub !== undefined) {
+      const m = document.createElement('div'); m.className = 'cell-main'; m.textContent = v.t === undefined ? '' : v.t; td.appendChild(m);
+      const s = document.createElement('div'); s.className = 'cell-sub'; s.textContent = v.sub; td.appendChild(s);
+    } else if (v.t !== undefined) { td.appendChild(document.createTextNode(v.t)); }
+    if (v.links) {
+      for (const [icon, href, cls] of v.links) {
+        const a = document.createElement('a'); a.href = href; a.textContent = icon;
+        if (cls) a.className = cls;
+        a.addEventListener('click', navigate); td.appendChild(a);
+      }
+    }
+  };
+
+  const buildGroup = (g) => {
+    const [merged, rows] = groups[g], trs = [];
+    rows.forEach((row, i) => {
+      const tr = document.createElement('tr'); tr.className = (g % 2 === 0) ? 'g0' : 'g1';
+      let mi = 0, ri = 0;
+      for (const c of cols) {
+        if (c.m) {
+          const v = merged[mi++];
+          if (i > 0) continue;
+          const td = document.createElement('td'); td.className = (c.cls ? c.cls + ' ' : '') + 'td-merged'; td.rowSpan = rows.length;
+          fill(td, v); tr.appendChild(td);
+        } else {
+          const td = document.createElement('td'); td.className = c.cls || '';
+          fill(td, row[ri++]); tr.appendChild(td);
+        }
+      }
+      trs.push(tr);
+    });
+    return trs;
+  };
+
+  const spacer = (px) => {
+    const tr = document.createElement('tr'); tr.className = 'grid-spacer';
+    const td = document.createElement('td'); td.colSpan = cols.length; td.style.height = px + 'px';
+    tr.appendChild(td); return tr;
+  };
+
+  let first = -1, last = -1;
+  const render = (force) => {
+    if (N === 0) return;
+    const top = Math.max(0, wrap.scrollTop - thead.offsetHeight);
+    const a = Math.max(0, find(top) - D.overscan);
+    const b = Math.min(N - 1, find(top + wrap.clientHeight) + D.overscan);
+    if (!force && a === first && b === last) return;
+    first = a; last = b;
+
+    const frag = document.createDocumentFragment(), rendered = [];
+    const topSpacer = spacer(off[a]); frag.appendChild(topSpacer);
+    for (let g = a; g <= b; g++) { const trs = buildGroup(g); trs.forEach((tr) => frag.appendChild(tr)); rendered.push([g, trs]); }
+    const bottomSpacer = spacer(off[N] - off[b + 1]); frag.appendChild(bottomSpacer);
+    body.replaceChildren(frag);
+
+    // วัดความสูงจริงของกลุ่มที่วาดแล้ว ถ้าต่างจากค่าประมาณ ให้คำนวณตำแหน่งใหม่
+    let changed = false;
+    for (const [g, trs] of rendered) {
+      let s = 0; for (const tr of trs) s += tr.getBoundingClientRect().height;
+      if (Math.abs(s - h[g]) > 0.5) { h[g] = s; changed = true; }
+    }
+    if (changed) {
+      relayout();
+      topSpacer.firstChild.style.height = off[a] + 'px';
+      bottomSpacer.firstChild.style.height = (off[N] - off[b + 1]) + 'px';
+    }
+  };
+
+  let ticking = false;
+  wrap.addEventListener('scroll', () => {
+    if (ticking) return; ticking = true;
+    requestAnimationFrame(() => { ticking = false; render(false); });
+  }, { passive: true });
+  window.addEventListener('resize', () => render(true));
+  render(true);
+})();
+"""
+
+
+@traced("grid_html", kind="html")
+def grid_html(columns, groups, height=600, row_height=40, css="", table_class="", overscan=6):
+    """สร้าง HTML ของตาราง (cache ไว้ใช้ซ้ำได้)
+    columns = รายการจาก grid_column(), groups = [(ค่า cell ของคอลัมน์ merged, [ค่า cell ของคอลัมน์ปกติ ต่อแถว]), ...]
+    row_height = ความสูงโดยประมาณต่อแถว (ใช้คำนวณ scrollbar ก่อนวาดจริง)"""
+    payload = {
+        "cols": [{"cls": c["cls"], "m": c["m"]} for c in columns],
+        "groups": [[list(merged), [list(r) for r in rows]] for merged, rows in groups],
+        "rowHeight": row_height,
+        "overscan": overscan,
+    }
+    data_json = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).replace("</", "<\\/")
+    header = "".join(
+        f'<th class="{c["cls"]}" style="{c["style"]}">{c["title"]}</th>' for c in columns
+    )
+    return (
+        f"<style>{_GRID_BASE_CSS}{css}</style>"
+        f'<div class="grid-wrap" id="grid-wrap" style="height:{height - 4}px;">'
+        f'<table class="{table_class}"><thead id="grid-head"><tr>{header}</tr></thead><tbody id="grid-body"></tbody></table></div>'
+        f'<script type="application/json" id="grid-data">{data_json}</script>'
+        f"<script>{_GRID_SCRIPT}</script>"
+    )
+
+
+GRID_COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grid_component")
+_grid_component = None
+
+
+def show_grid(html, height=600, key=None):
+    """แสดงตาราง ถ้ามีการคลิกลิงก์ action ใหม่: ใช้ query ของ href (เช่น ?edit_po=...&token=...) เป็น query params แล้ว rerun"""
+    global _grid_component
+    # ประกาศตอนใช้ครั้งแรก (ต้องอยู่ใน Script ของ Streamlit; benchmark import โมดูลนี้โดยไม่มี Streamlit)
+    if _grid_component is None: _grid_component = components.declare_component("jst_grid", path=GRID_COMPONENT_DIR)
+    event = _grid_component(html=html, height=height, key=key, default=None)
+    if not event or event.get("id") == st.session_state.get("_grid_action_id"): return
+    st.session_state["_grid_action_id"] = event.get("id")
+    query = urllib.parse.urlsplit(str(event.get("href", ""))).query
+    st.query_params.from_dict(dict(urllib.parse.parse_qsl(query, keep_blank_values=True)))
+    st.rerun()
+
+
+def render_grid(columns, groups, height=600, key=None, **grid_opts):
+    """แสดงตารางแบบ Virtualized (ดู grid_html)"""
+    show_grid(grid_html(columns, groups, height=height, **grid_opts), height=height, key=key)
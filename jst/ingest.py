@@ -0,0 +1,493 @@
+import io
+import os
+import re
+import json
+import hashlib
+import threading
+import multiprocessing
+import openpyxl
+import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date
+from googleapiclient.http import MediaIoBaseDownload
+from jst.tracing import span
+
+# ==========================================
+# Ingestion Manifest & On-disk Cache (ไฟล์ Excel จาก Google Drive)
+# ==========================================
+# เก็บ id / modifiedTime / md5Checksum ของแต่ละไฟล์ไว้ใน manifest.json
+# และเก็บ DataFrame ที่ parse แล้วไว้ในดิสก์ -> รอบถัดไปโหลดเฉพาะไฟล์ที่ใหม่/ถูกแก้ไข
+
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+DRIVE_FILE_FIELDS = "files(id, name, modifiedTime, md5Checksum)"
+DRIVE_LIST_PAGE_SIZE = 1000 # ค่าสูงสุดที่ Drive API อนุญาต
+
+# ค่า Default ของการโหลดแบบขนาน (ปรับได้จาก INGEST_OPTIONS ใน app.py)
+DEFAULT_DOWNLOAD_WORKERS = 4
+DEFAULT_PARSE_WORKERS = 2
+DEFAULT_DOWNLOAD_TIMEOUT = 120
+DEFAULT_PARSE_TIMEOUT = 180
+
+_sync_locks = {}
+_sync_locks_guard = threading.Lock()
+_parse_pool = None
+_parse_pool_workers = 0
+_parse_pool_lock = threading.Lock()
+
+
+class PickleFrameStore:
+    """เก็บ DataFrame ที่ parse แล้วของแต่ละไฟล์เป็น pickle (1 ไฟล์ใน Drive = 1 ไฟล์ pickle)"""
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, file_id):
+        safe_name = hashlib.md5(file_id.encode()).hexdigest()
+        return os.path.join(self.root, f"{safe_name}.pkl")
+
+    def has(self, file_id):
+        return os.path.exists(self._path(file_id))
+
+    def save(self, file_id, df):
+        os.makedirs(self.root, exist_ok=True)
+        df.to_pickle(self._path(file_id))
+
+    def load(self, file_id):
+        return pd.read_pickle(self._path(file_id))
+
+    def remove(self, file_id):
+        try: os.remove(self._path(file_id))
+        except OSError: pass
+
+
+class IngestManifest:
+    def __init__(self, cache_dir, store=None):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, "manifest.json")
+        self.store = store or PickleFrameStore(os.path.join(cache_dir, "frames"))
+        self.entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_fresh(self, item):
+        entry = self.entries.get(item['id'])
+        if not entry: return False
+        if entry.get('modifiedTime') != item.get('modifiedTime'): return False
+        if entry.get('md5Checksum') != item.get('md5Checksum'): return False
+        return self.store.has(item['id'])
+
+    def record(self, item, df):
+        self.store.save(item['id'], df)
+        date_min, date_max = frame_date_range(df)
+        self.entries[item['id']] = {
+            'name': item.get('name', ''),
+            'modifiedTime': item.get('modifiedTime'),
+            'md5Checksum': item.get('md5Checksum'),
+            'date_min': date_min,
+            'date_max': date_max,
+            'layout': df.attrs.get('layout'),
+        }
+
+    def layout(self, file_id):
+        # Layout หัวตารางที่ตรวจเจอครั้งล่าสุดของไฟล์นี้ (ยังใช้ได้แม้ไฟล์ถูกอัปโหลดทับ)
+        return self.entries.get(file_id, {}).get('layout')
+
+    def data_range(self, item):
+        # ช่วงวันที่จากข้อมูลจริง (บันทึกไว้ตอน parse ครั้งแรก) ใช้ได้เฉพาะไฟล์ที่ยังไม่ถูกแก้ไข
+        if not self.is_fresh(item): return None, None
+        entry = self.entries[item['id']]
+        return entry.get('date_min'), entry.get('date_max')
+
+    def load_frame(self, file_id):
+        return self.store.load(file_id)
+
+    def forget_missing(self, live_ids):
+        # ไฟล์ที่ถูกลบออกจาก Folder แล้ว -> ลบออกจาก manifest และ cache ด้วย
+        for file_id in [k for k in self.entries if k not in live_ids]:
+            self.store.remove(file_id)
+            del self.entries[file_id]
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def list_folder_files(service, folder_id, limit=None):
+    """ดึงรายชื่อไฟล์ทั้งหมดใน Folder (ตาม nextPageToken จนครบ) เรียงใหม่ -> เก่า (limit = เอาแค่ N ไฟล์ล่าสุด)"""
+    items = []
+    page_token = None
+    while True:
+        results = service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            orderBy='modifiedTime desc', pageSize=min(limit or DRIVE_LIST_PAGE_SIZE, DRIVE_LIST_PAGE_SIZE), pageToken=page_token,
+            fields=f"nextPageToken, {DRIVE_FILE_FIELDS}"
+        ).execute()
+        items.extend(results.get('files', []))
+        page_token = results.get('nextPageToken')
+        if limit and len(items) >= limit: return items[:limit]
+        if not page_token: return items
+
+
+# ==========================================
+# File Index: ช่วงวันที่ที่แต่ละไฟล์ครอบคลุม (จากชื่อไฟล์ หรือจากข้อมูลตอน parse ครั้งแรก)
+# ==========================================
+_NAME_DATE_PATTERNS = [
+    # 2024-05-31 / 2024_05_31 / 20240531 (รองรับปี พ.ศ. เช่น 2567)
+    (re.compile(r'(?<!\d)((?:20|25)\d{2})[-_.]?(0[1-9]|1[0-2])[-_.]?(0[1-9]|[12]\d|3[01])(?!\d)'), ('y', 'm', 'd')),
+    # 31-05-2024 / 31.05.2024 / 31_05_2567
+    (re.compile(r'(?<!\d)(0?[1-9]|[12]\d|3[01])[-_.](0?[1-9]|1[0-2])[-_.]((?:20|25)\d{2})(?!\d)'), ('d', 'm', 'y')),
+]
+
+
+def dates_from_name(name):
+    found = []
+    for pattern, order in _NAME_DATE_PATTERNS:
+        for match in pattern.finditer(name):
+            parts = dict(zip(order, (int(g) for g in match.groups())))
+            if parts['y'] > 2500: parts['y'] -= 543
+            try: found.append(date(parts['y'], parts['m'], parts['d']))
+            except ValueError: continue
+    if not found: return None, None
+    return min(found).isoformat(), max(found).isoformat()
+
+
+def frame_date_range(df):
+    if 'Order_Time' not in df.columns: return None, None
+    order_time = pd.to_datetime(df['Order_Time'], errors='coerce').dropna()
+    if order_time.empty: return None, None
+    return order_time.min().date().isoformat(), order_time.max().date().isoformat()
+
+
+def build_file_index(items, cache_name, store=None):
+    """คืนรายการไฟล์ Excel พร้อมช่วงวันที่ (date_min/date_max เป็น ISO string หรือ None ถ้ายังไม่รู้)"""
+    manifest = IngestManifest(os.path.join(CACHE_ROOT, cache_name), store)
+    index = []
+    for item in items:
+        if not item['name'].endswith(('.xlsx', '.xls')): continue
+        date_min, date_max = manifest.data_range(item)
+        if date_min is None: date_min, date_max = dates_from_name(item['name'])
+        index.append(dict(item, date_min=date_min, date_max=date_max))
+    return index
+
+
+def select_files_in_range(index, date_from=None, date_to=None):
+    """เลือกเฉพาะไฟล์ที่ช่วงวันที่ทับกับ date_from..date_to (ไฟล์ที่ยังไม่รู้ช่วงวันที่จะถูกเลือกเสมอ)"""
+    d_from = date_from.isoformat() if date_from else None
+    d_to = date_to.isoformat() if date_to else None
+    selected = []
+    for entry in index:
+        if entry['date_min'] is None or entry['date_max'] is None: selected.append(entry)
+        elif d_from and entry['date_max'] < d_from: continue
+        elif d_to and entry['date_min'] > d_to: continue
+        else: selected.append(entry)
+    return selected
+
+
+def download_drive_file(service, file_id):
+    request = service.files().get_media(fileId=file_id)
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    while done is False: status, done = downloader.next_chunk()
+    return fh.getvalue()
+
+
+def parse_sale_excel(content):
+    temp_df = pd.read_excel(io.BytesIO(content))
+    col_map = {'รหัสสินค้า':'Product_ID', 'จำนวน':'Qty_Sold', 'ร้านค้า':'Shop', 'เวลาสั่งซื้อ':'Order_Time'}
+    temp_df = temp_df.rename(columns={k:v for k,v in col_map.items() if k in temp_df.columns})
+
+    if 'Qty_Sold' in temp_df.columns:
+        temp_df['Qty_Sold'] = pd.to_numeric(temp_df['Qty_Sold'], errors='coerce').fillna(0).astype(int)
+    if 'Order_Time' in temp_df.columns:
+        temp_df['Order_Time'] = pd.to_datetime(temp_df['Order_Time'], errors='coerce')
+        temp_df['Date_Only'] = temp_df['Order_Time'].dt.date
+    return temp_df
+
+
+STOCK_ID_HEADERS = ['รหัสSKU', 'SKU', 'รหัสสินค้า', 'รหัส', 'Item No']
+# ลำดับความสำคัญของคอลัมน์ Stock: "ใช้ได้" > "คงเหลือ" > "Stock"/"จำนวน"
+STOCK_QTY_KEYWORDS = [('ใช้ได้',), ('คงเหลือ',), ('Stock', 'จำนวน')]
+STOCK_HEADER_SCAN_ROWS = 15
+
+
+def _is_stock_header_row(values):
+    row_str = ' '.join('nan' if v is None else str(v) for v in values)
+    return 'SKU' in row_str or 'รหัส' in row_str
+
+
+def detect_stock_layout(header_values):
+    """เลือกคอลัมน์ Product_ID และคอลัมน์ Stock ที่ดีที่สุดจากแถวหัวตาราง (None ถ้าไม่ครบ)"""
+    names = ['' if v is None else str(v).strip() for v in header_values]
+    id_col = next((i for i, n in enumerate(names) if n in STOCK_ID_HEADERS), None)
+    stock_col = None
+    for keywords in STOCK_QTY_KEYWORDS:
+        stock_col = next((i for i, n in enumerate(names) if any(k in n for k in keywords)), None)
+        if stock_col is not None: break
+    if id_col is None or stock_col is None: return None
+    return {'id_col': id_col, 'id_name': names[id_col], 'stock_col': stock_col, 'stock_name': names[stock_col]}
+
+
+def _layout_matches(layout, header_values):
+    names = ['' if v is None else str(v).strip() for v in header_values]
+    for col_key, name_key in (('id_col', 'id_name'), ('stock_col', 'stock_name')):
+        if layout[col_key] >= len(names) or names[layout[col_key]] != layout[name_key]: return False
+    return True
+
+
+def _cell_to_pid(value):
+    if value is None: return ""
+    if isinstance(value, float) and value.is_integer(): value = int(value)
+    return str(value).strip()
+
+
+def _cell_to_qty(value):
+    if value is None: return 0
+    if isinstance(value, (int, float)): return int(value) if value == value else 0
+    try: return int(float(str(value).strip()))
+    except (TypeError, ValueError): return 0
+
+
+def parse_stock_excel(content, layout=None):
+    """อ่านไฟล์ Stock จริงจาก JST แบบ Streaming (openpyxl read_only) รอบเดียว
+    หาแถวหัวตาราง + ดึงเฉพาะคอลัมน์ Product_ID / Stock ที่ต้องใช้ -> คืน Product_ID, Real_Stock
+    layout = ตำแหน่งหัวตารางที่ตรวจเจอครั้งก่อนของไฟล์เดียวกัน (ถ้ายังตรงกันจะข้ามการค้นหา)"""
+    if not content.startswith(b'PK'):
+        # ไฟล์ .xls แบบเก่า openpyxl อ่านไม่ได้ -> ใช้ pandas แทน
+        return _parse_stock_excel_pandas(content)
+
+    wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+
+        # 1. อ่านแค่ 15 แถวแรกไว้หาหัวตาราง (ถ้า layout เดิมยังใช้ได้ ไม่ต้องค้นหาใหม่)
+        head_rows = []
+        for row in rows:
+            head_rows.append(row)
+            if len(head_rows) >= STOCK_HEADER_SCAN_ROWS: break
+
+        header_row = None
+        if layout and layout.get('header_row', -1) < len(head_rows) and _layout_matches(layout, head_rows[layout['header_row']]):
+            header_row = layout['header_row']
+        else:
+            header_row = next((i for i, r in enumerate(head_rows) if _is_stock_header_row(r)), 0)
+            layout = detect_stock_layout(head_rows[header_row]) if head_rows else None
+            if layout is None: return pd.DataFrame(columns=['Product_ID', 'Real_Stock'])
+            layout = dict(layout, header_row=header_row)
+
+        # 2. วนแถวข้อมูลรอบเดียว ดึงเฉพาะ 2 คอลัมน์
+        id_col, stock_col = layout['id_col'], layout['stock_col']
+        pids, qtys = [], []
+        def _collect(row):
+            pid = _cell_to_pid(row[id_col] if id_col < len(row) else None)
+            if len(pid) <= 1: return # กรองแถวที่ไม่มีข้อมูล
+            pids.append(pid)
+            qtys.append(_cell_to_qty(row[stock_col] if stock_col < len(row) else None))
+
+        for row in head_rows[header_row + 1:]: _collect(row)
+        for row in rows: _collect(row)
+    finally:
+        wb.close()
+
+    df = pd.DataFrame({'Product_ID': pids, 'Real_Stock': qtys})
+    df['Real_Stock'] = df['Real_Stock'].astype(int)
+    df.attrs['layout'] = layout
+    return df
+
+
+def _parse_stock_excel_pandas(content):
+    """อ่านไฟล์ Stock จริงจาก JST (Fixed: แก้ปัญหาคอลัมน์ซ้ำ) -> คืน Product_ID, Real_Stock"""
+    fh = io.BytesIO(content)
+
+    # 1. หาบรรทัดหัวตาราง (Header)
+    temp_raw = pd.read_excel(fh, header=None)
+    header_row = 0
+    for i in range(min(15, len(temp_raw))):
+        row_str = temp_raw.iloc[i].astype(str).str.cat(sep=' ')
+        if 'SKU' in row_str or 'รหัส' in row_str:
+            header_row = i
+            break
+
+    # 2. อ่านข้อมูลจริง
+    fh.seek(0)
+    temp_df = pd.read_excel(fh, header=header_row)
+    temp_df.columns = temp_df.columns.astype(str).str.strip() # ล้างชื่อคอลัมน์
+
+    # =========================================================
+    # 🏆 COLUMN SELECTION (เลือกคอลัมน์ที่ดีที่สุดเพียง 1 เดียว)
+    # =========================================================
+    col_map = {}
+
+    # หา ID (เลือกตัวแรกที่เจอ)
+    for col in temp_df.columns:
+        if col in ['รหัสSKU', 'SKU', 'รหัสสินค้า', 'รหัส', 'Item No']:
+            col_map[col] = 'Product_ID'
+            break # เจอแล้วหยุดเลย
+
+    # หา Stock (มีลำดับความสำคัญ)
+    best_stock_col = None
+
+    # ลำดับ 1: เจาะจงคำว่า "ใช้ได้" (ตามไฟล์คุณ)
+    for col in temp_df.columns:
+        if 'ใช้ได้' in col:
+            best_stock_col = col
+            break
+
+    # ลำดับ 2: ถ้าไม่เจอ หาคำว่า "คงเหลือ"
+    if not best_stock_col:
+        for col in temp_df.columns:
+            if 'คงเหลือ' in col:
+                best_stock_col = col
+                break
+
+    # ลำดับ 3: ถ้าไม่เจอ หาคำว่า "Stock" หรือ "จำนวน"
+    if not best_stock_col:
+        for col in temp_df.columns:
+            if 'Stock' in col or 'จำนวน' in col:
+                best_stock_col = col
+                break
+
+    # Map ชื่อคอลัมน์
+    if best_stock_col:
+        col_map[best_stock_col] = 'Real_Stock'
+
+    # =========================================================
+
+    # เปลี่ยนชื่อและดึงข้อมูล
+    if 'Product_ID' in col_map.values() and 'Real_Stock' in col_map.values():
+        temp_df = temp_df.rename(columns={k:v for k,v in col_map.items() if k in temp_df.columns})
+
+        # แปลงข้อมูล (Clean Data)
+        temp_df['Real_Stock'] = pd.to_numeric(temp_df['Real_Stock'], errors='coerce').fillna(0).astype(int)
+        temp_df['Product_ID'] = temp_df['Product_ID'].astype(str).str.strip()
+
+        # กรองแถวที่ไม่มีข้อมูล
+        temp_df = temp_df[temp_df['Product_ID'].str.len() > 1]
+        return temp_df[['Product_ID', 'Real_Stock']]
+
+    return pd.DataFrame(columns=['Product_ID', 'Real_Stock'])
+
+
+# ==========================================
+# Concurrent Download (Thread Pool) + Parse (Process Pool)
+# ==========================================
+
+def _get_parse_pool(workers):
+    # Process Pool ใช้ร่วมกันทั้งแอป (สร้างครั้งเดียว) เพราะการ spawn process มีต้นทุนสูง
+    # ใช้ spawn เสมอ เนื่องจาก Streamlit server มีหลาย thread (fork ไม่ปลอดภัย)
+    global _parse_pool, _parse_pool_workers
+    with _parse_pool_lock:
+        if _parse_pool is None or _parse_pool_workers != workers:
+            if _parse_pool is not None: _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _parse_pool_workers = workers
+        return _parse_pool
+
+
+def _reset_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None: _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+def _submit_parse(parse_fn, content, parse_workers, kwargs):
+    if parse_workers > 0:
+        try:
+            return _get_parse_pool(parse_workers).submit(parse_fn, content, **kwargs)
+        except Exception as err:
+            # Pool เสีย (เช่น BrokenProcessPool) -> สร้างใหม่รอบหน้า แล้ว parse ใน thread นี้แทน
+            print(f"Parse pool unavailable: {err}")
+            _reset_parse_pool()
+    fut = Future()
+    try: fut.set_result(parse_fn(content, **kwargs))
+    except Exception as err: fut.set_exception(err)
+    return fut
+
+
+def fetch_and_parse(download, items, parse_fn,
+                    download_workers=DEFAULT_DOWNLOAD_WORKERS, parse_workers=DEFAULT_PARSE_WORKERS,
+                    download_timeout=DEFAULT_DOWNLOAD_TIMEOUT, parse_timeout=DEFAULT_PARSE_TIMEOUT,
+                    parse_kwargs=None):
+    """ดาวน์โหลดไฟล์พร้อมกันด้วย Thread Pool แล้วส่งไป parse ใน Process Pool
+    ไฟล์ที่เสีย/เกินเวลาจะถูกข้าม ผลลัพธ์เรียงตาม modifiedTime (ใหม่ -> เก่า) เหมือนการโหลดทีละไฟล์
+    download(file_id) -> bytes ของไฟล์ (เช่น GoogleStorage.download / LocalStorage.download ดู jst/storage.py) ต้อง thread-safe
+    parse_kwargs = {file_id: kwargs} สำหรับส่งค่าเพิ่มเติมให้ parse_fn รายไฟล์
+    คืนค่าเป็น list ของ (item, DataFrame)"""
+    ordered = sorted(items, key=lambda x: x.get('modifiedTime') or '', reverse=True)
+    if not ordered: return []
+
+    dl_pool = ThreadPoolExecutor(max_workers=max(1, download_workers), thread_name_prefix="drive-dl")
+    try:
+        # Tracing: เวลารอไฟล์ดาวน์โหลด (รวม bytes) / เวลารอ parse ส่วนที่เหลือหลังดาวน์โหลดครบ
+        with span("drive_download", kind="drive") as dl_span:
+            dl_futures = [(item, dl_pool.submit(download, item['id'])) for item in ordered]
+            parse_futures = []
+            for item, fut in dl_futures:
+                try: content = fut.result(timeout=download_timeout)
+                except Exception as err:
+                    print(f"Skip file {item['name']} (download): {err!r}")
+                    continue
+                dl_span.add_bytes(len(content))
+                parse_futures.append((item, _submit_parse(parse_fn, content, parse_workers, (parse_kwargs or {}).get(item['id'], {}))))
+            dl_span.set(rows=len(parse_futures))
+
+        results = []
+        with span("excel_parse", kind="parse") as parse_span:
+            for item, fut in parse_futures:
+                try: results.append((item, fut.result(timeout=parse_timeout)))
+                except Exception as err:
+                    print(f"Skip file {item['name']} (parse): {err!r}")
+                    continue
+            parse_span.set(rows=sum(len(df) for _, df in results))
+        return results
+    finally:
+        # ไม่รอ thread ที่ค้าง (timeout) ให้จบ เพื่อไม่ให้ไฟล์เสียไฟล์เดียวถ่วงทั้งรอบ
+        dl_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _folder_lock(cache_name):
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(cache_name, threading.Lock())
+
+
+def sync_folder(download, items, cache_name, parse_fn, selected_ids=None, reuse_layouts=False, store=None, **pool_opts):
+    """Sync ไฟล์ใน Folder แบบ Incremental: ดาวน์โหลด/parse เฉพาะไฟล์ใหม่หรือที่ถูกแก้ไข (แบบขนาน)
+    แล้วเก็บผลลง store (Default = pickle รายไฟล์) ไฟล์ที่ถูกลบออกจาก Folder จะถูกลบออกจาก store ด้วย
+    items = รายชื่อไฟล์ทั้งหมดใน Folder, selected_ids = sync เฉพาะไฟล์เหล่านี้ (None = ทุกไฟล์)
+    reuse_layouts = ส่ง layout หัวตารางที่เคยตรวจเจอของแต่ละไฟล์ให้ parse_fn (parse_fn ต้องรับ layout=)
+    คืนค่า (manifest, รายการไฟล์ที่เลือกซึ่งมีข้อมูลใน store แล้ว เรียงตาม modifiedTime ใหม่ -> เก่า)"""
+    with _folder_lock(cache_name):
+        manifest = IngestManifest(os.path.join(CACHE_ROOT, cache_name), store)
+        all_excel_items = [item for item in items if item['name'].endswith(('.xlsx', '.xls'))]
+        excel_items = [item for item in all_excel_items if selected_ids is None or item['id'] in selected_ids]
+        excel_items.sort(key=lambda x: x.get('modifiedTime') or '', reverse=True)
+
+        stale_items = [item for item in excel_items if not manifest.is_fresh(item)]
+        parse_kwargs = {item['id']: {'layout': manifest.layout(item['id'])} for item in stale_items} if reuse_layouts else None
+        for item, temp_df in fetch_and_parse(download, stale_items, parse_fn, parse_kwargs=parse_kwargs, **pool_opts):
+            try: manifest.record(item, temp_df)
+            except OSError as err: print(f"Cache write failed {item['name']}: {err}")
+
+        manifest.forget_missing({item['id'] for item in all_excel_items})
+        manifest.save()
+        # ไฟล์ที่โหลด/parse ไม่สำเร็จในรอบนี้จะไม่อยู่ในรายการ
+        return manifest, [item for item in excel_items if manifest.is_fresh(item)]
+
+
+def sync_folder_frames(download, items, cache_name, parse_fn, **sync_opts):
+    """sync_folder แล้วคืน DataFrame ของแต่ละไฟล์ที่เลือก (เรียงตาม modifiedTime ใหม่ -> เก่า)"""
+    manifest, ready_items = sync_folder(download, items, cache_name, parse_fn, **sync_opts)
+    frames = []
+    for item in ready_items:
+        try: temp_df = manifest.load_frame(item['id'])
+        except Exception as err:
+            print(f"Skip file {item['name']}: {err}")
+            continue
+        if not temp_df.empty: frames.append(temp_df)
+    return frames
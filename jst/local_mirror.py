@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import pandas as pd
+from gspread.utils import numericise
+
+# ==========================================
+# Local Mirror (สำเนาข้อมูล Google Sheet ในเครื่อง: SQLite)
+# ==========================================
+# - ทุกครั้งที่อ่าน Tab จาก Sheet สำเร็จ จะ sync ลง SQLite โดยเขียนเฉพาะแถวที่เปลี่ยน (เทียบ hash รายแถว)
+# - Sheet ไม่ตอบสนอง / โดน rate limit -> แอปใช้สำเนาล่าสุดแทน (โหมดอ่านอย่างเดียว) และจะลองอ่าน Sheet ใหม่ทุก retry_seconds
+# - Delta pull: เก็บ version ของ Spreadsheet (storage.sheet_version()) ที่อ่านไว้ ถ้า version ยังเท่าเดิมใช้สำเนาแทนการดึงทั้ง Tab
+# - คอลัมน์หลัก (Product_ID / PO_Number / Order_Date / Expected_Date) ถูกแยกเก็บใน sheet_keys พร้อม index
+#   -> ค้นหา PO / ประวัติรายสินค้า / ช่วงวันที่ ด้วย SQL ไม่ต้องไล่ทั้ง DataFrame (select_rows / search_keys)
+# - การเขียนกลับ Sheet ยังผ่าน Write Queue ตามเดิม (ดู jst/write_queue.py)
+
+OFFLINE_RETRY_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_meta (
+    tab TEXT PRIMARY KEY,
+    header TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    synced_at INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    version TEXT
+);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    tab TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    row_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (tab, row_index)
+);
+CREATE TABLE IF NOT EXISTS sheet_keys (
+    tab TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    product_id TEXT COLLATE NOCASE,
+    po_number TEXT COLLATE NOCASE,
+    order_date TEXT,
+    expected_date TEXT,
+    PRIMARY KEY (tab, row_index)
+);
+CREATE INDEX IF NOT EXISTS sheet_keys_product ON sheet_keys (tab, product_id);
+CREATE INDEX IF NOT EXISTS sheet_keys_po ON sheet_keys (tab, po_number);
+CREATE INDEX IF NOT EXISTS sheet_keys_order_date ON sheet_keys (tab, order_date);
+CREATE INDEX IF NOT EXISTS sheet_keys_expected_date ON sheet_keys (tab, expected_date);
+"""
+
+# ชื่อคอลัมน์ใน DataFrame (หลัง rename ตาม column map) -> คอลัมน์ใน sheet_keys
+KEY_COLUMNS = {"Product_ID": "product_id", "PO_Number": "po_number", "Order_Date": "order_date", "Expected_Date": "expected_date"}
+DATE_KEYS = ("order_date", "expected_date")
+
+
+def _row_json(row):
+    return json.dumps(list(row), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _version_key(version):
+    return None if version is None else json.dumps(version, separators=(",", ":"), default=str)
+
+
+def _like_prefix(text):
+    return re.sub(r"([\\%_])", r"\\\1", text) + "%"
+
+
+def key_positions(header, col_map):
+    """คอลัมน์ใน sheet_keys -> ตำแหน่งคอลัมน์ในหัวตาราง (ตาม column map เช่น PO_COLUMN_MAP ใช้คอลัมน์แรกที่พบ)"""
+    positions = {}
+    for i, name in enumerate(header):
+        key = KEY_COLUMNS.get(col_map.get(str(name).strip()))
+        if key and key not in positions: positions[key] = i
+    return positions
+
+
+def row_keys(rows, positions):
+    """ค่าคอลัมน์หลักของแต่ละแถว [(product_id, po_number, order_date, expected_date)] (วันที่เป็น YYYY-MM-DD แปลงแบบเดียวกับ frame_types)"""
+    columns = {}
+    for key in ("product_id", "po_number") + DATE_KEYS:
+        pos = positions.get(key)
+        values = [row[pos] if pos is not None and pos < len(row) else "" for row in rows]
+        if pos is None:
+            columns[key] = [None] * len(rows)
+        elif key in DATE_KEYS:
+            dates = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce')
+            columns[key] = [None if pd.isna(d) else d.strftime("%Y-%m-%d") for d in dates]
+        else:
+            # แปลงแบบเดียวกับ grid_records (numericise) -> ตรงกับค่าใน DataFrame
+            columns[key] = [str(numericise(str(v))).strip() for v in values]
+    return list(zip(*(columns[key] for key in ("product_id", "po_number") + DATE_KEYS)))
+
+
+class LocalMirror:
+    def __init__(self, path, retry_seconds=OFFLINE_RETRY_SECONDS, column_maps=None):
+        """column_maps = {tab: {หัวตารางใน Sheet: ชื่อคอลัมน์ใน DataFrame}} ใช้หาคอลัมน์หลักที่ทำ index (ดู jst/sheet_frames.py)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.retry_seconds = retry_seconds
+        self.column_maps = column_maps or {}
+        self._lock = threading.Lock()
+        self._offline = {}   # tab -> (เวลาที่ลองอ่าน Sheet ล่าสุด (monotonic), error)
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+            # ไฟล์สำเนาจากรุ่นก่อน (ยังไม่มีคอลัมน์ version)
+            if "version" not in [c[1] for c in con.execute("PRAGMA table_info(sheet_meta)")]:
+                con.execute("ALTER TABLE sheet_meta ADD COLUMN version TEXT")
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    # --- Sync ---
+    def sync_tab(self, tab, grid, fetched_at, version=None):
+        """บันทึกข้อมูล Tab (แถวแรก = หัวตาราง) ลงสำเนา เขียนเฉพาะแถวที่เปลี่ยน คืนจำนวนแถวที่เขียน
+        version = storage.sheet_version() ที่อ่านก่อนอ่าน Tab (ใช้ตัดสิน Delta pull ครั้งถัดไป)"""
+        header = list(grid[0]) if grid else []
+        rows = [_row_json(row) for row in grid[1:]]
+        hashes = [hashlib.md5(data.encode("utf-8")).hexdigest() for data in rows]
+        col_map = self.column_maps.get(tab)
+        with self._lock:
+            con = self._connect()
+            try:
+                with con:
+                    old = dict(con.execute("SELECT row_index, row_hash FROM sheet_rows WHERE tab = ?", (tab,)))
+                    if col_map is not None:
+                        meta = con.execute("SELECT header FROM sheet_meta WHERE tab = ?", (tab,)).fetchone()
+                        key_count = con.execute("SELECT COUNT(*) FROM sheet_keys WHERE tab = ?", (tab,)).fetchone()[0]
+                        # หัวตารางเปลี่ยน (ตำแหน่งคอลัมน์หลักอาจย้าย) หรือ index ไม่ครบ -> ทำ index ใหม่ทั้ง Tab
+                        if meta is None or meta[0] != _row_json(header) or key_count != len(old):
+                            con.execute("DELETE FROM sheet_keys WHERE tab = ?", (tab,))
+                            old = {}
+                    changed = [
+                        (tab, i + 2, row_hash, data)
+                        for i, (data, row_hash) in enumerate(zip(rows, hashes)) if old.get(i + 2) != row_hash
+                    ]
+                    con.executemany("INSERT OR REPLACE INTO sheet_rows VALUES (?, ?, ?, ?)", changed)
+                    con.execute("DELETE FROM sheet_rows WHERE tab = ? AND row_index > ?", (tab, len(rows) + 1))
+                    if col_map is not None:
+                        keys = row_keys([grid[row_index - 1] for _, row_index, _, _ in changed], key_positions(header, col_map))
+                        con.executemany(
+                            "INSERT OR REPLACE INTO sheet_keys VALUES (?, ?, ?, ?, ?, ?)",
+                            [(tab, row_index) + key for (_, row_index, _, _), key in zip(changed, keys)]
+                        )
+                        con.execute("DELETE FROM sheet_keys WHERE tab = ? AND row_index > ?", (tab, len(rows) + 1))
+                    con.execute(
+                        "INSERT OR REPLACE INTO sheet_meta (tab, header, fetched_at, synced_at, row_count, version) VALUES (?, ?, ?, ?, ?, ?)",
+                        (tab, _row_json(header), int(fetched_at), time.time_ns(), len(rows), _version_key(version))
+                    )
+            finally:
+                con.close()
+        return len(changed)
+
+    def fetched_at(self, tab):
+        """เวลาที่อ่านข้อมูลชุดที่อยู่ในสำเนา (None = ยังไม่เคย sync)"""
+        con = self._connect()
+        try: row = con.execute("SELECT fetched_at FROM sheet_meta WHERE tab = ?", (tab,)).fetchone()
+        finally: con.close()
+        return row[0] if row else None
+
+    def load_tab(self, tab, version=None):
+        """คืน (grid, fetched_at) จากสำเนา หรือ None ถ้าไม่มี
+        version ไม่ใช่ None -> คืนเฉพาะเมื่อสำเนา sync จาก Spreadsheet version เดียวกัน (Delta pull: ไม่ต้องดึงทั้ง Tab)"""
+        con = self._connect()
+        try:
+            meta = con.execute("SELECT header, fetched_at, version FROM sheet_meta WHERE tab = ?", (tab,)).fetchone()
+            if meta is None: return None
+            if version is not None and meta[2] != _version_key(version): return None
+            rows = con.execute("SELECT data FROM sheet_rows WHERE tab = ? ORDER BY row_index", (tab,)).fetchall()
+        finally:
+            con.close()
+        return [json.loads(meta[0])] + [json.loads(data) for (data,) in rows], meta[1]
+
+    # --- Query (ใช้ index ของ sheet_keys) ---
+    def select_rows(self, tab, product_id=None, po_number=None, date_key=None, start=None, end=None):
+        """แถวที่ตรงเงื่อนไข (รหัสสินค้า / เลข PO ตรงทุกตัวอักษร, date_key = "order_date" / "expected_date" อยู่ในช่วง start-end)
+        คืน (grid ที่แถวแรก = หัวตาราง, [เลขแถวใน Sheet]) หรือ None ถ้ายังไม่มีสำเนา"""
+        where, params = ["k.tab = ?"], [tab]
+        for column, value in (("product_id", product_id), ("po_number", po_number)):
+            # = แบบ NOCASE ใช้ index ได้ + เทียบซ้ำแบบตรงตัวอักษร
+            if value is not None:
+                where.append(f"k.{column} = ? AND k.{column} = ? COLLATE BINARY")
+                params += [str(value).strip()] * 2
+        if date_key is not None:
+            if date_key not in DATE_KEYS: raise ValueError(f"unknown date key: {date_key}")
+            if start is not None: where.append(f"k.{date_key} >= ?"); params.append(str(start)[:10])
+            if end is not None: where.append(f"k.{date_key} <= ?"); params.append(str(end)[:10])
+        con = self._connect()
+        try:
+            meta = con.execute("SELECT header FROM sheet_meta WHERE tab = ?", (tab,)).fetchone()
+            if meta is None: return None
+            rows = con.execute(
+                "SELECT r.row_index, r.data FROM sheet_keys k JOIN sheet_rows r ON r.tab = k.tab AND r.row_index = k.row_index "
+                f"WHERE {' AND '.join(where)} ORDER BY k.row_index", params
+            ).fetchall()
+        finally:
+            con.close()
+        return [json.loads(meta[0])] + [json.loads(data) for _, data in rows], [row_index for row_index, _ in rows]
+
+    def search_keys(self, tab, prefix, limit=None):
+        """[(เลข PO, รหัสสินค้า)] ที่เลข PO หรือรหัสสินค้าขึ้นต้นด้วย prefix (ไม่สนตัวพิมพ์เล็ก/ใหญ่) เรียงเลข PO ล่าสุดก่อน"""
+        pattern = _like_prefix(str(prefix).strip())
+        con = self._connect()
+        try:
+            return con.execute(
+                "SELECT po_number, product_id FROM sheet_keys WHERE tab = ? AND po_number LIKE ? ESCAPE '\\' "
+                "UNION SELECT po_number, product_id FROM sheet_keys WHERE tab = ? AND product_id LIKE ? ESCAPE '\\' "
+                "ORDER BY po_number DESC, product_id LIMIT ?",
+                (tab, pattern, tab, pattern, -1 if limit is None else limit)
+            ).fetchall()
+        finally:
+            con.close()
+
+    # --- สถานะ Online / Offline ---
+    def mark_offline(self, tab, err):
+        with self._lock: self._offline[tab] = (time.monotonic(), str(err))
+
+    def mark_online(self, tab):
+        with self._lock: self._offline.pop(tab, None)
+
+    def is_offline(self, tab):
+        with self._lock: return tab in self._offline
+
+    def should_retry(self, tab):
+        """ถึงเวลาลองอ่าน Sheet ใหม่หรือยัง (ระหว่างนี้ใช้สำเนาไปก่อน ไม่ต้องรอ timeout ทุก rerun)"""
+        with self._lock:
+            state = self._offline.get(tab)
+            if state is None: return True
+            if time.monotonic() - state[0] < self.retry_seconds: return False
+            self._offline[tab] = (time.monotonic(), state[1])
+            return True
+
+    def offline_tabs(self):
+        """{tab: error} ของ Tab ที่กำลังใช้สำเนาอยู่"""
+        with self._lock: return {tab: state[1] for tab, state in self._offline.items()}
@@ -0,0 +1,76 @@
+import re
+import threading
+from datetime import datetime
+import pandas as pd
+from jst.sheet_writer import call_with_retry
+
+# ==========================================
+# Auto PO Number Allocator (จองเลข "รอเลขสินค้าเข้าNNN" แบบไม่ซ้ำกันแม้หลายคนกดพร้อมกัน)
+# ==========================================
+# Google Sheets ไม่มี compare-and-set จึงใช้ "append log" แทน:
+# - Tab AUTO_PO_LOG: แถว 1 = หัวตาราง, แถว 2 = seed (เลขสูงสุดที่มีอยู่ตอนสร้าง Tab), แถวต่อไป = 1 แถวต่อ 1 เลขที่ถูกจอง
+# - การจอง = append 1 แถว, Sheets ต่อท้ายทีละคำขอ (serialized) -> เลขแถวที่ได้กลับมาไม่ซ้ำกันแน่นอน
+#   (LocalStorage ต่อท้ายภายใต้ lock เดียวกัน -> ไม่ซ้ำเช่นกัน)
+# - เลข PO = seed + (เลขแถว - 2) คำนวณจาก response ได้ทันที (1 request ต่อการจอง ไม่ต้องสแกน PO ทั้งหมด)
+# - เลขที่จองแล้วไม่ได้ใช้ (ปิดหน้าไปก่อนบันทึก) จะข้ามไป ไม่ถูกนำกลับมาใช้ซ้ำ
+
+AUTO_PO_PREFIX = "รอเลขสินค้าเข้า"
+ALLOCATOR_TAB = "AUTO_PO_LOG"
+ALLOCATOR_HEADER = ["Reserved_At", "Reserved_By", "PO_Number"]
+SEED_ROW = 2
+
+_ROW_RE = re.compile(r"![A-Z]+(\d+)")
+
+
+def format_auto_po(number, prefix=AUTO_PO_PREFIX):
+    return f"{prefix}{int(number):03d}"
+
+
+def max_auto_po_number(po_numbers, prefix=AUTO_PO_PREFIX):
+    """เลขสูงสุดของ PO ที่ขึ้นต้นด้วย prefix (0 ถ้าไม่มี)"""
+    values = pd.Series(po_numbers, dtype=object).astype(str)
+    values = values[values.str.startswith(prefix)].str[len(prefix):].str.strip()
+    nums = pd.to_numeric(values[values.str.fullmatch(r"\d+")], errors='coerce')
+    return int(nums.max()) if len(nums) else 0
+
+
+def appended_row(response):
+    """เลขแถวที่ append ได้ จาก response ของ values.append"""
+    updated = (response or {}).get('updates', {}).get('updatedRange', '')
+    match = _ROW_RE.search(updated)
+    if not match: raise ValueError(f"unexpected append response: {updated!r}")
+    return int(match.group(1))
+
+
+class AutoPoAllocator:
+    def __init__(self, storage, seed_fn, prefix=AUTO_PO_PREFIX, tab=ALLOCATOR_TAB):
+        """storage = Backend ของ Sheet (ดู jst/storage.py), seed_fn() -> เลขสูงสุดที่มีอยู่ใน PO_DATA (เรียกครั้งเดียวตอนสร้าง Tab)"""
+        self.storage = storage
+        self.seed_fn = seed_fn
+        self.prefix = prefix
+        self.tab = tab
+        self._lock = threading.Lock()
+        self._seed = None
+
+    def _ensure_seed(self):
+        with self._lock:
+            if self._seed is None:
+                self.storage.ensure_tab(self.tab, ALLOCATOR_HEADER)
+                grid = self.storage.read_tab(self.tab)
+                seed_row = grid[SEED_ROW - 1] if len(grid) >= SEED_ROW else []
+                seed = seed_row[2] if len(seed_row) > 2 else ""
+                if seed in (None, ""):
+                    # Tab ใหม่: บันทึก seed ครั้งเดียว
+                    seed = self.seed_fn()
+                    self.storage.write(self.tab, [("write", (SEED_ROW, 1, [["seed", "", int(seed)]]))])
+                self._seed = int(float(seed))
+
+    def reserve(self, reserved_by=""):
+        """จองเลข PO ใหม่ 1 เลข (ไม่ซ้ำกับใคร) คืนเลข PO แบบเต็ม"""
+        self._ensure_seed()
+        stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # คอลัมน์ C เป็นสูตร -> ใน Sheet เห็นเลขที่จองของแต่ละแถว (Backend ที่ไม่มีสูตรเว้นว่างไว้)
+        formula = f'="{self.prefix}"&TEXT($C${SEED_ROW}+ROW()-{SEED_ROW},"000")' if self.storage.supports_formulas else ""
+        # retry ได้: ถ้า append ซ้ำ เลขที่ได้ก็ยังไม่ซ้ำ (แค่ข้ามไป 1 เลข)
+        row = call_with_retry(lambda: self.storage.append_rows(self.tab, [[stamp, reserved_by, formula]], formulas=True))
+        return format_auto_po(self._seed + row - SEED_ROW, self.prefix)
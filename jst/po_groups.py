@@ -0,0 +1,75 @@
+import pandas as pd
+
+# ==========================================
+# PO Group Engine (สรุปยอดต่อกลุ่ม PO + สินค้า ด้วย groupby ครั้งเดียว)
+# ==========================================
+# ใช้ร่วมกันระหว่างหน้า "รายการสั่งซื้อ" และ Dialog ประวัติการสั่งซื้อ
+# 1 กลุ่ม = 1 (PO_Number, Product_ID) ซึ่งอาจมีหลายแถว (รับของหลายครั้ง / แยกแถวตอนรับไม่ครบ)
+
+PO_GROUP_KEYS = ['PO_Number', 'Product_ID']
+INTERNAL_TRANSPORT = "สินค้าภายใน"
+
+
+def _num(df, col):
+    if col not in df.columns: return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float)
+
+
+def aggregate_po_groups(df):
+    """คืน (groups, rows)
+    groups = 1 แถวต่อกลุ่ม (เรียงตามลำดับที่พบ) = ค่าของแถวแรกในกลุ่ม + ยอดสรุป:
+        Row_Count, Total_Order_Qty (0 -> 1 กันหารศูนย์), Total_Yuan_Sum, Total_Ship_Cost, THB_Used,
+        Cost_Per_Unit_THB, Price_Per_Unit_Yuan, Rate, Is_Internal
+    rows = ทุกแถวเรียงให้แถวของกลุ่มเดียวกันอยู่ติดกัน (ลำดับเดียวกับ groups) + Wait_Days (วันที่ได้รับ - วันที่สั่ง)
+    THB_Used: สินค้าภายใน = ผลรวม Total_THB, สินค้านำเข้า = ผลรวม Total_Yuan x Yuan_Rate ของแต่ละแถว"""
+    gid = df.groupby(PO_GROUP_KEYS, sort=False).ngroup()
+    # แถวที่ไม่มี key (NaN) ไม่อยู่ในกลุ่มใด (เหมือน groupby ปกติ)
+    valid = gid >= 0
+    df, gid = df[valid], gid[valid]
+
+    work = pd.DataFrame({
+        'gid': gid,
+        'Qty_Ordered': _num(df, 'Qty_Ordered'),
+        'Total_Yuan': _num(df, 'Total_Yuan'),
+        'Ship_Cost': _num(df, 'Ship_Cost'),
+        'Total_THB': _num(df, 'Total_THB'),
+    })
+    work['THB_Import'] = work['Total_Yuan'] * _num(df, 'Yuan_Rate')
+    agg = work.groupby('gid', sort=True).agg(
+        Row_Count=('Qty_Ordered', 'size'),
+        Total_Order_Qty=('Qty_Ordered', 'sum'),
+        Total_Yuan_Sum=('Total_Yuan', 'sum'),
+        Total_Ship_Cost=('Ship_Cost', 'sum'),
+        THB_Internal=('Total_THB', 'sum'),
+        THB_Import=('THB_Import', 'sum'),
+    )
+
+    groups = df.assign(gid=gid.to_numpy()).drop_duplicates('gid').set_index('gid').sort_index()
+    groups = groups.join(agg)
+    groups['Total_Order_Qty'] = groups['Total_Order_Qty'].where(groups['Total_Order_Qty'] != 0, 1)
+    transport = groups['Transport_Type'] if 'Transport_Type' in groups.columns else pd.Series("", index=groups.index)
+    groups['Is_Internal'] = transport.astype(str).str.strip() == INTERNAL_TRANSPORT
+    groups['THB_Used'] = groups['THB_Internal'].where(groups['Is_Internal'], groups['THB_Import'])
+    groups['Cost_Per_Unit_THB'] = (groups['THB_Used'] + groups['Total_Ship_Cost']) / groups['Total_Order_Qty']
+    groups['Price_Per_Unit_Yuan'] = groups['Total_Yuan_Sum'] / groups['Total_Order_Qty']
+    groups['Rate'] = _num(groups, 'Yuan_Rate')
+    groups = groups.drop(columns=['THB_Internal', 'THB_Import']).reset_index(drop=True)
+
+    rows = df.assign(gid=gid.to_numpy()).sort_values('gid', kind='stable')
+    if 'Received_Date' in rows.columns and 'Order_Date' in rows.columns:
+        rows['Wait_Days'] = (pd.to_datetime(rows['Received_Date'], errors='coerce') - pd.to_datetime(rows['Order_Date'], errors='coerce')).dt.days
+    else:
+        rows['Wait_Days'] = float('nan')
+    return groups, rows.drop(columns=['gid']).reset_index(drop=True)
+
+
+def iter_po_groups(df):
+    """วนทีละกลุ่ม: (ข้อมูลกลุ่ม dict, [แถวย่อย dict, ...])"""
+    if df.empty: return
+    groups, rows = aggregate_po_groups(df)
+    row_records = rows.to_dict('records')
+    start = 0
+    for group in groups.to_dict('records'):
+        end = start + group['Row_Count']
+        yield group, row_records[start:end]
+        start = end
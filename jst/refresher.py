@@ -0,0 +1,148 @@
+import time
+import threading
+
+# ==========================================
+# Background Refresher (Stale-while-revalidate ของแหล่งข้อมูลที่โหลดช้า)
+# ==========================================
+# - แต่ละแหล่งข้อมูล (Tab ใน Sheet, ไฟล์ Stock, รายชื่อไฟล์ยอดขาย) มีรอบโหลดของตัวเอง (interval วินาที)
+# - Thread เบื้องหลังโหลดใหม่ "ก่อน" หมดอายุ (อายุ >= interval x REFRESH_AHEAD) แล้วสลับเป็นชุดใหม่ทีเดียว
+#   ระหว่างนั้นทุก session ได้ข้อมูลชุดเดิม -> ไม่มีใครต้องรอ spinner ตอนหมดอายุ
+# - Single-flight: 1 แหล่งข้อมูลโหลดได้ทีละครั้ง หลาย session เรียกพร้อมกัน = โหลดครั้งเดียว รอผลเดียวกัน
+# - โหลดไม่สำเร็จ -> ใช้ชุดเดิมต่อ (เก็บ error ไว้แสดง) แล้วลองใหม่รอบถัดไป
+#   ผู้เรียกเช็คได้ว่าค่าที่ได้เป็นชุดเดิมเพราะโหลดล่าสุดล้มเหลว ผ่าน last_error(name) / status()["stale"]
+# - แหล่งที่ไม่มีใครใช้นานเกิน IDLE_SECONDS จะไม่ถูกโหลดเบื้องหลัง (ครั้งถัดไปที่ใช้จะโหลดใหม่ทันทีถ้าหมดอายุแล้ว)
+# - ค่าที่คืนเป็น object เดียวกันทุก session: ห้ามแก้ไข (copy ก่อนถ้าจะแก้)
+
+REFRESH_AHEAD = 0.8
+IDLE_SECONDS = 900
+TICK_SECONDS = 1.0
+
+
+class Snapshot:
+    def __init__(self, value):
+        self.value = value
+        self.loaded_at = time.time()
+        self.version = time.time_ns()
+
+
+class _Source:
+    def __init__(self, name, load_fn, interval, label):
+        self.name = name
+        self.load_fn = load_fn
+        self.interval = interval
+        self.label = label or name
+        self.snapshot = None
+        self.stale = False        # invalidate() แล้ว -> ครั้งถัดไปต้องโหลดใหม่ก่อนคืนค่า
+        self.error = None
+        self.refreshing = False
+        self.attempted_at = 0.0   # monotonic
+        self.used_at = time.monotonic()
+        self.load_lock = threading.Lock()
+
+    def age(self, now):
+        return now - self.attempted_at
+
+
+class BackgroundRefresher:
+    def __init__(self, ahead=REFRESH_AHEAD, idle_seconds=IDLE_SECONDS, tick=TICK_SECONDS):
+        self.ahead = ahead
+        self.idle_seconds = idle_seconds
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._thread = None
+
+    # --- ฝั่งหน้าเว็บ ---
+    def get(self, name, load_fn, interval, label=None):
+        """ค่าล่าสุดของแหล่งข้อมูล name (ลงทะเบียน load_fn / interval ครั้งแรกที่เรียก)
+        ยังไม่เคยโหลด / ถูก invalidate / หมดอายุโดยไม่มีใครโหลดให้ -> โหลดเดี๋ยวนี้ (single-flight)"""
+        src = self._source(name, load_fn, interval, label)
+        src.used_at = time.monotonic()
+        snap = src.snapshot
+        expired = snap is not None and src.age(time.monotonic()) >= src.interval and not src.refreshing
+        if snap is None or src.stale or expired:
+            snap = self._load(src, snap)
+        return snap.value
+
+    def snapshot(self, name):
+        src = self._sources.get(name)
+        return src.snapshot if src else None
+
+    def last_error(self, name):
+        """error ของการโหลดครั้งล่าสุด (None = สำเร็จ / ยังไม่เคยโหลด) ไม่ใช่ None + มี snapshot = ค่าที่คืนเป็นชุดเดิม (stale)"""
+        src = self._sources.get(name)
+        return src.error if src else None
+
+    def invalidate(self, name):
+        src = self._sources.get(name)
+        if src: src.stale = True
+
+    def invalidate_all(self):
+        for src in list(self._sources.values()): src.stale = True
+
+    def status(self):
+        """[{name, label, loaded_at, error, stale, refreshing}] ของทุกแหล่งข้อมูล (ใช้แสดง "ข้อมูล ณ")
+        stale = โหลดครั้งล่าสุดไม่สำเร็จ ค่าที่ใช้อยู่เป็นชุดเดิม (ณ loaded_at)"""
+        return [{
+            "name": src.name, "label": src.label,
+            "loaded_at": src.snapshot.loaded_at if src.snapshot else None,
+            "error": src.error, "stale": src.error is not None and src.snapshot is not None,
+            "refreshing": src.refreshing,
+        } for src in list(self._sources.values())]
+
+    # --- ภายใน ---
+    def _source(self, name, load_fn, interval, label):
+        with self._lock:
+            src = self._sources.get(name)
+            if src is None:
+                src = self._sources[name] = _Source(name, load_fn, interval, label)
+            else:
+                src.load_fn, src.interval = load_fn, interval
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="data-refresher", daemon=True)
+                self._thread.start()
+            return src
+
+    def _load(self, src, seen):
+        """โหลดแบบรอผล: ถ้ามีคนโหลดอยู่แล้ว รอแล้วใช้ผลของคนนั้น"""
+        with src.load_lock:
+            snap = src.snapshot
+            if snap is not None and snap is not seen and not src.stale: return snap
+            try:
+                return self._refresh(src)
+            except Exception:
+                # มีข้อมูลเดิม -> ใช้ไปก่อน (error แสดงผ่าน status()) แล้วให้ Thread เบื้องหลังลองใหม่ตามรอบ
+                # ไม่มีเลย -> ส่ง error ให้ผู้เรียก
+                if src.snapshot is None: raise
+                src.stale = False
+                return src.snapshot
+
+    def _refresh(self, src):
+        src.attempted_at = time.monotonic()
+        try:
+            snap = Snapshot(src.load_fn())
+        except Exception as err:
+            print(f"Refresh failed ({src.name}): {err}")
+            src.error = str(err)
+            raise
+        src.snapshot, src.stale, src.error = snap, False, None
+        return snap
+
+    def _background_refresh(self, src):
+        try:
+            with src.load_lock: self._refresh(src)
+        except Exception:
+            pass
+        finally:
+            src.refreshing = False
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick)
+            now = time.monotonic()
+            for src in list(self._sources.values()):
+                if src.refreshing or src.snapshot is None or src.load_lock.locked(): continue
+                if now - src.used_at > self.idle_seconds: continue
+                if src.age(now) < src.interval * self.ahead: continue
+                src.refreshing = True
+                threading.Thread(target=self._background_refresh, args=(src,), name=f"refresh-{src.name}", daemon=True).start()
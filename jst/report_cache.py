@@ -0,0 +1,113 @@
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from jst.tracing import span
+
+# ==========================================
+# Report Cache (เก็บผลรายงานที่คำนวณแล้ว ใช้ซ้ำเมื่อข้อมูลและตัวกรองเหมือนเดิม)
+# ==========================================
+# key = (ชื่อรายงาน, version ของข้อมูลต้นทาง, ตัวกรองที่ normalize แล้ว)
+# ข้อมูลเปลี่ยน -> version เปลี่ยน -> key ใหม่ (ของเก่าจะถูกไล่ออกตาม LRU)
+# จำกัดทั้งจำนวนรายการและขนาดหน่วยความจำรวม เพื่อไม่ให้ผู้ใช้หลายคน/หลายตัวกรองกิน RAM จนหมด
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def estimate_size(value):
+    """ประมาณขนาดหน่วยความจำ (bytes) ของผลรายงาน"""
+    if isinstance(value, pd.DataFrame): return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series): return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray): return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def normalize_filters(*values):
+    """แปลงตัวกรองเป็น tuple ที่ hash ได้ (list/set -> tuple เรียงลำดับ) ลำดับการเลือกไม่มีผลกับ key"""
+    out = []
+    for v in values:
+        if isinstance(v, (list, tuple, set, frozenset)): out.append(tuple(sorted(str(x) for x in v)))
+        else: out.append(v)
+    return tuple(out)
+
+
+def frame_version(df):
+    """version ของ DataFrame ต้นทาง (ประทับไว้ใน df.attrs ตอนโหลด)"""
+    return df.attrs.get('version') if df is not None else None
+
+
+class ReportCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._building = {}             # key -> Event (กันคำนวณรายงานเดียวกันซ้อนกัน)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries: self.total_bytes -= self._entries.pop(key)[1]
+            # ผลที่ใหญ่เกินงบทั้งหมด ไม่เก็บ (คืนค่าให้ผู้เรียกใช้ได้ตามปกติ)
+            if size > self.max_bytes: return value
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self.total_bytes -= old_size
+        return value
+
+    def get_or_compute(self, key, compute):
+        """คืนผลที่ cache ไว้ ถ้าไม่มีให้เรียก compute() (ถ้ามีอีก thread กำลังคำนวณ key เดียวกันอยู่ จะรอผลนั้น)"""
+        name = key[0] if isinstance(key, tuple) and key else key
+        with span(f"report:{name}", kind="cache", cache="hit") as s:
+            while True:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return entry[0]
+                    waiter = self._building.get(key)
+                    if waiter is None:
+                        self._building[key] = threading.Event()
+                        self.misses += 1
+                        break
+                # ถ้า thread ที่คำนวณอยู่ error หรือผลใหญ่เกินงบ จะไม่มีใน cache -> รอบถัดไปจะคำนวณเอง
+                waiter.wait()
+            s.cache = "miss"
+            try:
+                with span(f"build:{name}", kind="compute"): value = compute()
+                return self.put(key, value)
+            finally:
+                with self._lock: self._building.pop(key).set()
+
+    def invalidate(self, names):
+        """ลบผลรายงานตามชื่อ (key[0]) เช่น หลังบันทึกข้อมูลที่รายงานนั้นใช้ คืนจำนวนที่ลบ"""
+        names = set(names)
+        with self._lock:
+            stale = [key for key in self._entries if isinstance(key, tuple) and key and key[0] in names]
+            for key in stale: self.total_bytes -= self._entries.pop(key)[1]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,307 @@
+import re
+import time
+import urllib.parse
+import pandas as pd
+from jst.grid import grid_column, grid_cell
+from jst.po_groups import iter_po_groups
+from jst.status import apply_po_status, stock_status, SALES_STATUS_LABELS, STOCK_STATUS_LABELS
+
+# ==========================================
+# Page Reports (ขั้นตอนคำนวณของแต่ละหน้า: pivot / merge / สถานะ / แถวของ Grid)
+# ==========================================
+# ไม่มีส่วนของ Streamlit (ตัวกรองส่งเข้ามาเป็นค่า) -> ใช้ได้ทั้งในแอปและใน benchmarks/ เหมือน sheet_frames.py
+# CSS / ความสูงของตาราง และการ cache ผลลัพธ์ อยู่ที่หน้าใน app.py
+
+THAI_MONTH_ABBR = ["", "ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.", "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค."]
+MOVEMENT_OPTIONS = ["ทั้งหมด", "สินค้าที่มีการเคลื่อนไหว", 'สินค้าที่ "ไม่มี" การเคลื่อนไหว']
+
+
+def clean_text_for_html(text):
+    if not isinstance(text, str):
+        text = str(text)
+
+    # 1. ลบอักขระควบคุม (เช่น \n, \r, \t) เปลี่ยนเป็นเว้นวรรค
+    text = re.sub(r'[\r\n\t]+', ' ', text)
+
+    # 2. เก็บเฉพาะ: ภาษาไทย, อังกฤษ, ตัวเลข, ช่องว่าง, และเครื่องหมาย ( ) . - _ /
+    # อักขระอื่นๆ ที่อาจก่อปัญหา (เช่น " ' < > & % $ #) จะถูกลบทิ้ง
+    text = re.sub(r'[^\u0e00-\u0e7f a-zA-Z0-9\.\-\_\(\)\/]+', '', text)
+
+    return text.strip()
+
+
+def fmt_date(d):
+    try:
+        if pd.isna(d) or str(d).lower() == 'nat' or str(d).strip() == "": return "-"
+        # แปลง string เป็น datetime ก่อนถ้าจำเป็น
+        if isinstance(d, str): d = pd.to_datetime(d, errors='coerce')
+        if pd.isna(d): return "-"
+        return d.strftime("%d/%m/%Y")
+    except: return "-"
+
+
+def fmt_num(val, decimals=2):
+    try: return f"{float(val):,.{decimals}f}"
+    except: return "0.00"
+
+
+def _current_stock(df, df_real_stock, fallback):
+    """คงเหลือ: ค่าจากไฟล์ Stock จริงถ้ามี ไม่งั้นใช้ค่าที่คำนวณ (fallback = Series ของค่าที่คำนวณ)"""
+    if df_real_stock.empty: return fallback, None
+    real_stock_map = df_real_stock.set_index('Product_ID')['Real_Stock'].to_dict()
+    real = df['Product_ID'].map(real_stock_map)
+    return real.where(real.notna(), fallback), real
+
+
+# --- หน้า 1: ยอดขายรายวัน ---
+def daily_sales_frame(df_master, range_cube, date_from, date_to, df_real_stock, recent_sales_map,
+                      focus_products=None, category=None, product_ids=None, movement=MOVEMENT_OPTIONS[0]):
+    """pivot ยอดขายรายวัน -> merge Master -> ตัวกรอง -> คงเหลือ / สถานะ
+    focus_products = สินค้าที่ขายในวัน Focus Date (None = ไม่กรอง), category / product_ids None = ทั้งหมด
+    คืน (DataFrame ของคอลัมน์ที่แสดง, คอลัมน์วันที่) หรือ None ถ้าไม่พบสินค้า"""
+    # Pivot Table: แถว = สินค้า, คอลัมน์ = วันที่ (เรียงตามวันที่แล้ว)
+    df_pivot = range_cube.pivot(date_from, date_to, label=lambda d: f"{d.day} {THAI_MONTH_ABBR[d.month]}")
+
+    # กรอง Focus Date
+    if not df_pivot.empty and focus_products is not None:
+        df_pivot = df_pivot[df_pivot.index.isin(focus_products)]
+
+    # Merge กับ Master
+    if not df_pivot.empty:
+        df_pivot = df_pivot.reset_index()
+        final_report = pd.merge(df_master, df_pivot, on='Product_ID', how='left')
+    else:
+        final_report = df_master.copy()
+
+    # หาคอลัมน์วันที่ทั้งหมด
+    day_cols = [c for c in final_report.columns if c not in df_master.columns]
+    day_cols = [c for c in day_cols if isinstance(c, str) and "🔴" not in c and "หมด" not in c]
+    final_report[day_cols] = final_report[day_cols].fillna(0).astype(int)
+
+    # Apply Filters
+    if category is not None: final_report = final_report[final_report['Product_Type'] == category]
+    if product_ids: final_report = final_report[final_report['Product_ID'].isin(product_ids)]
+    if focus_products is not None:
+        final_report = final_report[final_report['Product_ID'].isin(df_pivot['Product_ID'])] if not df_pivot.empty else pd.DataFrame()
+    if final_report.empty: return None
+
+    final_report['Total_Sales_Range'] = final_report[day_cols].sum(axis=1).astype(int)
+
+    # กรองสินค้าตามการเคลื่อนไหว
+    if movement == MOVEMENT_OPTIONS[1]:
+        final_report = final_report[final_report['Total_Sales_Range'] > 0]
+    elif movement == MOVEMENT_OPTIONS[2]:
+        final_report = final_report[final_report['Total_Sales_Range'] == 0]
+
+    # คงเหลือ: ไฟล์จริง ไม่งั้น Stock ตั้งต้นใน Master - ยอดขายหลังวันที่ของ Master
+    stock_map = df_master.set_index('Product_ID')['Initial_Stock'].to_dict()
+    calculated = final_report['Product_ID'].map(lambda pid: stock_map.get(pid, 0) - recent_sales_map.get(pid, 0))
+    final_report['Current_Stock'], _ = _current_stock(final_report, df_real_stock, calculated)
+    final_report['Current_Stock'] = pd.to_numeric(final_report['Current_Stock'], errors='coerce').fillna(0).astype(int)
+
+    # สถานะ
+    if 'Min_Limit' not in final_report.columns: final_report['Min_Limit'] = 0
+    final_report['Min_Limit'] = pd.to_numeric(final_report['Min_Limit'], errors='coerce').fillna(0).astype(int)
+    final_report['Status'] = stock_status(final_report['Current_Stock'], final_report['Min_Limit'], SALES_STATUS_LABELS)
+
+    fixed_cols = ['Product_ID', 'Image', 'Product_Name', 'Product_Type', 'Current_Stock', 'Total_Sales_Range', 'Status']
+    available_fixed = [c for c in fixed_cols if c in final_report.columns]
+    return final_report[available_fixed + day_cols], day_cols
+
+
+def daily_sales_grid(final_df, day_cols, token=""):
+    """คอลัมน์ + แถวของ Grid หน้ายอดขายรายวัน (1 สินค้า = 1 กลุ่ม) คืน (grid_columns, grid_groups)"""
+    grid_columns = [
+        grid_column("ประวัติ", "col-history"), grid_column("รหัส", "col-small"), grid_column("รูป", "col-image"),
+        grid_column("ชื่อสินค้า", "col-name"), grid_column("คงเหลือ", "col-small"), grid_column("ยอดรวม", "col-medium"),
+        grid_column("สถานะ", "col-medium"),
+    ] + [grid_column(day_col, "col-small") for day_col in day_cols]
+
+    def sales_num_cell(value):
+        value = int(value)
+        return grid_cell(value, cls="negative-value") if value < 0 else value
+
+    pids = final_df['Product_ID'].astype(str)
+    images = final_df['Image'].astype(str) if 'Image' in final_df.columns else pd.Series("", index=final_df.index)
+    names = final_df['Product_Name'].astype(str) if 'Product_Name' in final_df.columns else pd.Series("", index=final_df.index)
+    day_values = final_df[day_cols].to_numpy().tolist() if day_cols else [[] for _ in range(len(final_df))]
+
+    grid_groups = []
+    for pid, img, name, stock, total, status, days in zip(
+        pids, images, names, final_df['Current_Stock'].tolist(), final_df['Total_Sales_Range'].tolist(),
+        final_df['Status'].tolist(), day_values
+    ):
+        clean_name = clean_text_for_html(name)
+        if len(clean_name) > 50: clean_name = clean_name[:47] + "..."
+        h_link = f"?history_pid={urllib.parse.quote(pid.strip())}&token={token}"
+        grid_groups.append(([], [[
+            grid_cell(links=[["📜", h_link, "history-link"]]),
+            pid,
+            grid_cell(img=img) if img.startswith('http') else "",
+            clean_name,
+            sales_num_cell(stock),
+            total,
+            status,
+        ] + [sales_num_cell(v) for v in days]]))
+    return grid_columns, grid_groups
+
+
+# --- หน้า 2: รายการสั่งซื้อ ---
+def po_base_frame(df_po, df_master):
+    """PO ที่ Merge กับ Master แล้ว + ตัวเลือกในกล่องค้นหา คืน (DataFrame, เลข PO, ป้ายสินค้า "SKU : ชื่อ")"""
+    # วันที่ (datetime64) และ Product_ID (str) แปลงตั้งแต่ตอนโหลดแล้ว (PO_SCHEMA)
+    df_display = pd.merge(df_po, df_master[['Product_ID', 'Product_Name', 'Image', 'Product_Type']], on='Product_ID', how='left')
+    po_options = sorted(df_display['PO_Number'].astype(str).unique().tolist(), reverse=True)
+    df_display['Product_Label'] = [f"{pid} : {name}" for pid, name in zip(df_display['Product_ID'], df_display['Product_Name'])]
+    product_options = sorted(df_display['Product_Label'].unique().tolist())
+    return df_display, po_options, product_options
+
+
+def po_report_frame(df_base, po_numbers=(), product_labels=(), date_range=None, category=None, status=None, today=None):
+    """กรอง (เลข PO / สินค้า / ช่วงวันที่สั่งซื้อ / หมวดหมู่) -> สถานะ PO -> กรองสถานะ -> เรียงล่าสุดก่อน
+    ตัวกรองที่เป็น None / ว่าง = ไม่กรอง ไม่แก้ df_base (ใช้ร่วมกันใน cache)"""
+    df_display = df_base
+    if po_numbers:
+        df_display = df_display[df_display['PO_Number'].astype(str).isin(po_numbers)]
+    if product_labels:
+        df_display = df_display[df_display['Product_Label'].isin(product_labels)]
+    if date_range is not None:
+        d_start, d_end = date_range
+        mask_date = (df_display['Order_Date'].dt.date >= d_start) & (df_display['Order_Date'].dt.date <= d_end)
+        df_display = df_display[mask_date]
+    if category is not None:
+        df_display = df_display[df_display['Product_Type'] == category]
+
+    # คำนวณสถานะทั้งตาราง (ดู jst/status.py) บนสำเนา ไม่แก้ข้อมูลที่ cache ไว้
+    df_display = apply_po_status(df_display.copy(), today)
+    if status is not None:
+        df_display = df_display[df_display['Status_Text'] == status]
+    return df_display.sort_values(by=['Order_Date', 'PO_Number', 'Product_ID'], ascending=[False, False, False])
+
+
+def po_grid(df_display, token="", ts=None):
+    """คอลัมน์ + กลุ่มของ Grid หน้ารายการสั่งซื้อ (1 กลุ่ม = PO + สินค้า) คืน (grid_columns, grid_groups)"""
+    # คอลัมน์ merged = ใช้ค่าเดียวทั้งกลุ่ม (PO + สินค้า), คอลัมน์ปกติ = ค่าของแต่ละแถวย่อย (แต่ละครั้งที่รับของ)
+    purple, green = "background-color: #5f00bf;", "background-color: #00bf00;"
+    grid_columns = [
+        grid_column("แก้ไข", style="width:60px;", merged=True),
+        grid_column("รหัสสินค้า", merged=True),
+        grid_column("รูป", "col-img", style="width:50px;", merged=True),
+        grid_column("สถานะ", merged=True),
+        grid_column("เลข PO", merged=True),
+        grid_column("ขนส่ง", merged=True),
+        grid_column("วันที่สั่งซื้อ", style=purple, merged=True),
+        grid_column("วันคาดการณ์", style=purple, merged=True),
+        grid_column("วันที่ได้รับ", style=purple),
+        grid_column("ระยะเวลา", style=purple),
+        grid_column("รับแล้ว", style=purple),
+        grid_column("สั่งซื้อ", "col-qty-ord", style=green, merged=True),
+        grid_column("ต้นทุน/ชิ้น (฿)", style=green, merged=True),
+        grid_column("ยอดหยวน (¥)", merged=True),
+        grid_column("ยอดบาทรวม (฿)", merged=True),
+        grid_column("เรทเงิน", merged=True),
+        grid_column("เรทขนส่ง", merged=True),
+        grid_column("คิว (CBM)", merged=True),
+        grid_column("ค่าส่งรวม", merged=True),
+        grid_column("น้ำหนัก (KG)", merged=True),
+        grid_column("ราคา/ชิ้น (¥)", merged=True),
+        grid_column("SHOPEE", style="background-color: #ff6600;", merged=True),
+        grid_column("LAZADA", merged=True),
+        grid_column("TIKTOK", style="background-color: #000000;", merged=True),
+        grid_column("หมายเหตุ", "col-note", merged=True),
+        grid_column("Link", merged=True),
+    ]
+    grid_groups = []
+    if ts is None: ts = int(time.time() * 1000)
+
+    # จัดกลุ่มข้อมูลตาม PO และ สินค้า: ยอดสรุปของทุกกลุ่มคำนวณครั้งเดียว (ดู jst/po_groups.py)
+    for first_row, group_rows in iter_po_groups(df_display):
+        is_internal = first_row['Is_Internal']
+
+        # ส่วนที่ 1 + 3: คอลัมน์ที่ Merge (ค่าจากบรรทัดแรกของกลุ่ม)
+        safe_pid = urllib.parse.quote(str(first_row['Product_ID']).strip())
+        safe_po = urllib.parse.quote(str(first_row['PO_Number']).strip())
+        row_idx_del = first_row.get("Sheet_Row_Index", 0)
+        actions = [
+            ["✏️", f"?edit_po={safe_po}&edit_pid={safe_pid}&t={ts}&token={token}", "btn-edit"],
+            ["🗑️", f"?delete_idx={row_idx_del}&del_po={safe_po}&token={token}", "btn-del"],
+        ]
+        p_name_clean = clean_text_for_html(str(first_row.get("Product_Name", "")))
+        img_src = str(first_row.get('Image', ''))
+
+        link_val = str(first_row.get("Link", "")).strip()
+        wechat_val = str(first_row.get("WeChat", "")).strip()
+        icons = []
+        if len(link_val) > 5: icons.append(["🔗", f"?view_info={urllib.parse.quote(link_val)}&t={ts}_0&token={token}", "btn-link"])
+        if len(wechat_val) > 1: icons.append(["💬", f"?view_info={urllib.parse.quote(wechat_val)}&t={ts}_0&token={token}", "btn-link"])
+
+        dash_if_internal = lambda v: "-" if is_internal else v
+        merged = [
+            grid_cell(links=actions),
+            grid_cell(str(first_row['Product_ID']), sub=p_name_clean, title=p_name_clean),
+            grid_cell(img=img_src) if img_src.startswith('http') else "",
+            grid_cell(badge=first_row.get('Status_Text', '-'), bg=first_row.get('Status_BG', '#333'), fg=first_row.get('Status_Color', '#fff')),
+            str(first_row["PO_Number"]),
+            clean_text_for_html(str(first_row.get("Transport_Type", "-"))),
+            fmt_date(first_row["Order_Date"]),
+            fmt_date(first_row.get("Expected_Date")),
+            f"{int(first_row['Total_Order_Qty']):,}",
+            fmt_num(first_row['Cost_Per_Unit_THB']),
+            dash_if_internal(fmt_num(first_row['Total_Yuan_Sum'])),
+            fmt_num(first_row['THB_Used']),
+            dash_if_internal(fmt_num(first_row['Rate'])),
+            dash_if_internal(fmt_num(first_row.get("Ship_Rate",0))),
+            dash_if_internal(fmt_num(first_row.get("CBM",0), 4)),
+            dash_if_internal(fmt_num(first_row['Total_Ship_Cost'])),
+            dash_if_internal(fmt_num(first_row.get("Transport_Weight",0))),
+            dash_if_internal(fmt_num(first_row['Price_Per_Unit_Yuan'])),
+            fmt_num(first_row.get("Shopee_Price",0)),
+            fmt_num(first_row.get("Lazada_Price",0)),
+            fmt_num(first_row.get("TikTok_Price",0)),
+            clean_text_for_html(str(first_row.get("Note",""))),
+            grid_cell(links=icons) if icons else "-",
+        ]
+
+        # ส่วนที่ 2: คอลัมน์ย่อย (ข้อมูลแยกแต่ละแถว)
+        rows = []
+        for row in group_rows:
+            wait_txt = f"{int(row['Wait_Days'])} วัน" if pd.notna(row['Wait_Days']) else "-"
+            q_recv = int(row.get('Qty_Received', 0))
+            q_ord_row = int(row.get('Qty_Ordered', 0))
+            q_cls = "qty-mismatch" if (q_recv > 0 and q_recv != q_ord_row) else None
+            rows.append([fmt_date(row['Received_Date']), wait_txt, grid_cell(f"{q_recv:,}", cls=q_cls)])
+        grid_groups.append((merged, rows))
+    return grid_columns, grid_groups
+
+
+# --- หน้า 3: รายงาน Stock ---
+def stock_report_frame(df_master, df_po, df_real_stock, recent_sales_map, total_sales_map):
+    """merge PO ล่าสุดของแต่ละสินค้า -> ยอดขาย -> คงเหลือ (ไฟล์จริง / คำนวณ) -> สถานะ"""
+    # เตรียมข้อมูลพื้นฐานจาก Master และ PO
+    if not df_po.empty and 'Product_ID' in df_po.columns:
+        df_po_latest = df_po.drop_duplicates(subset=['Product_ID'], keep='last')
+        df = pd.merge(df_master, df_po_latest, on='Product_ID', how='left')
+    else:
+        df = df_master.copy()
+        df['PO_Number'] = ""
+
+    # Map ยอดขาย
+    df['Recent_Sold'] = df['Product_ID'].map(recent_sales_map).fillna(0).astype(int)
+    df['Total_Sold_All'] = df['Product_ID'].map(total_sales_map).fillna(0).astype(int)
+    if 'Initial_Stock' not in df.columns: df['Initial_Stock'] = 0
+
+    # คงเหลือ: สูตร 1 คำนวณปกติ (Master - Sales) / สูตร 2 ถ้ามีไฟล์จริง ใช้ค่าจากไฟล์
+    df['Calculated_Stock'] = df['Initial_Stock'] - df['Recent_Sold']
+    df['Current_Stock'], real = _current_stock(df, df_real_stock, df['Calculated_Stock'])
+    if real is not None: df['Real_Stock_File'] = real
+    # แหล่งที่มาข้อมูล (เอาไว้คำนวณเฉยๆ ไม่แสดงผล)
+    df['Source'] = real.map(lambda x: "✅ ไฟล์จริง" if pd.notna(x) else "🧮 คำนวณ") if real is not None else "🧮 คำนวณ"
+
+    # บังคับให้ Current_Stock / Min_Limit เป็นตัวเลข (ว่าง / Error = 0)
+    df['Current_Stock'] = pd.to_numeric(df['Current_Stock'], errors='coerce').fillna(0).astype(int)
+    if 'Min_Limit' not in df.columns: df['Min_Limit'] = 0
+    df['Min_Limit'] = pd.to_numeric(df['Min_Limit'], errors='coerce').fillna(0).astype(int)
+
+    # สถานะ: <= 0 หมดเกลี้ยง / <= Min_Limit ของใกล้หมด / นอกนั้น มีของ
+    df['Status'] = stock_status(df['Current_Stock'], df['Min_Limit'], STOCK_STATUS_LABELS)
+    return df
@@ -0,0 +1,125 @@
+import os
+import glob
+import time
+import threading
+import pandas as pd
+from jst.frame_types import CUBE_SCHEMA, apply_schema
+
+# ==========================================
+# Daily Sales Cube (ยอดขายรวมรายวัน: Product_ID x วันที่ x ร้านค้า)
+# ==========================================
+# สร้างตอน ingest ทีละไฟล์ (1 ไฟล์ Excel -> 1 part) ไฟล์ไหนถูกแก้/ลบ ก็แทนที่/ลบเฉพาะ part นั้น
+# หน้ารายงานใช้ slice จาก cube นี้ (pivot รายวัน, ยอดรวม, ยอดวันล่าสุด) แทนการ groupby รายการขายดิบทุกครั้ง
+
+CUBE_COLUMNS = ['Product_ID', 'Sale_Date', 'Shop', 'Qty_Sold']
+
+
+def aggregate_daily(sales_df):
+    """รวมรายการขาย (Product_ID, Qty_Sold, Shop, Order_Time) เป็นยอดรายวัน
+    แถวที่ไม่มีเวลาสั่งซื้อจะมี Sale_Date = NaT (นับในยอดรวมทั้งหมด แต่ไม่อยู่ในวันใด)"""
+    if sales_df.empty: return pd.DataFrame({c: pd.Series(dtype=t) for c, t in zip(CUBE_COLUMNS, ['str', 'datetime64[ns]', 'str', 'int64'])})
+    keys = pd.DataFrame({
+        'Product_ID': sales_df['Product_ID'],
+        'Sale_Date': sales_df['Order_Time'].dt.normalize(),
+        'Shop': sales_df['Shop'],
+        'Qty_Sold': sales_df['Qty_Sold'].astype('int64'),
+    })
+    return keys.groupby(['Product_ID', 'Sale_Date', 'Shop'], dropna=False, sort=False, observed=True)['Qty_Sold'].sum().reset_index()
+
+
+class DailySalesCube:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.RLock()
+        self._parts = None   # {file_key: DataFrame}
+        self._table = None   # ตารางรวมทุก part (สร้างเมื่อถูกเรียกใช้)
+        self.version = f"{time.time_ns()}"
+
+    def _path(self, file_key):
+        return os.path.join(self.root, f"{file_key}.parquet")
+
+    def _load_parts(self):
+        if self._parts is None:
+            self._parts = {}
+            for path in glob.glob(os.path.join(self.root, "*.parquet")):
+                try: self._parts[os.path.basename(path)[:-len(".parquet")]] = apply_schema(pd.read_parquet(path), CUBE_SCHEMA)
+                except Exception as err: print(f"Skip daily part {path}: {err}")
+        return self._parts
+
+    def _touch(self):
+        self._table = None
+        self.version = f"{time.time_ns()}"
+
+    # --- อัปเดตแบบ Incremental (เรียกจาก SalesStore ตอนบันทึก/ลบไฟล์) ---
+    def has_part(self, file_key):
+        with self._lock: return file_key in self._load_parts()
+
+    def put(self, file_key, sales_df):
+        daily = aggregate_daily(sales_df)
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(file_key)
+            daily.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+            self._load_parts()[file_key] = apply_schema(daily, CUBE_SCHEMA)
+            self._touch()
+
+    def drop(self, file_key):
+        with self._lock:
+            if self._load_parts().pop(file_key, None) is None and not os.path.exists(self._path(file_key)): return
+            try: os.remove(self._path(file_key))
+            except OSError: pass
+            self._touch()
+
+    # --- Slices ---
+    def table(self):
+        with self._lock:
+            if self._table is None:
+                parts = [p for p in self._load_parts().values() if not p.empty]
+                # Product_ID / Shop เป็น category (หมวดของแต่ละ part ต่างกัน -> แปลงใหม่หลังรวม)
+                table = pd.concat(parts, ignore_index=True) if parts else aggregate_daily(pd.DataFrame())
+                self._table = apply_schema(table, CUBE_SCHEMA)
+            return self._table
+
+    def daily(self, date_from=None, date_to=None, shops=None):
+        """ยอดขายรายวันต่อสินค้า (Product_ID, Sale_Date, Qty_Sold) ในช่วงวันที่ (รวมทุกร้าน หรือเฉพาะ shops)"""
+        t = self.table()
+        mask = t['Sale_Date'].notna()
+        if date_from: mask &= t['Sale_Date'] >= pd.Timestamp(date_from)
+        if date_to: mask &= t['Sale_Date'] <= pd.Timestamp(date_to)
+        if shops: mask &= t['Shop'].isin(shops)
+        return t.loc[mask].groupby(['Product_ID', 'Sale_Date'], sort=False, observed=True)['Qty_Sold'].sum().reset_index()
+
+    def pivot(self, date_from=None, date_to=None, label=None, shops=None):
+        """ตาราง Product_ID x วัน (คอลัมน์เรียงตามวันที่) label = ฟังก์ชันแปลงวันที่เป็นชื่อคอลัมน์
+        ถ้าหลายวันได้ชื่อเดียวกัน (เช่นคร่อมปี) จะถูกรวมเป็นคอลัมน์เดียว"""
+        d = self.daily(date_from, date_to, shops)
+        if d.empty: return pd.DataFrame()
+        days = pd.Index(d['Sale_Date'].unique()).sort_values()
+        names = [label(day) if label else day.date() for day in days]
+        d['Day_Col'] = d['Sale_Date'].map(dict(zip(days, names)))
+        pv = d.pivot_table(index='Product_ID', columns='Day_Col', values='Qty_Sold', aggfunc='sum', fill_value=0, observed=True)
+        pv = pv[list(dict.fromkeys(names))].astype(int)
+        pv.index = pv.index.astype(str)
+        pv.columns.name = None
+        return pv
+
+    def totals(self, date_from=None, date_to=None, shops=None):
+        """ยอดขายรวมต่อสินค้า {Product_ID: qty} (ไม่ระบุช่วง = ทั้งหมด รวมแถวที่ไม่มีวันที่)"""
+        t = self.table()
+        if date_from or date_to: t = self.daily(date_from, date_to, shops)
+        elif shops: t = t[t['Shop'].isin(shops)]
+        return t.groupby('Product_ID', observed=True)['Qty_Sold'].sum().astype(int).to_dict()
+
+    def latest_date(self):
+        dates = self.table()['Sale_Date'].dropna()
+        return dates.max().date() if not dates.empty else None
+
+    def latest_day(self):
+        """(วันที่ขายล่าสุด, {Product_ID: ยอดขายวันนั้น})"""
+        day = self.latest_date()
+        return (day, self.totals(day, day)) if day else (None, {})
+
+    def products_sold_on(self, day):
+        d = self.daily(day, day)
+        return d.loc[d['Qty_Sold'] > 0, 'Product_ID'].unique()
@@ -0,0 +1,130 @@
+import os
+import json
+import glob
+import hashlib
+import threading
+import pandas as pd
+from jst.sales_cube import DailySalesCube
+from jst.frame_types import SALES_SCHEMA, apply_schema
+
+# ==========================================
+# Local Columnar Sales Store (Parquet แบ่ง Partition ตาม ปี/เดือน)
+# ==========================================
+# โครงสร้าง: <root>/year=2024/month=05/<file_key>.parquet  (1 ไฟล์ Excel -> 1 part ต่อเดือน)
+#           <root>/undated/<file_key>.parquet                (แถวที่ไม่มีเวลาสั่งซื้อ)
+#           <root>/_files/<file_key>.json                    (รายชื่อ part ของแต่ละไฟล์)
+#           <root>/_daily/<file_key>.parquet                 (ยอดรวมรายวันของแต่ละไฟล์ ดู jst/sales_cube.py)
+# Query ช่วงวันที่จะอ่านเฉพาะ Partition ของเดือนที่เกี่ยวข้อง
+
+SALES_COLUMNS = ['Product_ID', 'Qty_Sold', 'Shop', 'Order_Time']
+UNDATED_PARTITION = "undated"
+
+
+def normalize_sales_frame(df):
+    """แปลงข้อมูลยอดขายให้เหลือเฉพาะคอลัมน์ที่ใช้ พร้อมชนิดข้อมูลที่แน่นอน"""
+    out = pd.DataFrame(index=df.index)
+    out['Product_ID'] = df['Product_ID'].astype(str) if 'Product_ID' in df.columns else ""
+    qty = pd.to_numeric(df['Qty_Sold'], errors='coerce') if 'Qty_Sold' in df.columns else 0
+    out['Qty_Sold'] = pd.Series(qty, index=df.index).fillna(0).astype('int32')
+    out['Shop'] = df['Shop'].fillna("").astype(str) if 'Shop' in df.columns else ""
+    order_time = df['Order_Time'] if 'Order_Time' in df.columns else pd.NaT
+    out['Order_Time'] = pd.to_datetime(pd.Series(order_time, index=df.index), errors='coerce').astype('datetime64[ns]')
+    return out.reset_index(drop=True)
+
+
+class SalesStore:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.RLock()
+        self.daily = DailySalesCube(os.path.join(root, "_daily"))
+
+    def _file_key(self, file_id):
+        return hashlib.md5(file_id.encode()).hexdigest()
+
+    def _marker_path(self, file_id):
+        return os.path.join(self.root, "_files", f"{self._file_key(file_id)}.json")
+
+    # --- Interface สำหรับ IngestManifest (has / save / load / remove) ---
+    def has(self, file_id):
+        return os.path.exists(self._marker_path(file_id))
+
+    def save(self, file_id, df):
+        data = normalize_sales_frame(df)
+        key = self._file_key(file_id)
+        with self._lock:
+            self.remove(file_id)
+            parts = []
+            month_key = data['Order_Time'].dt.strftime("year=%Y/month=%m").fillna(UNDATED_PARTITION)
+            for partition, part_df in data.groupby(month_key, sort=True):
+                part_dir = os.path.join(self.root, *partition.split("/"))
+                os.makedirs(part_dir, exist_ok=True)
+                path = os.path.join(part_dir, f"{key}.parquet")
+                part_df.to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+                parts.append(os.path.relpath(path, self.root))
+            marker = self._marker_path(file_id)
+            os.makedirs(os.path.dirname(marker), exist_ok=True)
+            with open(marker, "w", encoding="utf-8") as f:
+                json.dump({"file_id": file_id, "parts": parts, "rows": len(data)}, f)
+            self.daily.put(key, data)
+
+    def load(self, file_id):
+        with self._lock:
+            with open(self._marker_path(file_id), "r", encoding="utf-8") as f:
+                parts = json.load(f)["parts"]
+            return self._read_parts([os.path.join(self.root, p) for p in parts])
+
+    def remove(self, file_id):
+        with self._lock:
+            marker = self._marker_path(file_id)
+            try:
+                with open(marker, "r", encoding="utf-8") as f:
+                    parts = json.load(f)["parts"]
+            except (OSError, ValueError):
+                return
+            for p in parts:
+                try: os.remove(os.path.join(self.root, p))
+                except OSError: pass
+            os.remove(marker)
+            self.daily.drop(self._file_key(file_id))
+
+    def cube(self):
+        """Daily Sales Cube ของทุกไฟล์ใน store (ไฟล์ที่ยังไม่มี part รายวัน จะถูกสร้างให้จากข้อมูลเดิม)"""
+        with self._lock:
+            for marker in glob.glob(os.path.join(self.root, "_files", "*.json")):
+                key = os.path.basename(marker)[:-len(".json")]
+                if self.daily.has_part(key): continue
+                try:
+                    with open(marker, "r", encoding="utf-8") as f: file_id = json.load(f)["file_id"]
+                    self.daily.put(key, self.load(file_id))
+                except Exception as err: print(f"Skip daily rebuild {marker}: {err}")
+        return self.daily
+
+    # --- Query ---
+    def _partition_paths(self, date_from=None, date_to=None):
+        month_from = (date_from.year, date_from.month) if date_from else None
+        month_to = (date_to.year, date_to.month) if date_to else None
+        paths = []
+        for part_dir in glob.glob(os.path.join(self.root, "year=*", "month=*")):
+            year = int(os.path.basename(os.path.dirname(part_dir))[5:])
+            month = int(os.path.basename(part_dir)[6:])
+            if month_from and (year, month) < month_from: continue
+            if month_to and (year, month) > month_to: continue
+            paths.extend(glob.glob(os.path.join(part_dir, "*.parquet")))
+        if not date_from and not date_to:
+            paths.extend(glob.glob(os.path.join(self.root, UNDATED_PARTITION, "*.parquet")))
+        return sorted(paths)
+
+    def _read_parts(self, paths):
+        frames = [pd.read_parquet(p) for p in paths]
+        if not frames: return normalize_sales_frame(pd.DataFrame(columns=SALES_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
+
+    def query(self, date_from=None, date_to=None):
+        """อ่านยอดขายช่วง date_from..date_to (None = ไม่จำกัด) โดยอ่านเฉพาะ Partition ที่เกี่ยวข้อง"""
+        with self._lock:
+            df = self._read_parts(self._partition_paths(date_from, date_to))
+        if df.empty: return df
+        if date_from: df = df[df['Order_Time'] >= pd.Timestamp(date_from)]
+        if date_to: df = df[df['Order_Time'] < pd.Timestamp(date_to) + pd.Timedelta(days=1)]
+        return apply_schema(df.reset_index(drop=True), SALES_SCHEMA)
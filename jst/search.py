@@ -0,0 +1,81 @@
+import sys
+import heapq
+import unicodedata
+from jst.report_cache import estimate_size
+
+# ==========================================
+# SKU Search Index (ค้นหาสินค้าจาก รหัส / ชื่อ ฝั่ง Server)
+# ==========================================
+# - Inverted index แบบ trigram (ตัวอักษรติดกัน 3 ตัว) ของรหัสและชื่อสินค้าที่ normalize แล้ว (ไทย/อังกฤษ)
+# - คำค้น >= 3 ตัวอักษร: เอาเฉพาะสินค้าที่มีทุก trigram ของคำค้น แล้วตรวจ substring จริงอีกครั้ง
+# - คำค้นสั้นกว่านั้น: ตรวจทุกรายการ (เป็นการเทียบ string สั้นๆ ยังเร็วพอ)
+# - จัดอันดับ: รหัสตรงทั้งหมด > รหัสขึ้นต้นด้วย > ชื่อขึ้นต้นด้วย > รหัสมีคำค้น > คำในชื่อขึ้นต้นด้วย > ชื่อมีคำค้น
+
+GRAM_SIZE = 3
+
+
+def normalize_text(text):
+    """ตัวพิมพ์เล็ก + รูปแบบ Unicode เดียวกัน (NFKC) + ช่องว่างเหลือช่องเดียว"""
+    if text is None: return ""
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    return " ".join(text.split())
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class SkuSearchIndex:
+    def __init__(self, ids, names):
+        self.ids = [normalize_text(x) for x in ids]
+        self.names = [normalize_text(x) for x in names]
+        postings = {}
+        for i, (pid, name) in enumerate(zip(self.ids, self.names)):
+            for gram in _grams(pid) | _grams(name):
+                postings.setdefault(gram, []).append(i)
+        self._postings = postings
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __sizeof__(self):
+        # ตำแหน่งใน postings เป็น int ตัวเดียวกันทุก list -> นับแค่ช่องใน list ไม่นับ int ซ้ำ
+        postings = sys.getsizeof(self._postings) + sum(sys.getsizeof(g) + sys.getsizeof(ids) for g, ids in self._postings.items())
+        return object.__sizeof__(self) + estimate_size(self.ids) + estimate_size(self.names) + postings
+
+    def _candidates(self, q):
+        if len(q) < GRAM_SIZE: return range(len(self.ids))
+        # เริ่มจาก trigram ที่มีรายการน้อยที่สุด แล้วตัดด้วย trigram อื่น
+        grams = sorted(_grams(q), key=lambda g: len(self._postings.get(g, ())))
+        result = set(self._postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not result: break
+            result.intersection_update(self._postings.get(gram, ()))
+        return result
+
+    def _rank(self, i, q):
+        pid, name = self.ids[i], self.names[i]
+        if pid == q: return 0
+        if pid.startswith(q): return 1
+        if name.startswith(q): return 2
+        if q in pid: return 3
+        pos = name.find(q)
+        if pos < 0: return None
+        return 4 if name[pos - 1] == " " else 5
+
+    def search(self, query, limit=None):
+        """ตำแหน่งของสินค้าที่ตรงกับคำค้น เรียงตามความเกี่ยวข้อง (limit = จำนวนสูงสุด)"""
+        q = normalize_text(query)
+        if not q: return []
+        hits = []
+        for i in self._candidates(q):
+            rank = self._rank(i, q)
+            if rank is not None: hits.append((rank, len(self.ids[i]), i))
+        hits = heapq.nsmallest(limit, hits) if limit else sorted(hits)
+        return [i for _, _, i in hits]
+
+    def matches(self, query):
+        """ตำแหน่งทั้งหมดที่รหัสหรือชื่อมีคำค้น (ไม่จัดอันดับ)"""
+        q = normalize_text(query)
+        if not q: return set(range(len(self.ids)))
+        return {i for i in self._candidates(q) if q in self.ids[i] or q in self.names[i]}
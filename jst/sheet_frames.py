@@ -0,0 +1,148 @@
+import pandas as pd
+from jst.write_queue import grid_records
+from jst.frame_types import MASTER_SCHEMA, PO_SCHEMA, apply_schema
+
+# ==========================================
+# Sheet Frames (แปลงข้อมูลดิบจาก Tab MASTER / PO_DATA เป็น DataFrame ที่แอปใช้)
+# ==========================================
+# ไม่มีส่วนของ Streamlit -> ใช้ได้ทั้งในแอปและใน benchmarks/
+
+# ==========================================
+# 🛠️ MAPPING COLUMN (อัปเดตใหม่ตามไฟล์ JST)
+# ==========================================
+MASTER_COLUMN_MAP = {
+    # --- 1. รหัสสินค้า (Product ID) ---
+    'รหัสสินค้า': 'Product_ID', 'รหัส': 'Product_ID', 'ID': 'Product_ID',
+    'รหัสSKU': 'Product_ID',  # <--- อัปเดตใหม่
+    
+    # --- 2. ชื่อสินค้า (Product Name) ---
+    'ชื่อสินค้า': 'Product_Name', 'ชื่อ': 'Product_Name', 'Name': 'Product_Name',
+    
+    # --- 3. รูปภาพ (Image) ---
+    'รูป': 'Image', 'รูปภาพ': 'Image', 'Link รูป': 'Image',
+    'รูปภาพ SKU': 'Image',    # <--- อัปเดตใหม่
+    'รูปภาพ SPU': 'Image',    # (สำรอง)
+    
+    # --- 4. จำนวนสต็อก (Initial Stock) ---
+    'Stock': 'Initial_Stock', 'จำนวน': 'Initial_Stock', 'สต็อก': 'Initial_Stock', 'คงเหลือ': 'Initial_Stock',
+    'สินค้าคงคลัง': 'Initial_Stock', 
+    'จํานวนที่ใช้ได้': 'Initial_Stock', # <--- อัปเดตใหม่
+    
+    # --- 5. จุดเตือนขั้นต่ำ (Min Limit) ---
+    'Min_Limit': 'Min_Limit', 'Min': 'Min_Limit', 'จุดเตือน': 'Min_Limit',
+    'สต็อกความปลอดภัยน้อยสุด': 'Min_Limit',
+    'จำนวนน้อยสุดในการเติมสินค้า (MIN)': 'Min_Limit', # <--- อัปเดตใหม่
+    
+    # --- 6. หมวดหมู่ (Type) ---
+    'Type': 'Product_Type', 'หมวดหมู่': 'Product_Type', 'Category': 'Product_Type', 'กลุ่ม': 'Product_Type',
+
+    # --- 7. (ใหม่) หมายเหตุ ---
+    'หมายเหตุ': 'Note', 'Note': 'Note', 'Remark': 'Note', 'Remarks': 'Note'
+}
+
+PO_COLUMN_MAP = {
+    'รหัสสินค้า': 'Product_ID', 'เลข PO': 'PO_Number', 'ขนส่ง': 'Transport_Type',
+    'วันที่สั่งซื้อ': 'Order_Date', 
+    'Expected_Date': 'Expected_Date', 'วันที่คาดว่าจะได้รับ': 'Expected_Date', 'วันที่คาดการณ์': 'Expected_Date',
+    'วันที่ได้รับ': 'Received_Date', 
+    'จำนวน': 'Qty_Ordered',          
+    'จำนวนที่ได้รับ': 'Qty_Received', 
+    'ราคา/ชิ้น': 'Price_Unit_NoVAT', 'ราคา (หยวน)': 'Total_Yuan', 'เรทเงิน': 'Yuan_Rate',
+    'เรทค่าขนส่ง': 'Ship_Rate', 'ขนาด (คิว)': 'CBM', 'ค่าส่ง': 'Ship_Cost', 'น้ำหนัก / KG': 'Transport_Weight',
+    'SHOPEE': 'Shopee_Price', 'LAZADA': 'Lazada_Price', 'TIKTOK': 'TikTok_Price', 'หมายเหตุ': 'Note',
+    'ราคา (บาท)': 'Total_THB', 'Link_Shop': 'Link', 'WeChat': 'WeChat'
+}
+
+# คอลัมน์ใน Master ที่แก้ได้จากหน้าเว็บ (ชื่อหัวตารางใน Sheet = ชื่อคอลัมน์ใน DF) -> ประเภทข้อมูล
+MASTER_EDITABLE_COLUMNS = {"Min_Limit": int, "Note": str}
+
+
+def rename_columns(df, col_map):
+    return df.rename(columns={k:v for k,v in col_map.items() if k in df.columns})
+
+
+def master_frame_from_grid(grid):
+    """ข้อมูลดิบ Tab MASTER (แถวแรก = หัวตาราง) -> DataFrame ของ Master"""
+    df = pd.DataFrame(grid_records(grid))
+    
+    # ลบช่องว่างหัวตาราง (เผื่อมีเว้นวรรคหน้าหลัง)
+    df.columns = df.columns.astype(str).str.strip()
+    
+    # เปลี่ยนชื่อคอลัมน์ตาม Map ที่ตั้งไว้
+    df = rename_columns(df, MASTER_COLUMN_MAP)
+    
+    # เติมค่า Default หากคอลัมน์ขาดหายไป
+    if 'Initial_Stock' not in df.columns: df['Initial_Stock'] = 0
+    if 'Product_ID' not in df.columns: df['Product_ID'] = "Unknown"
+    if 'Product_Name' not in df.columns: df['Product_Name'] = df['Product_ID']
+    if 'Product_Type' not in df.columns: df['Product_Type'] = "ทั่วไป"
+    if 'Note' not in df.columns: df['Note'] = ""
+    
+    # แปลงข้อมูลตัวเลขให้ถูกต้อง
+    df['Initial_Stock'] = pd.to_numeric(df['Initial_Stock'], errors='coerce').fillna(0).astype(int)
+    
+    # ตำแหน่งแถวใน Sheet (เริ่มที่ 2) + หัวตารางจริง ใช้ตอนบันทึกเฉพาะเซลล์ที่แก้ (master_limit_ops)
+    df['Sheet_Row_Index'] = range(2, len(df) + 2)
+    header = [str(h) for h in grid[0]] if grid else []
+    while header and header[-1] == "": header.pop()
+    df.attrs['sheet_header'] = header
+    # ชนิดข้อมูลตาม Schema (Product_ID เป็น str, หมวดหมู่เป็น category ดู jst/frame_types.py)
+    return apply_schema(df, MASTER_SCHEMA)
+
+
+def po_frame_from_records(records):
+    """แถวของ Tab PO_DATA (แบบ get_all_records) -> DataFrame ของ PO"""
+    df = rename_columns(pd.DataFrame(records), PO_COLUMN_MAP)
+
+    if not df.empty:
+        df['Sheet_Row_Index'] = range(2, len(df) + 2)
+        for col in ['Qty_Ordered', 'Qty_Received', 'Total_Yuan', 'Yuan_Rate']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        
+        if 'Qty_Received' not in df.columns: df['Qty_Received'] = 0
+        if 'Expected_Date' not in df.columns: df['Expected_Date'] = None
+        # วันที่เป็น datetime64 ตั้งแต่ตอนโหลด (ไม่ต้องแปลงซ้ำในแต่ละหน้า ดู jst/frame_types.py)
+        apply_schema(df, PO_SCHEMA)
+    return df
+
+
+def clean_master_value(raw_val, dtype):
+    if dtype == int:
+        try: return int(float(str(raw_val).replace(',', '').strip()))
+        except: return 0
+    return str(raw_val) if pd.notna(raw_val) else ""
+
+
+def master_row_index(df_master):
+    """Product_ID -> [เลขแถวใน Sheet]"""
+    pids = df_master['Product_ID'].astype(str).str.strip()
+    return df_master['Sheet_Row_Index'].groupby(pids, sort=False).agg(list).to_dict()
+
+
+def master_limit_ops(header, row_index, df_view, edited_rows):
+    """คำสั่งเขียนเฉพาะเซลล์ที่ถูกแก้ใน st.data_editor (edited_rows = {ตำแหน่งแถวใน df_view: {คอลัมน์: ค่าใหม่}})
+    header = หัวตารางจริงใน Sheet (ถูกเติมคอลัมน์ที่ยังไม่มี), row_index = master_row_index()
+    คืน (ops สำหรับ Write Queue, จำนวนเซลล์ที่เปลี่ยน)"""
+    ops, col_index, changed = [], {}, 0
+    for pos, col_changes in edited_rows.items():
+        row = df_view.iloc[int(pos)]
+        pid = str(row['Product_ID']).strip()
+        for col_name, new_value in col_changes.items():
+            dtype = MASTER_EDITABLE_COLUMNS.get(col_name)
+            if dtype is None: continue
+            clean_val = clean_master_value(new_value, dtype)
+            # ค่าเท่าเดิม (เช่น แก้แล้วแก้กลับ) ไม่ต้องเขียน
+            if clean_val == clean_master_value(row.get(col_name, ""), dtype): continue
+
+            if col_name not in col_index:
+                # สร้าง Header ใน Sheet ถ้ายังไม่มี
+                if col_name not in header:
+                    header.append(col_name)
+                    ops.append(("write", (1, len(header), [[col_name]])))
+                col_index[col_name] = header.index(col_name) + 1
+
+            for sheet_row in row_index.get(pid, []):
+                ops.append(("write", (sheet_row, col_index[col_name], [[clean_val]])))
+                changed += 1
+    return ops, changed
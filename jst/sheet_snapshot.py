@@ -0,0 +1,62 @@
+import time
+import threading
+
+# ==========================================
+# Sheet Snapshot (ข้อมูลสดของ Tab + ตรวจว่า Spreadsheet เปลี่ยนหรือยังก่อนโหลดใหม่)
+# ==========================================
+# - เช็ค version ของไฟล์ Spreadsheet จาก Drive (metadata เล็กๆ) แทนการดึงข้อมูลทั้ง Tab ทุกครั้ง
+# - version เดิม -> ใช้ DataFrame + index ที่สร้างไว้แล้ว / version ใหม่ -> โหลด Tab ใหม่ทั้งหมดครั้งเดียว
+# - rerun ถี่ๆ (เช่นพิมพ์ในกล่องค้นหา) ภายใน probe_interval วินาที ไม่ต้องเช็ค version ซ้ำ
+# - บันทึกข้อมูลจากแอปเอง ให้เรียก invalidate() เพื่อโหลดใหม่รอบถัดไปทันที
+
+DEFAULT_PROBE_INTERVAL = 5
+
+
+def get_drive_file_version(service, file_id):
+    """version + modifiedTime ของไฟล์บน Drive (เปลี่ยนทุกครั้งที่มีการแก้ไขไฟล์)"""
+    meta = service.files().get(fileId=file_id, fields="version, modifiedTime").execute()
+    return (meta.get('version'), meta.get('modifiedTime'))
+
+
+class SheetSnapshot:
+    def __init__(self, load_fn, version_fn, derive_fn=None, probe_interval=DEFAULT_PROBE_INTERVAL):
+        """load_fn() -> DataFrame ของ Tab, version_fn() -> version ของไฟล์
+        derive_fn(df) -> ข้อมูลที่สร้างจาก DataFrame (เช่น index สำหรับค้นหา) สร้างครั้งเดียวต่อ version"""
+        self.load_fn = load_fn
+        self.version_fn = version_fn
+        self.derive_fn = derive_fn
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._frame = None
+        self._derived = None
+        self._version = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+    def get(self):
+        """คืน (DataFrame, derived) ล่าสุด (โหลดใหม่เฉพาะเมื่อไฟล์เปลี่ยน)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._frame is not None and now - self._checked_at < self.probe_interval:
+                return self._frame, self._derived
+
+            try: version = self.version_fn()
+            except Exception as err:
+                print(f"Sheet version check failed: {err}")
+                version = None
+
+            # เช็ค version ไม่ได้ -> ถ้ามีข้อมูลเดิมให้ใช้ไปก่อน (ไม่งั้นโหลดใหม่)
+            if self._frame is None or (version is not None and version != self._version):
+                frame = self.load_fn()
+                self._derived = self.derive_fn(frame) if self.derive_fn else None
+                self._frame = frame
+                self._version = version
+                self.loads += 1
+            self._checked_at = now
+            return self._frame, self._derived
+
+    def invalidate(self):
+        with self._lock:
+            self._frame = None
+            self._derived = None
+            self._version = None
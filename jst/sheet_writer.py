@@ -0,0 +1,78 @@
+import math
+import random
+import time
+from datetime import date, datetime
+import gspread
+import requests
+
+# ==========================================
+# Batched Sheet Writer (เขียนหลายแถวใน request เดียว)
+# ==========================================
+# - คำสั่ง request ของ spreadsheets.batchUpdate (เขียนทับช่วงเซลล์ / ต่อท้าย / ลบแถว) ที่ Write Queue ใช้รวมส่งครั้งเดียว (ดู jst/write_queue.py)
+# - ค่าที่เขียนเทียบเท่า value_input_option='RAW' แบบเดิม (ข้อความไม่ถูกแปลงเป็นวันที่/สูตร)
+# - Error ชั่วคราว (429 quota / 5xx / network) ลองใหม่ทั้งชุดแบบ backoff
+
+WRITE_RETRIES = 3
+WRITE_BACKOFF_SECONDS = 1.0
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+def format_sheet_value(item):
+    """แปลงค่าให้พร้อมเขียนลง Sheet (วันที่ -> YYYY-MM-DD, None/NaN -> ว่าง)"""
+    if isinstance(item, (date, datetime)): return item.strftime("%Y-%m-%d")
+    if item is None: return ""
+    if hasattr(item, 'item') and not isinstance(item, (str, bytes)): item = item.item()  # numpy scalar
+    if isinstance(item, float) and math.isnan(item): return ""
+    return item
+
+
+def _cell(item):
+    value = format_sheet_value(item)
+    if value == "": return {}
+    if isinstance(value, bool): return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)): return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def _row(values):
+    return {"values": [_cell(v) for v in values]}
+
+
+def build_block_request(sheet_id, row_index, col_index, rows):
+    """เขียนทับช่วงเริ่มที่ (แถว, คอลัมน์) นับจาก 1 ด้วยข้อมูล 2 มิติ rows"""
+    row_index, col_index = int(row_index), int(col_index)
+    return {"updateCells": {
+        "range": {"sheetId": sheet_id, "startRowIndex": row_index - 1, "endRowIndex": row_index - 1 + len(rows),
+                  "startColumnIndex": col_index - 1, "endColumnIndex": col_index - 1 + max(len(r) for r in rows)},
+        "rows": [_row(values) for values in rows],
+        "fields": "userEnteredValue",
+    }}
+
+
+def build_append_request(sheet_id, rows):
+    return {"appendCells": {"sheetId": sheet_id, "rows": [_row(values) for values in rows], "fields": "userEnteredValue"}}
+
+
+def build_delete_request(sheet_id, row_index):
+    row_index = int(row_index)
+    return {"deleteDimension": {"range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": row_index - 1, "endIndex": row_index}}}
+
+
+def is_retryable(err):
+    if isinstance(err, gspread.exceptions.APIError):
+        return getattr(err.response, 'status_code', None) in RETRYABLE_STATUS
+    # ต่อไม่ติด = request ยังไม่ถึง Server (ไม่ลองใหม่เมื่อ timeout เพราะอาจเขียนไปแล้ว -> แถวต่อท้ายซ้ำ)
+    return isinstance(err, (requests.exceptions.ConnectionError, ConnectionError)) and not isinstance(err, requests.exceptions.Timeout)
+
+
+def call_with_retry(fn, retries=WRITE_RETRIES, backoff=WRITE_BACKOFF_SECONDS):
+    """เรียก fn() ถ้าเจอ Error ชั่วคราว รอแบบ exponential backoff (+jitter) แล้วลองใหม่"""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as err:
+            if attempt >= retries or not is_retryable(err): raise
+            wait = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            print(f"Sheet write retry {attempt + 1}/{retries} in {wait:.1f}s: {err}")
+            time.sleep(wait)
+
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# Status Engine (คำนวณสถานะทั้งคอลัมน์ในครั้งเดียว ใช้ร่วมกันทุกหน้า)
+# ==========================================
+
+# สถานะ PO: (ข้อความ, สีพื้น, สีตัวอักษร)
+PO_STATUS_DONE = ("เรียบร้อย", "#d4edda", "#155724")
+PO_STATUS_PARTIAL = ("สินค้าไม่ครบ", "#fff3cd", "#856404")
+PO_STATUS_ARRIVING = ("สินค้าใกล้ถึง", "#cce5ff", "#004085")
+PO_STATUS_WAITING = ("รอจัดส่ง", "#f8f9fa", "#333333")
+PO_ARRIVING_DAYS = 4
+
+# สถานะ Stock: (หมด, ใกล้หมด, ปกติ)
+SALES_STATUS_LABELS = ("🔴 หมด", "⚠️ ใกล้หมด", "🟢 ปกติ")
+STOCK_STATUS_LABELS = ("🔴 หมดเกลี้ยง", "⚠️ ของใกล้หมด", "🟢 มีของ")
+
+
+def _numeric_col(df, col):
+    if col not in df.columns: return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+
+def apply_po_status(df, today=None):
+    """เพิ่มคอลัมน์ Status_Text / Status_BG / Status_Color ให้ตาราง PO
+    เรียบร้อย = รับครบ, สินค้าไม่ครบ = รับบางส่วน, สินค้าใกล้ถึง = Expected_Date อีก 0-4 วัน, นอกนั้น = รอจัดส่ง"""
+    qty_ord = _numeric_col(df, 'Qty_Ordered')
+    qty_recv = _numeric_col(df, 'Qty_Received')
+    today = pd.Timestamp(today) if today is not None else pd.Timestamp.today().normalize()
+    if 'Expected_Date' in df.columns:
+        diff_days = (pd.to_datetime(df['Expected_Date'], errors='coerce') - today).dt.days.to_numpy(dtype=float)
+    else:
+        diff_days = np.full(len(df), np.nan)
+
+    conditions = [
+        (qty_recv >= qty_ord) & (qty_ord > 0),
+        (qty_recv > 0) & (qty_recv < qty_ord),
+        (diff_days >= 0) & (diff_days <= PO_ARRIVING_DAYS),
+    ]
+    choices = [PO_STATUS_DONE, PO_STATUS_PARTIAL, PO_STATUS_ARRIVING]
+    for i, col in enumerate(['Status_Text', 'Status_BG', 'Status_Color']):
+        df[col] = np.select(conditions, [c[i] for c in choices], default=PO_STATUS_WAITING[i])
+    return df
+
+
+def stock_status(current_stock, min_limit, labels=STOCK_STATUS_LABELS):
+    """สถานะ Stock ทั้งคอลัมน์: <= 0 = หมด, <= Min_Limit = ใกล้หมด, นอกนั้น = ปกติ"""
+    current = np.asarray(current_stock, dtype=float)
+    limit = np.asarray(min_limit, dtype=float)
+    return np.select([current <= 0, current <= limit], labels[:2], default=labels[2])
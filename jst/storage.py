@@ -0,0 +1,208 @@
+import os
+import csv
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+import pandas as pd
+from jst.ingest import list_folder_files, download_drive_file
+from jst.sheet_snapshot import get_drive_file_version
+from jst.write_queue import normalize_ops, build_job_requests, apply_job
+from jst.po_allocator import appended_row
+
+# ==========================================
+# Storage Backend (แหล่งข้อมูล Tab ใน Sheet + ไฟล์ใน Folder)
+# ==========================================
+# ทุก Backend มีเมธอดชุดเดียวกัน:
+#   Sheet : read_tab(tab) -> grid (แถวแรก = หัวตาราง, ทุกช่องเป็นข้อความ), ensure_tab(tab, header),
+#           write(tab, ops) / write_batch([SheetOps หรือ WriteJob, ...]), append_rows(tab, rows) -> เลขแถวแรกที่ต่อท้าย,
+#           sheet_version() -> เปลี่ยนทุกครั้งที่ข้อมูลใน Tab ใดๆ เปลี่ยน
+#   Folder: list_files(folder_id, limit) -> [{id, name, modifiedTime, md5Checksum}] ใหม่ -> เก่า, download(file_id) -> bytes
+# ops = คำสั่งแบบเดียวกับ Write Queue: ("write", (แถว, คอลัมน์, rows)) / ("append", rows) / ("delete", แถว)
+#
+# - GoogleStorage: Google Sheets (1 Spreadsheet) + Google Drive
+# - LocalStorage : ไฟล์ในเครื่อง ใช้รันแอป / benchmark กับสำเนาข้อมูลโดยไม่ต้องผ่าน network
+#     <root>/sheets/<tab>.csv | .parquet | .xlsx   (Tab ใหม่สร้างเป็น .csv)
+#     <root>/folders/<ชื่อ folder>/*.xlsx           (ชื่อ folder = folders[folder_id] หรือ folder_id)
+
+SheetOps = namedtuple("SheetOps", ["tab", "ops"])
+TAB_FORMATS = (".csv", ".parquet", ".xlsx")
+
+
+class GoogleStorage:
+    supports_formulas = True
+
+    def __init__(self, clients):
+        self.clients = clients
+
+    # --- Sheet ---
+    def read_tab(self, tab):
+        return self.clients.worksheet(tab).get_all_values()
+
+    def ensure_tab(self, tab, header, rows=1000):
+        self.clients.worksheet(tab, create_rows=rows, create_cols=len(header), header=header)
+
+    def write_batch(self, batches):
+        """ทุกคำสั่งของทุก Tab ส่งเป็น spreadsheets.batchUpdate ครั้งเดียว (สำเร็จ/ล้มเหลวทั้งชุด)"""
+        reqs, spreadsheet = [], None
+        for batch in batches:
+            ws = self.clients.worksheet(batch.tab)
+            spreadsheet = ws.spreadsheet
+            reqs.extend(build_job_requests(ws.id, batch))
+        if reqs: spreadsheet.batch_update({"requests": reqs})
+
+    def write(self, tab, ops):
+        self.write_batch([SheetOps(tab, normalize_ops(ops))])
+
+    def append_rows(self, tab, rows, formulas=False):
+        """ต่อท้าย Tab (formulas=True: ค่าที่ขึ้นต้นด้วย = เป็นสูตร) คืนเลขแถวแรกที่ต่อท้าย"""
+        response = self.clients.worksheet(tab).append_rows(
+            rows, value_input_option="USER_ENTERED" if formulas else "RAW", table_range="A1"
+        )
+        return appended_row(response)
+
+    def sheet_version(self):
+        with self.clients.drive() as service:
+            return get_drive_file_version(service, self.clients.spreadsheet_id)
+
+    # --- Folder ---
+    def list_files(self, folder_id, limit=None):
+        with self.clients.drive() as service:
+            return list_folder_files(service, folder_id, limit)
+
+    def download(self, file_id):
+        # googleapiclient ใช้ httplib2 ซึ่งไม่ thread-safe -> แต่ละ thread ยืม service ของตัวเองจาก pool
+        with self.clients.drive() as service:
+            return download_drive_file(service, file_id)
+
+    def reset(self):
+        self.clients.reset()
+
+
+def _cell_text(value):
+    if value is None: return ""
+    if isinstance(value, float):
+        if value != value: return ""
+        if value.is_integer(): return str(int(value))
+    return str(value)
+
+
+def _mtime_iso(mtime):
+    # รูปแบบเดียวกับ modifiedTime ของ Drive (เรียงตามตัวอักษร = เรียงตามเวลา)
+    return datetime.fromtimestamp(mtime, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class LocalStorage:
+    supports_formulas = False
+
+    def __init__(self, root, folders=None):
+        """folders = {folder_id: ชื่อโฟลเดอร์ใต้ <root>/folders} (ไม่ระบุ = ใช้ folder_id เป็นชื่อ)"""
+        self.root = os.path.abspath(root)
+        self.folders = dict(folders or {})
+        self._lock = threading.RLock()
+        os.makedirs(os.path.join(self.root, "sheets"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "folders"), exist_ok=True)
+
+    # --- Sheet ---
+    def _tab_path(self, tab):
+        base = os.path.join(self.root, "sheets", tab)
+        for ext in TAB_FORMATS:
+            if os.path.exists(base + ext): return base + ext
+        return None
+
+    def read_tab(self, tab):
+        with self._lock:
+            path = self._tab_path(tab)
+            if path is None: raise FileNotFoundError(f"ไม่พบ Tab {tab} ใน {os.path.join(self.root, 'sheets')}")
+            if path.endswith(".csv"):
+                with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                    return [row for row in csv.reader(f)]
+            if path.endswith(".parquet"): df = pd.read_parquet(path)
+            else: df = pd.read_excel(path, dtype=object)
+        header = [str(c) for c in df.columns]
+        return [header] + [[_cell_text(v) for v in row] for row in df.itertuples(index=False, name=None)]
+
+    def _save_tab(self, tab, grid):
+        path = self._tab_path(tab) or os.path.join(self.root, "sheets", f"{tab}.csv")
+        tmp = path + ".tmp"
+        if path.endswith(".csv"):
+            with open(tmp, "w", encoding="utf-8", newline="") as f: csv.writer(f).writerows(grid)
+        else:
+            header = [str(h) for h in grid[0]] if grid else []
+            rows = [[_cell_text(v) for v in line[:len(header)]] + [""] * (len(header) - len(line)) for line in grid[1:]]
+            df = pd.DataFrame(rows, columns=header)
+            if path.endswith(".parquet"): df.to_parquet(tmp, index=False)
+            else:
+                with open(tmp, "wb") as f: df.to_excel(f, index=False)
+        os.replace(tmp, path)
+
+    def ensure_tab(self, tab, header, rows=None):
+        with self._lock:
+            if self._tab_path(tab) is None: self._save_tab(tab, [list(header)])
+
+    def write_batch(self, batches):
+        """คำสั่งของแต่ละ Tab ทำตามลำดับในหน่วยความจำ แล้วบันทึกทับไฟล์ครั้งเดียวต่อ Tab"""
+        with self._lock:
+            grids = {}
+            for batch in batches:
+                if batch.tab not in grids: grids[batch.tab] = [list(line) for line in self.read_tab(batch.tab)]
+                apply_job(grids[batch.tab], batch)
+            for tab, grid in grids.items(): self._save_tab(tab, [[_cell_text(v) for v in line] for line in grid])
+
+    def write(self, tab, ops):
+        self.write_batch([SheetOps(tab, normalize_ops(ops))])
+
+    def append_rows(self, tab, rows, formulas=False):
+        with self._lock:
+            first_row = len(self.read_tab(tab)) + 1
+            self.write(tab, [("append", rows)])
+            return first_row
+
+    def sheet_version(self):
+        paths = [os.path.join(self.root, "sheets", name) for name in os.listdir(os.path.join(self.root, "sheets"))]
+        return max((os.stat(p).st_mtime_ns for p in paths if p.endswith(TAB_FORMATS)), default=None)
+
+    # --- Folder ---
+    def _folder_dir(self, folder_id):
+        return os.path.join(self.root, "folders", self.folders.get(folder_id, folder_id))
+
+    def list_files(self, folder_id, limit=None):
+        folder = self._folder_dir(folder_id)
+        if not os.path.isdir(folder): return []
+        rel = os.path.relpath(folder, os.path.join(self.root, "folders"))
+        items = []
+        for entry in os.scandir(folder):
+            if not entry.is_file() or entry.name.endswith(".tmp"): continue
+            stat = entry.stat()
+            items.append({
+                'id': f"{rel}/{entry.name}", 'name': entry.name, 'modifiedTime': _mtime_iso(stat.st_mtime),
+                # ไม่อ่านทั้งไฟล์เพื่อทำ md5: ขนาด + เวลาแก้ไข เปลี่ยนเมื่อไฟล์ถูกแก้ไขเหมือนกัน
+                'md5Checksum': f"{stat.st_size}-{stat.st_mtime_ns}",
+            })
+        items.sort(key=lambda x: x['modifiedTime'], reverse=True)
+        return items[:limit] if limit else items
+
+    def download(self, file_id):
+        base = os.path.join(self.root, "folders")
+        path = os.path.normpath(os.path.join(base, file_id))
+        if not path.startswith(base + os.sep): raise ValueError(f"file id อยู่นอก Folder: {file_id}")
+        with open(path, "rb") as f: return f.read()
+
+    def reset(self):
+        pass
+
+    def import_from(self, source, tabs=(), folders=()):
+        """คัดลอก Tab และไฟล์ใน Folder จาก Backend อื่น (เช่น GoogleStorage) มาเก็บในเครื่อง
+        folders = folder_id ที่ต้องการ (ชื่อโฟลเดอร์ปลายทางตาม self.folders) คืน (จำนวน Tab, จำนวนไฟล์)"""
+        for tab in tabs:
+            grid = source.read_tab(tab)
+            with self._lock: self._save_tab(tab, grid)
+        copied = 0
+        for folder_id in folders:
+            folder = self._folder_dir(folder_id)
+            os.makedirs(folder, exist_ok=True)
+            for item in source.list_files(folder_id):
+                path = os.path.join(folder, os.path.basename(item['name']))
+                with open(path + ".tmp", "wb") as f: f.write(source.download(item['id']))
+                os.replace(path + ".tmp", path)
+                copied += 1
+        return len(tabs), copied
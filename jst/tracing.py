@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# ==========================================
+# Tracing (จับเวลาแต่ละขั้นตอนในการ rerun 1 รอบ)
+# ==========================================
+# - 1 rerun = 1 RerunTrace (start_rerun / finish_rerun) ภายในมี Span ซ้อนกันตามการเรียกฟังก์ชัน
+# - Span เก็บ: เวลา (ms), จำนวนแถว, bytes (ที่ดาวน์โหลด / HTML ที่สร้าง), cache hit/miss, error
+# - kind = ประเภทงาน ใช้สรุปว่าเวลาหมดไปกับอะไร: sheet / drive / parse / compute / html / cache / write
+# - Span ที่เกิดนอก rerun (เช่น Thread โหลดข้อมูลเบื้องหลัง) ถูกเก็บเป็น trace แยกของตัวเอง
+# - ทุก trace ถูกเขียนลง Log แบบ JSONL (1 บรรทัด = 1 span) ถ้าเรียก configure() แล้ว
+# สถานะอยู่ใน contextvars: แต่ละ session (Thread ของ Streamlit) มี trace ของตัวเอง ไม่ปนกัน
+
+DEFAULT_LOG_MAX_BYTES = 20 * 1024 * 1024
+
+_current_trace = contextvars.ContextVar("jst_trace", default=None)
+_current_span = contextvars.ContextVar("jst_span", default=None)
+_log = None
+
+
+class Span:
+    __slots__ = ("name", "kind", "parent", "depth", "start", "duration", "rows", "bytes", "cache", "error", "thread", "_t0")
+
+    def __init__(self, name, kind, parent, cache=None):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.start = time.time()
+        self.duration = None
+        self.rows = None
+        self.bytes = None
+        self.cache = cache
+        self.error = None
+        self.thread = threading.current_thread().name
+        self._t0 = time.perf_counter()
+
+    def set(self, rows=None, bytes=None, cache=None):
+        if rows is not None: self.rows = int(rows)
+        if bytes is not None: self.bytes = int(bytes)
+        if cache is not None: self.cache = cache
+        return self
+
+    def add_bytes(self, n):
+        self.bytes = (self.bytes or 0) + int(n)
+
+    def to_dict(self, origin):
+        return {
+            "name": self.name, "kind": self.kind, "depth": self.depth,
+            "parent": self.parent.name if self.parent else None,
+            "offset_ms": round((self.start - origin) * 1000, 2),
+            "ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "rows": self.rows, "bytes": self.bytes, "cache": self.cache,
+            "error": self.error, "thread": self.thread,
+        }
+
+
+class RerunTrace:
+    def __init__(self, page=None, session=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.page = page
+        self.session = session
+        self.started_at = time.time()
+        self.spans = []        # เรียงตามลำดับที่เริ่ม
+        self.duration = None
+        self._t0 = time.perf_counter()
+
+    def records(self):
+        base = {"rerun": self.id, "page": self.page, "session": self.session,
+                "ts": round(self.started_at, 3), "rerun_ms": round(self.duration * 1000, 2) if self.duration is not None else None}
+        return [dict(base, **s.to_dict(self.started_at)) for s in self.spans]
+
+    def summary(self):
+        """เวลาจริงของแต่ละ kind (ms) นับเฉพาะเวลาของตัวเอง (ไม่รวม span ย่อย) -> รวมกันไม่เกินเวลาทั้ง rerun"""
+        child_time = {}
+        for s in self.spans:
+            if s.parent is not None and s.duration is not None:
+                child_time[id(s.parent)] = child_time.get(id(s.parent), 0.0) + s.duration
+        totals = {}
+        for s in self.spans:
+            if s.duration is None: continue
+            own = max(0.0, s.duration - child_time.get(id(s), 0.0))
+            totals[s.kind] = totals.get(s.kind, 0.0) + own * 1000
+        return {k: round(v, 2) for k, v in sorted(totals.items(), key=lambda kv: -kv[1])}
+
+
+class TraceLog:
+    """เขียน span ต่อท้ายไฟล์ JSONL (ไฟล์ใหญ่เกิน max_bytes -> เปลี่ยนชื่อเป็น .1 แล้วเริ่มไฟล์ใหม่)"""
+    def __init__(self, path, max_bytes=DEFAULT_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, records):
+        if not records: return
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        with self._lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f: f.write(lines)
+            except OSError as err:
+                print(f"Trace log write failed: {err}")
+
+
+def configure(log_path=None, max_bytes=DEFAULT_LOG_MAX_BYTES):
+    """เปิด/ปิด Log (log_path=None = ไม่เขียนไฟล์ เก็บไว้ใน trace อย่างเดียว)"""
+    global _log
+    _log = TraceLog(log_path, max_bytes) if log_path else None
+    return _log
+
+
+# --- rerun ---
+def start_rerun(page=None, session=None):
+    trace = RerunTrace(page, session)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def finish_rerun(trace=None):
+    """ปิด trace ของ rerun นี้ เขียนลง Log แล้วคืน trace (ไว้แสดงใน Profiler)"""
+    trace = trace or _current_trace.get()
+    if trace is None: return None
+    trace.duration = time.perf_counter() - trace._t0
+    _current_trace.set(None)
+    _current_span.set(None)
+    if _log is not None: _log.write(trace.records())
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+# --- span ---
+@contextmanager
+def span(name, kind="compute", cache=None):
+    """with span("ชื่อ", kind="compute") as s: ... s.set(rows=len(df))"""
+    trace = _current_trace.get()
+    own_trace = trace_token = None
+    if trace is None:
+        # นอก rerun (Thread เบื้องหลัง) -> trace แยกของ span นี้
+        trace = own_trace = RerunTrace(page=None)
+        trace_token = _current_trace.set(trace)
+    s = Span(name, kind, _current_span.get(), cache)
+    trace.spans.append(s)
+    span_token = _current_span.set(s)
+    try:
+        yield s
+    except Exception as err:
+        # st.stop() / st.rerun() ไม่ใช่ Exception -> ไม่นับเป็น error
+        s.error = f"{type(err).__name__}: {err}"[:300]
+        raise
+    finally:
+        s.duration = time.perf_counter() - s._t0
+        _current_span.reset(span_token)
+        if own_trace is not None:
+            _current_trace.reset(trace_token)
+            own_trace.duration = s.duration
+            if _log is not None: _log.write(own_trace.records())
+
+
+def _auto_measure(s, result):
+    if isinstance(result, str): s.set(bytes=len(result.encode("utf-8")))
+    elif isinstance(result, tuple) or result is None: pass
+    elif hasattr(result, "__len__"):
+        try: s.set(rows=len(result))
+        except TypeError: pass
+
+
+def traced(name=None, kind="compute", cache=None, rows=None):
+    """Decorator: จับเวลาทั้งฟังก์ชัน จำนวนแถว / bytes วัดจากค่าที่คืน (DataFrame, list, dict -> แถว, str -> bytes)
+    rows = ฟังก์ชันวัดจำนวนแถวจากค่าที่คืนเอง (เช่นค่าที่คืนเป็น tuple)
+    cache="hit" = ฟังก์ชันที่อ่านจาก cache: ถ้าข้างในต้องโหลดจริงให้เรียก cache_miss()"""
+    def wrap(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(label, kind, cache) as s:
+                result = fn(*args, **kwargs)
+                try:
+                    if rows is not None: s.set(rows=rows(result))
+                    else: _auto_measure(s, result)
+                except Exception: pass
+                return result
+        return inner
+    return wrap
+
+
+def note(**fields):
+    """ใส่ข้อมูลเพิ่ม (rows / bytes / cache) ให้ span ที่กำลังทำงานอยู่"""
+    s = _current_span.get()
+    if s is not None: s.set(**fields)
+
+
+def cache_miss():
+    """เรียกจากข้างในฟังก์ชันที่ถูก cache (ทำงานเฉพาะตอนโหลดจริง): เปลี่ยน span ที่ครอบอยู่ใกล้สุดที่เป็น "hit" เป็น "miss" """
+    s = _current_span.get()
+    while s is not None and s.cache != "hit": s = s.parent
+    if s is not None: s.cache = "miss"
@@ -0,0 +1,238 @@
+import time
+import threading
+from gspread.utils import numericise_all
+from jst.sheet_writer import (
+    WRITE_RETRIES, WRITE_BACKOFF_SECONDS, format_sheet_value, call_with_retry,
+    build_block_request, build_append_request, build_delete_request
+)
+
+# ==========================================
+# Write-behind Queue (แสดงผลทันที แล้วค่อยเขียนลง Google Sheet เบื้องหลัง)
+# ==========================================
+# - บันทึก 1 ครั้ง = 1 job (อาจมีหลายคำสั่ง) ต่อ 1 Tab
+#     ("write", (แถว, คอลัมน์, [[ค่า...], ...]))  เขียนทับช่วงเซลล์ (นับจาก 1)
+#     ("append", [[ค่า...], ...])                ต่อท้าย Tab
+#     ("delete", แถว)                            ลบแถว
+# - ระหว่างรอเขียน ข้อมูลที่อ่านจาก Sheet จะถูก "ซ้อน" (overlay) ด้วย job ที่ยังไม่ถึง Sheet -> ผู้ใช้เห็นผลทันที
+# - อ่าน Tab ผ่าน read_tab() เสมอ: รอ batch ของ Tab นั้นที่กำลังเขียนให้เสร็จก่อน และ Worker ไม่ส่ง batch ของ Tab ที่กำลังอ่าน
+#   (ข้อมูลที่อ่านระหว่าง batch กำลังเขียน อาจมีหรือไม่มีผลของ batch นั้นก็ได้ -> ซ้อนซ้ำ = แถวซ้ำ / ลบผิดแถว)
+# - Worker 1 ตัว รวม job ที่ค้างทั้งหมด (ตามลำดับ) เขียนครั้งเดียวผ่าน storage.write_batch (Google = spreadsheets.batchUpdate) + retry แบบ backoff
+# - เขียนไม่สำเร็จ -> job เป็น failed และหยุดคิวไว้ (job หลังจากนั้นอาจอิงเลขแถวของ job ที่ล้มเหลว)
+#   รอผู้ใช้เลือก ลองใหม่ (retry_failed) หรือ ยกเลิกรายการที่ค้าง (discard_failed)
+# - คิวอยู่ในหน่วยความจำของ Server (ปิดแอประหว่างที่ยังมีรายการค้าง = รายการนั้นหาย)
+
+MAX_BATCH_JOBS = 50
+DONE_RETENTION_SECONDS = 600  # เก็บ job ที่เขียนแล้วไว้ซ้อนข้อมูลเก่าที่ยังอยู่ใน cache (ต้องนานกว่า ttl ของ cache)
+
+
+class WriteJob:
+    def __init__(self, job_id, tab, ops, label):
+        self.id = job_id
+        self.tab = tab
+        self.ops = ops
+        self.label = label
+        self.status = "pending"   # pending / running / done / failed
+        self.error = None
+        self.created_at = time.time_ns()
+        self.sent_at = None
+        self.committed_at = None
+
+    def in_grid(self, fetched_at):
+        """job นี้อยู่ในข้อมูลที่อ่านเมื่อ fetched_at หรือยัง: True / False / None = ไม่แน่ใจ (อ่านระหว่างที่กำลังเขียน)"""
+        if self.committed_at is not None and self.committed_at <= fetched_at: return True
+        if self.sent_at is not None and self.sent_at <= fetched_at: return None
+        return False
+
+
+def _clean_rows(rows):
+    return [[format_sheet_value(v) for v in values] for values in rows]
+
+
+def normalize_ops(ops):
+    """แปลงค่าในคำสั่งให้พร้อมเขียน (วันที่ -> ข้อความ, None -> ว่าง) ตั้งแต่ตอน submit"""
+    out = []
+    for op, payload in ops:
+        if op == "write":
+            row_index, col_index, rows = payload
+            out.append((op, (int(row_index), int(col_index), _clean_rows(rows))))
+        elif op == "append":
+            out.append((op, _clean_rows(payload)))
+        elif op == "delete":
+            out.append((op, int(payload)))
+        else:
+            raise ValueError(f"unknown write op: {op}")
+    return out
+
+
+def build_job_requests(sheet_id, job):
+    reqs = []
+    for op, payload in job.ops:
+        if op == "write": reqs.append(build_block_request(sheet_id, *payload))
+        elif op == "append": reqs.append(build_append_request(sheet_id, payload))
+        elif op == "delete": reqs.append(build_delete_request(sheet_id, payload))
+    return reqs
+
+
+def apply_job(grid, job):
+    """ทำคำสั่งของ job กับข้อมูล Tab ในหน่วยความจำ (grid = list ของแถว รวมหัวตาราง, แถวที่ 1 = grid[0])"""
+    for op, payload in job.ops:
+        if op == "write":
+            row_index, col_index, rows = payload
+            for i, values in enumerate(rows):
+                r = row_index - 1 + i
+                while len(grid) <= r: grid.append([])
+                line = grid[r]
+                end = col_index - 1 + len(values)
+                if len(line) < end: line.extend([""] * (end - len(line)))
+                line[col_index - 1:end] = values
+        elif op == "append":
+            grid.extend(list(values) for values in payload)
+        elif op == "delete":
+            if 0 < payload <= len(grid): grid.pop(payload - 1)
+    return grid
+
+
+def grid_records(grid):
+    """แปลงข้อมูล Tab (แถวแรก = หัวตาราง) เป็น list ของ dict แบบเดียวกับ get_all_records()"""
+    if not grid: return []
+    header = [str(h) for h in grid[0]]
+    records = []
+    for line in grid[1:]:
+        values = [v if isinstance(v, str) else str(v) for v in list(line[:len(header)]) + [""] * (len(header) - len(line))]
+        records.append(dict(zip(header, numericise_all(values, default_blank=""))))
+    return records
+
+
+class WriteQueue:
+    def __init__(self, storage, retries=WRITE_RETRIES, backoff=WRITE_BACKOFF_SECONDS, max_batch=MAX_BATCH_JOBS):
+        """storage = Backend ที่มี write_batch(jobs) (ดู jst/storage.py)"""
+        self.storage = storage
+        self.retries = retries
+        self.backoff = backoff
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._jobs = []
+        self._revisions = {}
+        self._next_id = 1
+        self._paused = False
+        self._last_error = None
+        self._reading = {}
+        self._thread = None
+
+    # --- ฝั่งหน้าเว็บ ---
+    def submit(self, tab, ops, label=""):
+        """เข้าคิว (คืนทันที) ข้อมูลที่อ่านผ่าน overlay() จะเห็นผลทันที"""
+        with self._cond:
+            job = WriteJob(self._next_id, tab, normalize_ops(ops), label)
+            self._next_id += 1
+            self._jobs.append(job)
+            self._bump(tab)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sheet-write-queue", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return job
+
+    def revision(self, tab):
+        """เลขรอบการเปลี่ยนแปลงของ Tab ในคิว (ใช้เป็นส่วนหนึ่งของ key ของ cache)"""
+        with self._cond: return self._revisions.get(tab, 0)
+
+    def read_tab(self, tab, read_fn):
+        """อ่าน Tab ด้วย read_fn() ตอนที่ไม่มี batch ของ Tab นี้กำลังเขียน คืน (grid, fetched_at)
+        ข้อมูลที่ได้มี job ที่เขียนเสร็จก่อน fetched_at ครบ และไม่มี job หลังจากนั้นเลย -> overlay() ซ้อนได้ไม่ซ้ำ"""
+        with self._cond:
+            while any(j.tab == tab and j.status == "running" for j in self._jobs): self._cond.wait()
+            self._reading[tab] = self._reading.get(tab, 0) + 1
+        try:
+            fetched_at = time.time_ns()
+            return read_fn(), fetched_at
+        finally:
+            with self._cond:
+                self._reading[tab] -= 1
+                if not self._reading[tab]: del self._reading[tab]
+                self._cond.notify_all()
+
+    def overlay(self, tab, grid, fetched_at):
+        """ซ้อน job ที่ยังไม่อยู่ในข้อมูลชุดนี้ (ยังไม่เขียน หรือเขียนหลังจากเวลาที่อ่าน fetched_at) ลงบน grid
+        job ที่ไม่แน่ใจ (ข้อมูลไม่ได้อ่านผ่าน read_tab และอ่านระหว่างที่ job กำลังเขียน) ไม่ถูกซ้อน -> ValueError ให้อ่านใหม่"""
+        with self._cond:
+            jobs = [j for j in self._jobs if j.tab == tab and j.status != "failed"]
+            state = [j.in_grid(fetched_at) for j in jobs]
+        if None in state: raise ValueError(f"ข้อมูล {tab} ถูกอ่านระหว่างที่กำลังบันทึกลง Sheet กรุณาโหลดใหม่")
+        jobs = [j for j, included in zip(jobs, state) if not included]
+        if not jobs: return grid
+        grid = [list(line) for line in grid]
+        for job in jobs: apply_job(grid, job)
+        return grid
+
+    def has_unsynced(self, tab, fetched_at):
+        """มี job ของ Tab ที่ overlay() ต้องซ้อนบนข้อมูลที่อ่านเมื่อ fetched_at หรือไม่ (True = ใช้ข้อมูลชุดนั้นตรงๆ โดยไม่ซ้อนไม่ได้)"""
+        with self._cond:
+            return any(j.in_grid(fetched_at) is not True for j in self._jobs if j.tab == tab and j.status != "failed")
+
+    def status(self):
+        with self._cond:
+            failed = [j for j in self._jobs if j.status == "failed"]
+            return {
+                "pending": sum(1 for j in self._jobs if j.status in ("pending", "running")),
+                "failed": len(failed),
+                "failed_labels": [j.label for j in failed],
+                "error": self._last_error,
+            }
+
+    def retry_failed(self):
+        with self._cond:
+            for job in self._jobs:
+                if job.status == "failed":
+                    job.status, job.error, job.sent_at = "pending", None, None
+                    self._bump(job.tab)
+            self._paused = False
+            self._last_error = None
+            self._cond.notify_all()
+
+    def discard_failed(self):
+        """ทิ้ง job ที่ล้มเหลว + job ที่ค้างอยู่หลังจากนั้น คืนชื่อ Tab ที่ได้รับผล"""
+        with self._cond:
+            dropped = [j for j in self._jobs if j.status in ("failed", "pending")]
+            self._jobs = [j for j in self._jobs if j.status not in ("failed", "pending")]
+            tabs = {j.tab for j in dropped}
+            for tab in tabs: self._bump(tab)
+            self._paused = False
+            self._last_error = None
+            return tabs
+
+    # --- Worker ---
+    def _bump(self, tab):
+        self._revisions[tab] = self._revisions.get(tab, 0) + 1
+
+    def _prune(self):
+        cutoff = time.time_ns() - DONE_RETENTION_SECONDS * 1_000_000_000
+        self._jobs = [j for j in self._jobs if not (j.status == "done" and j.committed_at < cutoff)]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # ไม่ส่ง batch ที่มี Tab ที่กำลังถูกอ่านอยู่ (รอให้อ่านเสร็จก่อน ดู read_tab)
+                while True:
+                    batch = [] if self._paused else [j for j in self._jobs if j.status == "pending"][:self.max_batch]
+                    if batch and not any(j.tab in self._reading for j in batch): break
+                    self._cond.wait()
+                sent_at = time.time_ns()
+                for job in batch: job.status, job.sent_at = "running", sent_at
+            try:
+                call_with_retry(lambda: self.storage.write_batch(batch), self.retries, self.backoff)
+            except Exception as err:
+                print(f"Sheet write queue failed ({len(batch)} jobs): {err}")
+                with self._cond:
+                    for job in batch:
+                        job.status, job.error = "failed", str(err)
+                        self._bump(job.tab)
+                    self._paused = True
+                    self._last_error = str(err)
+                    self._cond.notify_all()
+                continue
+            with self._cond:
+                committed_at = time.time_ns()
+                for job in batch: job.status, job.committed_at = "done", committed_at
+                self._prune()
+                self._cond.notify_all()
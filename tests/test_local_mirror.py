@@ -0,0 +1,75 @@
+import sqlite3
+
+from jst.local_mirror import LocalMirror
+from jst.sheet_frames import PO_COLUMN_MAP
+
+TAB = "PO_DATA"
+HEADER = ["รหัสสินค้า", "เลข PO", "วันที่สั่งซื้อ", "วันที่คาดว่าจะได้รับ", "จำนวน"]
+GRID = [
+    HEADER,
+    ["SKU1", "PO-001", "2024-01-05", "2024-02-01", "10"],
+    ["sku1", "PO-002", "2024-02-10", "", "5"],
+    ["SKU2", "PO-002", "2024-02-11", "2024-03-01", "7"],
+    ["SKU3", "PX%1", "ไม่ใช่วันที่", "", "1"],
+]
+
+
+def make_mirror(tmp_path):
+    mirror = LocalMirror(str(tmp_path / "mirror" / "sheets.sqlite"), column_maps={TAB: PO_COLUMN_MAP})
+    mirror.sync_tab(TAB, GRID, 100, version=[7, "2024-02-11T00:00:00Z"])
+    return mirror
+
+
+def test_select_rows_by_product_is_exact(tmp_path):
+    grid, row_indexes = make_mirror(tmp_path).select_rows(TAB, product_id="SKU1")
+    assert grid == [HEADER, GRID[1]]
+    assert row_indexes == [2]
+
+
+def test_select_rows_by_date_window(tmp_path):
+    mirror = make_mirror(tmp_path)
+    _, row_indexes = mirror.select_rows(TAB, date_key="order_date", start="2024-02-01", end="2024-02-28")
+    assert row_indexes == [3, 4]
+    _, row_indexes = mirror.select_rows(TAB, po_number="PO-002", date_key="expected_date", start="2024-01-01")
+    assert row_indexes == [4]
+
+
+def test_search_keys_prefix_on_po_or_product(tmp_path):
+    mirror = make_mirror(tmp_path)
+    assert mirror.search_keys(TAB, "po-00") == [("PO-002", "sku1"), ("PO-002", "SKU2"), ("PO-001", "SKU1")]
+    assert mirror.search_keys(TAB, "sku3") == [("PX%1", "SKU3")]
+    # % / _ เป็นตัวอักษรธรรมดา ไม่ใช่ wildcard
+    assert mirror.search_keys(TAB, "PX%") == [("PX%1", "SKU3")]
+    assert mirror.search_keys(TAB, "P%") == []
+
+
+def test_load_tab_by_version(tmp_path):
+    mirror = make_mirror(tmp_path)
+    assert mirror.load_tab(TAB, [7, "2024-02-11T00:00:00Z"]) == (GRID, 100)
+    assert mirror.load_tab(TAB, [8, "2024-02-12T00:00:00Z"]) is None
+    assert mirror.load_tab(TAB) == (GRID, 100)
+
+
+def test_sync_updates_keys_of_changed_and_removed_rows(tmp_path):
+    mirror = make_mirror(tmp_path)
+    grid = [list(row) for row in GRID[:3]]
+    grid[2][0] = "SKU9"
+    assert mirror.sync_tab(TAB, grid, 200) == 1
+    assert mirror.select_rows(TAB, product_id="SKU9")[1] == [3]
+    assert mirror.select_rows(TAB, product_id="SKU2")[1] == []
+    # ย้ายคอลัมน์ -> ทำ index ใหม่ทั้ง Tab
+    moved = [[row[1], row[0]] + row[2:] for row in grid]
+    assert mirror.sync_tab(TAB, moved, 300) == 2
+    assert mirror.select_rows(TAB, po_number="PO-001")[1] == [2]
+
+
+def test_opens_mirror_without_version_column(tmp_path):
+    path = tmp_path / "mirror" / "sheets.sqlite"
+    path.parent.mkdir()
+    con = sqlite3.connect(str(path))
+    con.execute("CREATE TABLE sheet_meta (tab TEXT PRIMARY KEY, header TEXT NOT NULL, fetched_at INTEGER NOT NULL, synced_at INTEGER NOT NULL, row_count INTEGER NOT NULL)")
+    con.commit()
+    con.close()
+    mirror = LocalMirror(str(path), column_maps={TAB: PO_COLUMN_MAP})
+    mirror.sync_tab(TAB, GRID, 100, version=1)
+    assert mirror.load_tab(TAB, 1) == (GRID, 100)
@@ -0,0 +1,43 @@
+import pytest
+
+from jst.refresher import BackgroundRefresher
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail: raise RuntimeError("quota exceeded")
+        return self.calls
+
+
+def test_failed_refresh_returns_stale_snapshot_and_exposes_error():
+    refresher, load = BackgroundRefresher(), Loader()
+    assert refresher.get("sheet:PO_DATA", load, 300) == 1
+    assert refresher.last_error("sheet:PO_DATA") is None
+
+    load.fail = True
+    refresher.invalidate("sheet:PO_DATA")
+    assert refresher.get("sheet:PO_DATA", load, 300) == 1
+    assert refresher.last_error("sheet:PO_DATA") == "quota exceeded"
+    [status] = refresher.status()
+    assert status["stale"] and status["error"] == "quota exceeded"
+
+    load.fail = False
+    refresher.invalidate("sheet:PO_DATA")
+    assert refresher.get("sheet:PO_DATA", load, 300) == 3
+    assert refresher.last_error("sheet:PO_DATA") is None
+    assert not refresher.status()[0]["stale"]
+
+
+def test_failed_first_load_raises():
+    refresher, load = BackgroundRefresher(), Loader()
+    load.fail = True
+    with pytest.raises(RuntimeError):
+        refresher.get("sheet:MASTER", load, 300)
+    assert refresher.last_error("sheet:MASTER") == "quota exceeded"
+    assert not refresher.status()[0]["stale"]
+    assert refresher.last_error("sheet:unknown") is None
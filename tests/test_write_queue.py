@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from jst.write_queue import WriteQueue, apply_job
+
+TAB = "PO_DATA"
+
+
+class SlowStorage:
+    """Backend จำลอง: ข้อมูลถึง Sheet ทันทีที่ส่ง แต่ response กลับมาช้า (รอ release)"""
+    def __init__(self, grid):
+        self.grid = [list(line) for line in grid]
+        self.applied = threading.Event()
+        self.release = threading.Event()
+
+    def read_tab(self, tab):
+        return [list(line) for line in self.grid]
+
+    def write_batch(self, batches):
+        for batch in batches: apply_job(self.grid, batch)
+        self.applied.set()
+        assert self.release.wait(5)
+
+
+def wait_until(cond, timeout=5):
+    end = time.time() + timeout
+    while not cond():
+        assert time.time() < end, "timeout"
+        time.sleep(0.01)
+
+
+def test_read_during_inflight_batch_is_not_overlaid_twice():
+    storage = SlowStorage([["A"]])
+    queue = WriteQueue(storage)
+    job = queue.submit(TAB, [("append", [["B"]])])
+    assert storage.applied.wait(5)
+
+    result = {}
+    reader = threading.Thread(target=lambda: result.update(read=queue.read_tab(TAB, lambda: storage.read_tab(TAB))))
+    reader.start()
+    time.sleep(0.1)
+    assert "read" not in result  # รอ batch ที่กำลังเขียนให้เสร็จก่อน
+    storage.release.set()
+    reader.join(5)
+
+    grid, fetched_at = result["read"]
+    assert job.status == "done"
+    assert queue.overlay(TAB, grid, fetched_at) == [["A"], ["B"]]
+
+
+def test_worker_waits_for_running_read():
+    storage = SlowStorage([["A"], ["B"], ["C"]])
+    storage.release.set()
+    queue = WriteQueue(storage)
+    reading, done = threading.Event(), threading.Event()
+
+    def slow_read():
+        reading.set()
+        assert done.wait(5)
+        return storage.read_tab(TAB)
+
+    reader = threading.Thread(target=lambda: queue.read_tab(TAB, slow_read))
+    reader.start()
+    assert reading.wait(5)
+    job = queue.submit(TAB, [("delete", 2)])
+    time.sleep(0.1)
+    assert job.status == "pending" and not storage.applied.is_set()
+    done.set()
+    reader.join(5)
+    wait_until(lambda: job.status == "done")
+    assert storage.grid == [["A"], ["C"]]
+
+
+def test_overlay_rejects_grid_read_while_batch_in_flight():
+    storage = SlowStorage([["A"]])
+    queue = WriteQueue(storage)
+    queue.submit(TAB, [("append", [["B"]])])
+    assert storage.applied.wait(5)
+    # อ่านตรงจาก Backend (ไม่ผ่าน read_tab) ระหว่างที่ batch ยังไม่ตอบกลับ -> ไม่รู้ว่ามี B แล้วหรือยัง
+    fetched_at = time.time_ns()
+    grid = storage.read_tab(TAB)
+    with pytest.raises(ValueError):
+        queue.overlay(TAB, grid, fetched_at)
+    storage.release.set()
+
+
+def test_overlay_applies_pending_and_later_commits():
+    storage = SlowStorage([["A"]])
+    storage.release.set()
+    queue = WriteQueue(storage)
+    grid, fetched_at = queue.read_tab(TAB, lambda: storage.read_tab(TAB))
+    job = queue.submit(TAB, [("append", [["B"]]), ("write", (1, 1, [["H"]]))])
+    wait_until(lambda: job.status == "done")
+    # ข้อมูลเก่า (อ่านก่อนเขียน) ยังต้องเห็นผลของ job
+    assert queue.overlay(TAB, grid, fetched_at) == [["H"], ["B"]]
+    grid, fetched_at = queue.read_tab(TAB, lambda: storage.read_tab(TAB))
+    assert queue.overlay(TAB, grid, fetched_at) == [["H"], ["B"]]